@@ -13,7 +13,6 @@ Story Flow - 自动化视频生成流水线
 
 import sys
 import os
-import subprocess
 import json
 import argparse
 from pathlib import Path
@@ -22,6 +21,7 @@ from pathlib import Path
 project_root = Path(__file__).parent
 sys.path.insert(0, str(project_root))
 
+from src import profiler
 from src.config import config
 from src.story_generator import story_generator
 from src.viral_video_generator import viral_video_generator
@@ -81,9 +81,10 @@ def run_pipeline_module(module_name):
         
         # 对于需要用户交互或需要显示进度的模块，直接运行不捕获输出
         if module_name in ["image_generator", "text_analyzer", "voice_synthesizer", "video_composer"]:
-            result = subprocess.run(cmd, cwd=project_root, stdin=sys.stdin, stdout=sys.stdout, stderr=sys.stderr)
+            result = profiler.run_stage(module_name, cmd, cwd=project_root, stdin=sys.stdin, stdout=sys.stdout, stderr=sys.stderr)
         else:
-            result = subprocess.run(
+            result = profiler.run_stage(
+                module_name,
                 cmd,
                 cwd=project_root,
                 capture_output=True,
@@ -218,7 +219,7 @@ def run_stable_diffusion_generator_with_file(json_file, auto_mode=False):
         if auto_mode:
             cmd.append("--auto")
         
-        result = subprocess.run(cmd, cwd=project_root)
+        result = profiler.run_stage("image_generator", cmd, cwd=project_root)
         
         if result.returncode == 0:
             print("✅ Stable Diffusion图像生成成功")
@@ -246,7 +247,7 @@ def run_stable_diffusion_generator(auto_mode=False):
         if auto_mode:
             cmd.append("--auto")
         
-        result = subprocess.run(cmd, cwd=project_root)
+        result = profiler.run_stage("image_generator", cmd, cwd=project_root)
         
         if result.returncode == 0:
             print("✅ Stable Diffusion图像生成成功")
@@ -276,7 +277,7 @@ def run_liblib_generator_with_file(json_file, auto_mode=False):
         # 构建命令，传递JSON文件路径
         cmd = [sys.executable, "-m", "src.liblib_standalone", "--json-file", str(json_file)]
         
-        result = subprocess.run(cmd, cwd=project_root)
+        result = profiler.run_stage("liblib_standalone", cmd, cwd=project_root)
         
         if result.returncode == 0:
             print("✅ LiblibAI图像生成成功")
@@ -318,7 +319,7 @@ def run_liblib_generator(auto_mode=False):
             "--use-f1"  # 默认使用F.1模型
         ]
         
-        result = subprocess.run(cmd, cwd=project_root)
+        result = profiler.run_stage("liblib_standalone", cmd, cwd=project_root)
         
         if result.returncode == 0:
             print("✅ LiblibAI图像生成成功")
@@ -345,7 +346,9 @@ def run_image_service_manager_with_file(json_file, auto_mode=False):
         manager = ImageManager()
         
         # 从JSON文件批量生成图像
-        success = manager.batch_generate_from_json(str(json_file))
+        with profiler.span("stage", "image_service_manager", per_thread=False) as stage:
+            success = manager.batch_generate_from_json(str(json_file))
+            stage["status"] = "ok" if success else "failed"
         
         if success:
             print("✅ 图像服务管理器执行成功")
@@ -374,7 +377,9 @@ def run_image_service_manager(auto_mode=False):
         manager = ImageManager()
         
         # 从JSON文件批量生成图像
-        success = manager.batch_generate_from_json(str(json_file))
+        with profiler.span("stage", "image_service_manager", per_thread=False) as stage:
+            success = manager.batch_generate_from_json(str(json_file))
+            stage["status"] = "ok" if success else "failed"
         
         if success:
             print("✅ 图像服务管理器执行成功")
@@ -423,7 +428,7 @@ def run_liblib_standalone():
         print("使用F.1模型进行生成")
         
         # 执行命令，不捕获输出以显示实时进度条
-        result = subprocess.run(cmd, cwd=project_root)
+        result = profiler.run_stage("liblib_standalone", cmd, cwd=project_root)
         
         if result.returncode == 0:
             print("\n✅ LiblibAI图像生成成功")
@@ -464,7 +469,7 @@ def run_image_to_video():
                 return False
         
         # 运行图生视频模块
-        result = subprocess.run([
+        result = profiler.run_stage("image_to_video", [
             sys.executable, 
             str(project_root / "src" / "pipeline" / "image_to_video.py"),
             "--prompt-source", prompt_source
@@ -510,7 +515,7 @@ def run_voice_synthesizer():
 def run_voice_synthesizer_with_file(json_file_path):
     """使用指定的JSON文件运行语音合成器"""
     cmd = [sys.executable, "-m", "src.pipeline.voice_synthesizer", "--json-file", json_file_path]
-    result = subprocess.run(cmd, cwd=project_root)
+    result = profiler.run_stage("voice_synthesizer", cmd, cwd=project_root)
     return result.returncode == 0
 
 def run_video_composer():
@@ -542,7 +547,7 @@ def run_video_composer():
 def run_video_composer_with_file(json_file_path):
     """使用指定的JSON文件运行视频合成器"""
     cmd = [sys.executable, "-m", "src.pipeline.video_composer", "--json-file", json_file_path]
-    result = subprocess.run(cmd, cwd=project_root)
+    result = profiler.run_stage("video_composer", cmd, cwd=project_root)
     return result.returncode == 0
 
 def run_semantic_analyzer():
@@ -559,7 +564,7 @@ def run_semantic_analyzer():
     try:
         # 运行语义分析器
         cmd = [sys.executable, "src/semantic_analyzer.py"]
-        result = subprocess.run(cmd, cwd=project_root)
+        result = profiler.run_stage("semantic_analyzer", cmd, cwd=project_root)
         
         if result.returncode == 0:
             print("\n✅ 语义分析完成")
@@ -816,6 +821,10 @@ def main():
     
     # 解析命令行参数
     args = parse_arguments()
+
+    # 开启性能剖析，进程退出时在报告目录生成 JSON / CSV 报告
+    if config.pipeline_profile and not args.help_detailed:
+        profiler.start_session(config.pipeline_profile_dir)
     
     # 如果没有命令行参数，检查input.md文件是否存在且有效
     if not any([args.auto, args.generate, args.semantic, args.split, args.analyze, args.images, args.liblib, args.audio, args.video, args.viral, args.image_to_video, args.video_music, args.help_detailed]):
@@ -432,6 +432,27 @@ class Config:
         """是否启用图像服务回退机制"""
         return self._get_bool("IMAGE_SERVICE_FALLBACK_ENABLED", True)
 
+    # 语音合成服务配置
+    @property
+    def tts_provider(self) -> str:
+        """语音合成服务（azure 或 local）"""
+        return os.getenv("TTS_PROVIDER", "azure").lower()
+
+    @property
+    def tts_local_engine(self) -> str:
+        """本地语音合成引擎（espeak-ng、espeak 或 piper）"""
+        return os.getenv("TTS_LOCAL_ENGINE", "espeak-ng").lower()
+
+    @property
+    def tts_local_voice(self) -> str:
+        """本地引擎的语音名（espeak）或模型文件路径（piper）"""
+        return os.getenv("TTS_LOCAL_VOICE", "")
+
+    @property
+    def tts_local_command(self) -> str:
+        """本地引擎的命令行，为空时与引擎名相同"""
+        return os.getenv("TTS_LOCAL_COMMAND", "")
+
     # Azure语音服务配置
     @property
     def azure_speech_key(self) -> str:
@@ -473,6 +494,95 @@ class Config:
     def azure_voice_style_degree(self) -> str:
         return os.getenv("AZURE_VOICE_STYLE_DEGREE", "1")
 
+    # TTS请求调度配置
+    @property
+    def tts_max_concurrency(self) -> int:
+        """同时进行的语音合成请求数上限（被限流时自动降低）"""
+        return self._get_int("TTS_MAX_CONCURRENCY", 4)
+
+    @property
+    def tts_rate_limit(self) -> float:
+        """每秒最大语音合成请求数，0 表示不限速"""
+        return self._get_float("TTS_RATE_LIMIT", 0.0)
+
+    @property
+    def tts_preconnect(self) -> bool:
+        """合成开始前是否为合成器池中的每个实例预先建立连接"""
+        return self._get_bool("TTS_PRECONNECT", True)
+
+    @property
+    def tts_batch_size(self) -> int:
+        """每个合成请求合并的连续文本行数，1 表示逐行合成"""
+        return self._get_int("TTS_BATCH_SIZE", 1)
+
+    @property
+    def tts_postprocess_workers(self) -> int:
+        """语音后处理（静音裁剪等）的线程数，与合成请求并行执行"""
+        return self._get_int("TTS_POSTPROCESS_WORKERS", 2)
+
+    @property
+    def tts_max_attempts(self) -> int:
+        """单个语音合成请求的最大尝试次数"""
+        return self._get_int("TTS_MAX_ATTEMPTS", 5)
+
+    @property
+    def tts_backoff_base(self) -> float:
+        """重试退避基准时间（秒），第 n 次重试最多等待 base * 2^n 秒"""
+        return self._get_float("TTS_BACKOFF_BASE", 1.0)
+
+    @property
+    def tts_backoff_max(self) -> float:
+        """单次重试退避的最长时间（秒）"""
+        return self._get_float("TTS_BACKOFF_MAX", 30.0)
+
+    @property
+    def tts_loudness_normalize(self) -> bool:
+        """是否将每段语音归一化到相同的积分响度"""
+        return self._get_bool("TTS_LOUDNESS_NORMALIZE", True)
+
+    @property
+    def tts_target_loudness(self) -> float:
+        """语音的目标积分响度（LUFS）"""
+        return self._get_float("TTS_TARGET_LOUDNESS", -16.0)
+
+    @property
+    def tts_peak_limit(self) -> float:
+        """归一化后的峰值上限（dBFS）"""
+        return self._get_float("TTS_PEAK_LIMIT", -1.0)
+
+    @property
+    def tts_sample_rate(self) -> int:
+        """语音输出采样率，0 表示保持合成引擎的采样率"""
+        return self._get_int("TTS_SAMPLE_RATE", 48000)
+
+    @property
+    def tts_audio_format(self) -> str:
+        """语音文件格式（wav、mp3、aac 或 opus）"""
+        return os.getenv("TTS_AUDIO_FORMAT", "wav").lower()
+
+    @property
+    def tts_audio_bitrate(self) -> str:
+        """压缩格式的音频码率"""
+        return os.getenv("TTS_AUDIO_BITRATE", "64k")
+
+    @property
+    def tts_cache(self) -> bool:
+        """是否启用语音缓存（文本、语音和韵律设置不变的片段直接复用）"""
+        return self._get_bool("TTS_CACHE", True)
+
+    @property
+    def tts_cache_dir(self) -> Path:
+        """语音缓存目录"""
+        cache_dir = os.getenv("TTS_CACHE_DIR")
+        if cache_dir:
+            return self.project_root / cache_dir
+        return self.output_dir / "cache" / "tts"
+
+    @property
+    def tts_cache_max_mb(self) -> int:
+        """语音缓存容量上限（MB），0 表示不限制"""
+        return self._get_int("TTS_CACHE_MAX_MB", 512)
+
     # ================================
     # Stable Diffusion配置
     # ================================
@@ -481,6 +591,44 @@ class Config:
     def sd_api_url(self) -> str:
         return os.getenv("SD_API_URL", "http://127.0.0.1:7860")
 
+    @property
+    def sd_api_urls(self) -> List[str]:
+        """SD WebUI 端点列表（SD_API_URLS 逗号分隔），未配置时只使用 SD_API_URL"""
+        return self._get_list("SD_API_URLS") or [self.sd_api_url]
+
+    @property
+    def sd_endpoint_concurrency(self) -> int:
+        """每个 SD WebUI 端点同时处理的请求数上限"""
+        return max(1, self._get_int("SD_ENDPOINT_CONCURRENCY", 2))
+
+    @property
+    def sd_health_interval(self) -> float:
+        """SD 端点状态（队列深度、延迟）的轮询间隔（秒），0 表示不轮询"""
+        return self._get_float("SD_HEALTH_INTERVAL", 5.0)
+
+    @property
+    def sd_eject_seconds(self) -> float:
+        """连续失败的 SD 端点被剔除后重新探测的等待时间（秒）"""
+        return self._get_float("SD_EJECT_SECONDS", 30.0)
+
+    @property
+    def image_cache(self) -> bool:
+        """是否启用图片缓存（生成请求完全相同且种子固定的图片直接复用）"""
+        return self._get_bool("IMAGE_CACHE", True)
+
+    @property
+    def image_cache_dir(self) -> Path:
+        """图片缓存目录（跨运行、跨故事共享）"""
+        cache_dir = os.getenv("IMAGE_CACHE_DIR")
+        if cache_dir:
+            return self.project_root / cache_dir
+        return self.output_dir / "cache" / "images"
+
+    @property
+    def image_cache_max_mb(self) -> int:
+        """图片缓存容量上限（MB），0 表示不限制"""
+        return self._get_int("IMAGE_CACHE_MAX_MB", 2048)
+
     @property
     def sd_enable_hr(self) -> bool:
         return self._get_bool("SD_ENABLE_HR", True)
@@ -529,6 +677,11 @@ class Config:
     def sd_batch_size(self) -> int:
         return self._get_int("SD_BATCH_SIZE", 1)
 
+    @property
+    def sd_pack_size(self) -> int:
+        """每个请求合并生成的场景数（1 表示每个场景单独请求）"""
+        return max(1, self._get_int("SD_PACK_SIZE", 1))
+
     @property
     def sd_steps(self) -> int:
         return self._get_int("SD_STEPS", 20)
@@ -863,12 +1016,80 @@ class Config:
     def video_effect_type(self) -> str:
         return os.getenv("VIDEO_EFFECT_TYPE", "fade")
 
+    @property
+    def video_motion_seed(self) -> str:
+        """Ken Burns 运动规划种子，相同种子重复渲染得到相同的平移方向"""
+        return os.getenv("VIDEO_MOTION_SEED", "0")
+
+    @property
+    def video_motion_saliency(self) -> bool:
+        """是否根据图像显著性朝主体方向平移"""
+        return self._get_bool("VIDEO_MOTION_SALIENCY", True)
+
+    @property
+    def video_subtitle_mode(self) -> str:
+        """字幕输出方式: burn（逐片段烧录）、sidecar（外挂SRT/ASS）、soft（mov_text软字幕）或 filter（拼接后一次滤镜烧录）"""
+        return os.getenv("VIDEO_SUBTITLE_MODE", "burn").lower()
+
+    @property
+    def video_background_mode(self) -> str:
+        """背景图层模式: static（共享背景缓冲区，前景原地贴合）或 composite（ImageClip + CompositeVideoClip）"""
+        return os.getenv("VIDEO_BACKGROUND_MODE", "static").lower()
+
+    @property
+    def video_encoder_backend(self) -> str:
+        """片段编码后端: ffmpeg（原始帧管道直接写入ffmpeg）或 moviepy（write_videofile）"""
+        return os.getenv("VIDEO_ENCODER_BACKEND", "ffmpeg").lower()
+
+    @property
+    def video_concat_mode(self) -> str:
+        """片段拼接方式: copy（参数一致时流拷贝，否则回退重新编码）或 reencode（始终重新编码）"""
+        return os.getenv("VIDEO_CONCAT_MODE", "copy").lower()
+
+    @property
+    def video_render_mode(self) -> str:
+        """片段渲染并发方式: process（进程池，按 MAX_WORKERS_VIDEO 扩展到多核）或 thread（线程池）"""
+        return os.getenv("VIDEO_RENDER_MODE", "process").lower()
+
+    @property
+    def video_scene_retries(self) -> int:
+        """单个片段渲染失败后的最大重试次数"""
+        return self._get_int("VIDEO_SCENE_RETRIES", 2)
+
+    @property
+    def video_clip_cache(self) -> bool:
+        """是否启用片段缓存（图片、音频、字幕和渲染参数不变的片段直接复用）"""
+        return self._get_bool("VIDEO_CLIP_CACHE", True)
+
+    @property
+    def video_clip_cache_dir(self) -> Path:
+        """片段缓存目录"""
+        cache_dir = os.getenv("VIDEO_CLIP_CACHE_DIR")
+        if cache_dir:
+            return self.project_root / cache_dir
+        return self.output_dir / "cache" / "clips"
+
+    @property
+    def video_clip_cache_max_mb(self) -> int:
+        """片段缓存容量上限（MB），0 表示不限制"""
+        return self._get_int("VIDEO_CLIP_CACHE_MAX_MB", 2048)
+
+    @property
+    def video_preset(self) -> str:
+        """x264编码预设"""
+        return os.getenv("VIDEO_PRESET", "slow")
+
     # 字幕配置
     @property
     def subtitle_fontsize(self) -> int:
         # 支持两种配置项名称：SUBTITLE_SIZE 和 SUBTITLE_FONTSIZE
         return self._get_int("SUBTITLE_SIZE", self._get_int("SUBTITLE_FONTSIZE", 60))
 
+    @property
+    def subtitle_max_chars(self) -> int:
+        """按配音字词时间切分字幕时每条短句的最大字符数，0 表示不切分"""
+        return self._get_int("SUBTITLE_MAX_CHARS", 20)
+
     @property
     def subtitle_fontcolor(self) -> str:
         # 支持两种配置项名称：SUBTITLE_COLOR 和 SUBTITLE_FONTCOLOR
@@ -957,6 +1178,19 @@ class Config:
     def log_level(self) -> str:
         return os.getenv("LOG_LEVEL", "INFO")
 
+    @property
+    def pipeline_profile(self) -> bool:
+        """是否记录各阶段、各片段的耗时和资源用量并生成剖析报告"""
+        return self._get_bool("PIPELINE_PROFILE", False)
+
+    @property
+    def pipeline_profile_dir(self) -> Path:
+        """剖析报告目录"""
+        profile_dir = os.getenv("PIPELINE_PROFILE_DIR")
+        if profile_dir:
+            return self.project_root / profile_dir
+        return self.output_dir / "profiles"
+
     # ================================
     # 辅助方法
     # ================================
@@ -977,12 +1211,28 @@ class Config:
                 f"Unsupported LLM provider: {self.llm_provider} (supported: openai, deepseek)"
             )
 
-        if not self.azure_speech_key:
-            errors.append("Azure Speech key is required (AZURE_SPEECH_KEY)")
+        if self.tts_provider == "azure":
+            if not self.azure_speech_key:
+                errors.append("Azure Speech key is required (AZURE_SPEECH_KEY)")
+        elif self.tts_provider == "local":
+            if self.tts_local_engine == "piper" and not self.tts_local_voice:
+                errors.append("Piper model path is required (TTS_LOCAL_VOICE)")
+        else:
+            errors.append(
+                f"Unsupported TTS provider: {self.tts_provider} (supported: azure, local)"
+            )
+        if self.tts_audio_format not in ("wav", "mp3", "aac", "opus"):
+            errors.append(
+                f"Unsupported TTS audio format: {self.tts_audio_format} "
+                "(supported: wav, mp3, aac, opus)"
+            )
 
         # 检查SD API URL
         if not self.sd_api_url or not self.sd_api_url.startswith("http"):
             errors.append("Valid Stable Diffusion API URL is required (SD_API_URL)")
+        for url in self._get_list("SD_API_URLS"):
+            if not url.startswith("http"):
+                errors.append(f"Invalid Stable Diffusion API URL in SD_API_URLS: {url}")
 
         return errors
 
@@ -1034,7 +1284,11 @@ class Config:
             print(f"OpenAI Model: {self.openai_model}")
         elif self.llm_provider == "deepseek":
             print(f"DeepSeek Model: {self.deepseek_model}")
-        print(f"Azure Voice: {self.azure_voice_name}")
+        print(f"TTS Provider: {self.tts_provider}")
+        if self.tts_provider == "local":
+            print(f"Local TTS Engine: {self.tts_local_engine}")
+        else:
+            print(f"Azure Voice: {self.azure_voice_name}")
         print(f"SD API URL: {self.sd_api_url}")
         print(f"Video FPS: {self.video_fps}")
         print(f"Debug Mode: {self.debug_mode}")
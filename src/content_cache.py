@@ -0,0 +1,182 @@
+# -*- coding: utf-8 -*-
+"""
+内容寻址文件缓存
+
+以输入内容（文件内容、文本、配置参数）的哈希作为键缓存生成结果，
+命中时通过硬链接（跨文件系统时复制）取出，避免重复生成。
+"""
+
+import hashlib
+import json
+import os
+import shutil
+from pathlib import Path
+from typing import Any, Optional, Union
+
+PathLike = Union[str, Path]
+
+# 分块读取文件的大小
+_CHUNK_SIZE = 1024 * 1024
+
+
+def hash_file(path: PathLike) -> str:
+    """计算文件内容的 SHA-256"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def make_key(*parts: Any) -> str:
+    """由多个部分生成缓存键
+
+    Path 按文件内容计算哈希，bytes 直接参与计算，其他值（字符串、数字、
+    字典、列表、None）按排序后的 JSON 序列化。
+
+    Returns:
+        str: 十六进制 SHA-256
+    """
+    digest = hashlib.sha256()
+    for part in parts:
+        if isinstance(part, Path):
+            encoded = hash_file(part).encode("ascii")
+        elif isinstance(part, bytes):
+            encoded = part
+        else:
+            encoded = json.dumps(
+                part, sort_keys=True, ensure_ascii=False, default=str
+            ).encode("utf-8")
+        # 长度前缀，避免不同分段拼接出相同的字节序列
+        digest.update(len(encoded).to_bytes(8, "big"))
+        digest.update(encoded)
+    return digest.hexdigest()
+
+
+class ContentCache:
+    """内容寻址文件缓存
+
+    缓存文件按键的前两位分目录存放；读取时更新修改时间，
+    超出容量上限时按修改时间淘汰最久未使用的条目。
+    """
+
+    def __init__(self, cache_dir: PathLike, suffix: str = "", max_bytes: int = 0):
+        """初始化缓存
+
+        Args:
+            cache_dir: 缓存目录
+            suffix: 缓存文件扩展名（如 ".mp4"）
+            max_bytes: 缓存容量上限（字节），0 表示不限制
+        """
+        self.cache_dir = Path(cache_dir)
+        self.suffix = suffix
+        self.max_bytes = max_bytes
+
+    def path_for(self, key: str) -> Path:
+        """缓存条目的文件路径"""
+        return self.cache_dir / key[:2] / f"{key}{self.suffix}"
+
+    def get(self, key: str) -> Optional[Path]:
+        """查找缓存条目，命中时更新其使用时间
+
+        Returns:
+            Optional[Path]: 缓存文件路径，未命中返回 None
+        """
+        path = self.path_for(key)
+        try:
+            os.utime(path)
+        except OSError:
+            return None
+        return path
+
+    def fetch(self, key: str, dest: PathLike) -> bool:
+        """将缓存条目取出到目标路径
+
+        Args:
+            key: 缓存键
+            dest: 目标文件路径（已存在时会被替换）
+
+        Returns:
+            bool: 是否命中
+        """
+        path = self.get(key)
+        if path is None:
+            return False
+        try:
+            _link_or_copy(path, Path(dest))
+        except OSError as e:
+            print(f"读取缓存失败 {path}: {e}")
+            return False
+        return True
+
+    def put(self, key: str, source: PathLike) -> Path:
+        """将文件存入缓存
+
+        Args:
+            key: 缓存键
+            source: 需要缓存的文件
+
+        Returns:
+            Path: 缓存文件路径
+        """
+        path = self.path_for(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        _link_or_copy(Path(source), path)
+        return path
+
+    def put_bytes(self, key: str, data: bytes) -> Path:
+        """将字节数据存入缓存"""
+        path = self.path_for(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+        tmp_path.write_bytes(data)
+        os.replace(tmp_path, path)
+        return path
+
+    def evict(self) -> int:
+        """淘汰最久未使用的条目，直到总大小不超过容量上限
+
+        Returns:
+            int: 删除的条目数
+        """
+        if self.max_bytes <= 0 or not self.cache_dir.exists():
+            return 0
+
+        entries = []
+        total = 0
+        for path in self.cache_dir.glob(f"*/*{self.suffix}"):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+            total += stat.st_size
+
+        removed = 0
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                path.unlink()
+            except OSError:
+                continue
+            total -= size
+            removed += 1
+        return removed
+
+
+def _link_or_copy(source: Path, dest: Path):
+    """以硬链接（失败时复制）原子地替换目标文件"""
+    try:
+        if os.path.samefile(source, dest):
+            # 目标已是同一文件的硬链接（rename 不会替换，临时文件会残留）
+            return
+    except OSError:
+        pass
+    tmp_path = dest.with_name(f".{dest.name}.{os.getpid()}.tmp")
+    tmp_path.unlink(missing_ok=True)
+    try:
+        os.link(source, tmp_path)
+    except OSError:
+        shutil.copy2(source, tmp_path)
+    os.replace(tmp_path, dest)
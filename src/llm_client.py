@@ -8,6 +8,7 @@ from typing import Any, Dict, List, Optional
 
 import openai
 
+from src import profiler
 from src.config import config
 
 # 检查OpenAI库版本兼容性
@@ -84,6 +85,9 @@ class LLMClient:
             temperature = config.llm_temperature
 
         for attempt in range(max_retries):
+            profiler.count(profiler.NETWORK_CALLS)
+            if attempt > 0:
+                profiler.count(profiler.RETRIES)
             try:
                 if OPENAI_V1:
                     # 新版本API
@@ -161,6 +165,9 @@ class LLMClient:
             temperature = config.llm_temperature
 
         for attempt in range(max_retries):
+            profiler.count(profiler.NETWORK_CALLS)
+            if attempt > 0:
+                profiler.count(profiler.RETRIES)
             try:
                 if OPENAI_V1:
                     # 新版本API
@@ -0,0 +1,11 @@
+# -*- coding: utf-8 -*-
+"""
+媒体处理模块
+
+提供视频合成流水线使用的帧生成、编码等底层媒体处理功能
+"""
+
+from .ken_burns import KenBurnsRenderer
+from .motion_planner import MotionPlan, plan_motion
+
+__all__ = ["KenBurnsRenderer", "MotionPlan", "plan_motion"]
@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+"""
+音频压缩编码
+
+将后处理完成的 WAV 交给 ffmpeg 编码为 MP3 / AAC / Opus，配音体积约为 WAV 的十分之一。
+WAV 从 stdin 传入；输出先写入临时文件（MP4 容器需要可回写的输出）再读回。
+"""
+
+import subprocess
+import tempfile
+from pathlib import Path
+from typing import List
+
+from moviepy.config import FFMPEG_BINARY
+
+from .ffmpeg_encoder import FFmpegEncodeError
+
+# 格式名称到 (文件扩展名, ffmpeg 输出参数) 的映射
+AUDIO_FORMATS = {
+    "wav": (".wav", []),
+    "mp3": (".mp3", ["-c:a", "libmp3lame"]),
+    "aac": (".m4a", ["-c:a", "aac", "-movflags", "+faststart"]),
+    "opus": (".opus", ["-c:a", "libopus"]),
+}
+
+
+def audio_extension(audio_format: str) -> str:
+    """音频格式对应的文件扩展名
+
+    Raises:
+        ValueError: 不支持的音频格式
+    """
+    if audio_format not in AUDIO_FORMATS:
+        raise ValueError(
+            f"不支持的音频格式: {audio_format}（支持: {', '.join(AUDIO_FORMATS)}）"
+        )
+    return AUDIO_FORMATS[audio_format][0]
+
+
+def build_audio_command(
+    output_path: Path,
+    audio_format: str,
+    bitrate: str = "64k",
+    ffmpeg_binary: str = FFMPEG_BINARY,
+) -> List[str]:
+    """构建从 stdin 读取 WAV 并编码的 ffmpeg 命令行"""
+    extension = audio_extension(audio_format)
+    cmd = [ffmpeg_binary, "-y", "-hide_banner", "-loglevel", "error"]
+    cmd += ["-f", "wav", "-i", "pipe:0", "-map_metadata", "-1"]
+    cmd += AUDIO_FORMATS[audio_format][1]
+    if extension != ".wav" and bitrate:
+        cmd += ["-b:a", bitrate]
+    return cmd + [str(output_path)]
+
+
+def encode_audio(
+    data: bytes,
+    audio_format: str,
+    bitrate: str = "64k",
+    ffmpeg_binary: str = FFMPEG_BINARY,
+) -> bytes:
+    """将 WAV 内容编码为指定格式
+
+    Args:
+        data: WAV 文件内容
+        audio_format: 目标格式（wav、mp3、aac 或 opus），wav 时原样返回
+        bitrate: 目标码率（如 "64k"）
+        ffmpeg_binary: ffmpeg 可执行文件路径
+
+    Returns:
+        bytes: 编码后的文件内容
+
+    Raises:
+        ValueError: 不支持的音频格式
+        FFmpegEncodeError: ffmpeg 编码失败
+    """
+    extension = audio_extension(audio_format)
+    if extension == ".wav":
+        return data
+
+    with tempfile.TemporaryDirectory(prefix="story_flow_audio_") as tmp_dir:
+        output_path = Path(tmp_dir) / f"audio{extension}"
+        cmd = build_audio_command(output_path, audio_format, bitrate, ffmpeg_binary)
+        result = subprocess.run(cmd, input=data, capture_output=True)
+        if result.returncode != 0 or not output_path.exists():
+            stderr = result.stderr.decode("utf-8", errors="replace").strip()
+            raise FFmpegEncodeError(
+                f"音频编码失败（退出码 {result.returncode}）: {stderr}"
+            )
+        return output_path.read_bytes()
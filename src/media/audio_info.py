@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+"""
+音频信息读取
+
+优先读取语音后处理写出的附属统计文件（output_N.json），
+否则 WAV 直接解析文件头，其他格式由 ffmpeg 解析文件头，均无需解码音频数据。
+"""
+
+import json
+import os
+import wave
+from pathlib import Path
+from typing import Any, Dict, Optional, Union
+
+from moviepy.video.io.ffmpeg_reader import ffmpeg_parse_infos
+
+# 片段音频的查找顺序（配音可以保存为压缩格式或 WAV）
+AUDIO_EXTENSIONS = (".mp3", ".m4a", ".opus", ".wav")
+
+
+def find_audio(directory: Union[str, Path], stem: str) -> Optional[Path]:
+    """查找片段的音频文件
+
+    Args:
+        directory: 音频目录
+        stem: 不含扩展名的文件名（如 "output_1"）
+
+    Returns:
+        Optional[Path]: 按 AUDIO_EXTENSIONS 顺序找到的第一个文件，不存在时返回 None
+    """
+    for extension in AUDIO_EXTENSIONS:
+        path = Path(directory) / f"{stem}{extension}"
+        if path.exists():
+            return path
+    return None
+
+
+def audio_duration(path: Union[str, Path]) -> float:
+    """读取音频时长（秒）
+
+    Args:
+        path: 音频文件路径
+
+    Returns:
+        float: 音频时长
+    """
+    path = Path(path)
+    stats = read_sidecar(path)
+    if stats and stats.get("duration"):
+        return float(stats["duration"])
+    if path.suffix.lower() == ".wav":
+        try:
+            with wave.open(str(path), "rb") as f:
+                return f.getnframes() / float(f.getframerate())
+        except (wave.Error, EOFError):
+            # 非 PCM 编码的 WAV（如 IEEE float）交给 ffmpeg 解析
+            pass
+    return float(ffmpeg_parse_infos(str(path)).get("duration") or 0.0)
+
+
+def sidecar_path(path: Union[str, Path]) -> Path:
+    """音频文件对应的附属统计文件路径"""
+    return Path(path).with_suffix(".json")
+
+
+def read_sidecar(path: Union[str, Path]) -> Optional[Dict[str, Any]]:
+    """读取音频的附属统计文件（时长、采样率、响度等）
+
+    统计中记录的文件大小与音频不一致时视为过期。
+
+    Args:
+        path: 音频文件路径
+
+    Returns:
+        Optional[Dict[str, Any]]: 统计信息，不存在或已过期时返回 None
+    """
+    try:
+        stats = json.loads(sidecar_path(path).read_text(encoding="utf-8"))
+        if stats.get("bytes") != Path(path).stat().st_size:
+            return None
+    except (OSError, ValueError, AttributeError):
+        return None
+    return stats
+
+
+def write_sidecar(path: Union[str, Path], stats: Dict[str, Any]) -> Path:
+    """原子地写入音频的附属统计文件
+
+    Args:
+        path: 音频文件路径
+        stats: 统计信息，须包含音频文件大小 bytes
+
+    Returns:
+        Path: 附属文件路径
+    """
+    target = sidecar_path(path)
+    tmp_path = target.with_name(f".{target.name}.{os.getpid()}.tmp")
+    tmp_path.write_text(
+        json.dumps(stats, ensure_ascii=False, indent=2), encoding="utf-8"
+    )
+    os.replace(tmp_path, target)
+    return target
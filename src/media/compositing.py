@@ -0,0 +1,183 @@
+# -*- coding: utf-8 -*-
+"""
+图层合成工具
+
+静态背景只保存一份只读数据，前景逐帧原地贴合到复用的输出缓冲区中，
+避免为每一帧复制背景或经由 CompositeVideoClip 做通用合成。
+字幕等静态叠加层只在与前景重叠的区域逐帧混合；只在一段时间内显示的叠加层
+（如按字词时间切分的字幕短句）每帧只重绘其所在的区域。
+"""
+
+from typing import Callable, Optional, Tuple
+
+import numpy as np
+
+
+class StaticBackgroundLayer:
+    """静态背景图层
+
+    背景（如模糊放大后的原图）在整个片段中不变，因此只需初始化时绘制一次到输出缓冲区；
+    之后每帧只把前景写入居中区域，背景边框部分保持不变。
+    返回的帧是复用的缓冲区，调用方需要在获取下一帧之前消费（编码、拷贝）完当前帧。
+    """
+
+    def __init__(self, background: np.ndarray, foreground_size: Tuple[int, int]):
+        """初始化背景图层
+
+        Args:
+            background: 背景图像数组 (高, 宽, 3)
+            foreground_size: 前景尺寸 (宽, 高)，前景居中放置
+        """
+        self.background = np.ascontiguousarray(background, dtype=np.uint8)
+        self.background.setflags(write=False)
+        height, width = self.background.shape[:2]
+        fg_width, fg_height = foreground_size
+        if fg_width > width or fg_height > height:
+            raise ValueError(
+                f"前景尺寸 {foreground_size} 超出背景尺寸 {(width, height)}"
+            )
+
+        self.size = (width, height)
+        self.foreground_size = (fg_width, fg_height)
+        # 与 MoviePy 的 "center" 定位保持一致（向下取整）
+        self.offset = ((width - fg_width) // 2, (height - fg_height) // 2)
+        self._buffer = self.background.copy()
+        # 与前景区域重叠、需要逐帧混合的叠加层部分
+        self._frame_overlays = []
+        # 限时叠加层 (区域, 混合, 开始时间, 结束时间)；区域每帧从 _base 恢复后重绘
+        self._timed_overlays = []
+        self._timed_box = None
+        self._base = None
+
+    def add_overlay(
+        self,
+        rgb: np.ndarray,
+        alpha: np.ndarray,
+        position: Tuple[int, int],
+        start: Optional[float] = None,
+        end: Optional[float] = None,
+    ):
+        """添加叠加层（如字幕位图）
+
+        静态叠加层落在背景边框上的部分只在此处混合一次；与前景区域重叠的部分
+        预先计算预乘颜色，逐帧只混合这一小块区域。
+        指定 start / end 的叠加层只在 [start, end) 时间内显示。
+
+        Args:
+            rgb: 叠加层颜色 (高, 宽, 3)
+            alpha: 叠加层透明度 (高, 宽)，0-255
+            position: 叠加层左上角在输出帧中的位置 (x, y)，超出画面的部分会被裁掉
+            start: 开始显示的时间（秒），None 表示静态叠加层
+            end: 结束显示的时间（秒），None 表示显示到片段结束
+        """
+        width, height = self.size
+        ov_height, ov_width = alpha.shape[:2]
+        left, top = int(position[0]), int(position[1])
+
+        # 裁剪到画面内以及 alpha 非零的最小区域
+        rows = np.flatnonzero(alpha.any(axis=1))
+        cols = np.flatnonzero(alpha.any(axis=0))
+        if rows.size == 0:
+            return
+        x0 = max(left + cols[0], 0)
+        y0 = max(top + rows[0], 0)
+        x1 = min(left + cols[-1] + 1, width, left + ov_width)
+        y1 = min(top + rows[-1] + 1, height, top + ov_height)
+        if x0 >= x1 or y0 >= y1:
+            return
+
+        region_rgb = rgb[y0 - top : y1 - top, x0 - left : x1 - left, :3]
+        region_alpha = alpha[y0 - top : y1 - top, x0 - left : x1 - left]
+        blend = _OverlayBlend(region_rgb, region_alpha)
+
+        if start is not None or end is not None:
+            if self._base is None:
+                self._base = self._buffer.copy()
+            self._timed_overlays.append(
+                (
+                    (slice(y0, y1), slice(x0, x1)),
+                    blend,
+                    start if start is not None else float("-inf"),
+                    end if end is not None else float("inf"),
+                )
+            )
+            box = self._timed_box or (x0, y0, x1, y1)
+            self._timed_box = (
+                min(box[0], x0),
+                min(box[1], y0),
+                max(box[2], x1),
+                max(box[3], y1),
+            )
+            return
+
+        # 背景部分一次性混合进输出缓冲区
+        blend.apply(self._buffer[y0:y1, x0:x1])
+        if self._base is not None:
+            blend.apply(self._base[y0:y1, x0:x1])
+
+        # 与前景重叠的部分逐帧混合
+        fg_x, fg_y = self.offset
+        fg_width, fg_height = self.foreground_size
+        ix0, iy0 = max(x0, fg_x), max(y0, fg_y)
+        ix1, iy1 = min(x1, fg_x + fg_width), min(y1, fg_y + fg_height)
+        if ix0 < ix1 and iy0 < iy1:
+            self._frame_overlays.append(
+                (
+                    (slice(iy0, iy1), slice(ix0, ix1)),
+                    _OverlayBlend(
+                        region_rgb[iy0 - y0 : iy1 - y0, ix0 - x0 : ix1 - x0],
+                        region_alpha[iy0 - y0 : iy1 - y0, ix0 - x0 : ix1 - x0],
+                    ),
+                )
+            )
+
+    def compose(self, foreground: np.ndarray, t: Optional[float] = None) -> np.ndarray:
+        """将前景帧贴合到背景上
+
+        Args:
+            foreground: 前景帧 (高, 宽, 3)
+            t: 帧时间（秒），用于选择显示中的限时叠加层
+
+        Returns:
+            合成后的帧（复用的输出缓冲区）
+        """
+        if self._timed_box is not None:
+            # 擦除上一帧的限时叠加层
+            x0, y0, x1, y1 = self._timed_box
+            self._buffer[y0:y1, x0:x1] = self._base[y0:y1, x0:x1]
+        x, y = self.offset
+        fg_width, fg_height = self.foreground_size
+        self._buffer[y : y + fg_height, x : x + fg_width] = foreground[..., :3]
+        for region, blend in self._frame_overlays:
+            blend.apply(self._buffer[region])
+        if t is not None:
+            for region, blend, start, end in self._timed_overlays:
+                if start <= t < end:
+                    blend.apply(self._buffer[region])
+        return self._buffer
+
+    def frame_function(
+        self, foreground_function: Callable[[float], np.ndarray]
+    ) -> Callable[[float], np.ndarray]:
+        """包装前景帧函数，返回合成后的帧函数（MoviePy frame_function）"""
+
+        def make_frame(t: float) -> np.ndarray:
+            return self.compose(foreground_function(t), t)
+
+        return make_frame
+
+
+class _OverlayBlend:
+    """预计算的 alpha 混合: out = (rgb * a + dst * (255 - a)) / 255"""
+
+    def __init__(self, rgb: np.ndarray, alpha: np.ndarray):
+        alpha = alpha.astype(np.uint16)[..., None]
+        self._premultiplied = rgb.astype(np.uint16) * alpha + 127
+        self._inverse = 255 - alpha
+
+    def apply(self, target: np.ndarray):
+        """原地混合到目标区域"""
+        blended = target * self._inverse
+        blended += self._premultiplied
+        blended //= 255
+        target[...] = blended
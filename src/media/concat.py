@@ -0,0 +1,161 @@
+# -*- coding: utf-8 -*-
+"""
+视频片段拼接工具
+
+基于 ffmpeg concat demuxer 以流拷贝（-c copy）方式拼接参数一致的片段，
+无需解码和重新编码；参数不一致时由调用方回退到重新编码。
+"""
+
+import subprocess
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Union
+
+from moviepy.config import FFMPEG_BINARY
+from moviepy.video.io.ffmpeg_reader import ffmpeg_parse_infos
+
+from .ffmpeg_encoder import FFmpegEncodeError
+
+PathLike = Union[str, Path]
+
+
+def probe_stream_params(path: PathLike) -> Dict:
+    """读取片段的流参数（只解析文件头，不解码）
+
+    Args:
+        path: 视频文件路径
+
+    Returns:
+        Dict: 编码器、分辨率、帧率、音频参数及时长
+    """
+    infos = ffmpeg_parse_infos(str(path))
+    audio_fps = None
+    if infos.get("audio_found"):
+        audio_fps = infos.get("audio_fps")
+    return {
+        "video_codec": infos.get("video_codec_name"),
+        "video_profile": infos.get("video_profile"),
+        "size": tuple(infos.get("video_size") or ()),
+        "fps": infos.get("video_fps"),
+        "audio_found": bool(infos.get("audio_found")),
+        "audio_fps": audio_fps,
+        "duration": infos.get("duration") or 0.0,
+    }
+
+
+def can_stream_copy(paths: Sequence[PathLike]) -> bool:
+    """判断片段是否可以直接流拷贝拼接（编码器、分辨率、帧率、音频参数一致）"""
+    if not paths:
+        return False
+
+    try:
+        params = [probe_stream_params(path) for path in paths]
+    except Exception as e:
+        print(f"读取片段参数失败，无法流拷贝拼接: {e}")
+        return False
+
+    keys = ("video_codec", "video_profile", "size", "fps", "audio_found", "audio_fps")
+    reference = {key: params[0][key] for key in keys}
+    for path, param in zip(paths, params):
+        if not param["video_codec"] or param["duration"] <= 0:
+            print(f"片段参数无效: {path}")
+            return False
+        current = {key: param[key] for key in keys}
+        if current != reference:
+            print(f"片段参数不一致: {path} {current} != {reference}")
+            return False
+    return True
+
+
+def write_concat_list(paths: Sequence[PathLike], list_path: PathLike) -> Path:
+    """写入 concat demuxer 使用的文件列表"""
+    list_path = Path(list_path)
+    list_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(list_path, "w", encoding="utf-8") as f:
+        for path in paths:
+            escaped = str(Path(path).resolve()).replace("'", "'\\''")
+            f.write(f"file '{escaped}'\n")
+    return list_path
+
+
+def build_concat_command(
+    list_path: PathLike,
+    output_path: PathLike,
+    audio_path: Optional[PathLike] = None,
+    duration: Optional[float] = None,
+    ffmpeg_binary: str = FFMPEG_BINARY,
+) -> List[str]:
+    """构建流拷贝拼接命令
+
+    Args:
+        list_path: concat 文件列表
+        output_path: 输出文件路径
+        audio_path: 可选的替换音轨（循环播放，编码为 AAC），视频流仍然直接拷贝
+        duration: 输出时长上限（秒），替换音轨时用于截断循环音乐
+        ffmpeg_binary: ffmpeg 可执行文件路径
+    """
+    cmd = [
+        ffmpeg_binary,
+        "-y",
+        "-hide_banner",
+        "-loglevel",
+        "error",
+        "-f",
+        "concat",
+        "-safe",
+        "0",
+        "-i",
+        str(list_path),
+    ]
+    if audio_path:
+        cmd += ["-stream_loop", "-1", "-i", str(audio_path)]
+        cmd += ["-map", "0:v:0", "-map", "1:a:0", "-c:v", "copy", "-c:a", "aac"]
+    else:
+        cmd += ["-c", "copy"]
+    if duration:
+        cmd += ["-t", f"{duration:.3f}"]
+    cmd += ["-movflags", "+faststart", str(output_path)]
+    return cmd
+
+
+def concat_stream_copy(
+    paths: Sequence[PathLike],
+    output_path: PathLike,
+    list_path: Optional[PathLike] = None,
+    audio_path: Optional[PathLike] = None,
+    duration: Optional[float] = None,
+) -> Path:
+    """以流拷贝方式拼接片段
+
+    Args:
+        paths: 按顺序排列的片段路径
+        output_path: 输出文件路径
+        list_path: concat 文件列表路径，默认与输出文件同目录
+        audio_path: 可选的替换音轨
+        duration: 输出时长上限（秒）
+
+    Returns:
+        Path: 输出文件路径
+
+    Raises:
+        FFmpegEncodeError: ffmpeg 执行失败
+    """
+    output_path = Path(output_path)
+    if list_path is None:
+        list_path = output_path.with_suffix(".concat.txt")
+    list_path = write_concat_list(paths, list_path)
+
+    try:
+        result = subprocess.run(
+            build_concat_command(list_path, output_path, audio_path, duration),
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE,
+        )
+    finally:
+        list_path.unlink(missing_ok=True)
+
+    if result.returncode != 0 or not output_path.exists():
+        if output_path.exists():
+            output_path.unlink()
+        error = result.stderr.decode("utf-8", errors="replace").strip()
+        raise FFmpegEncodeError(f"流拷贝拼接失败: {error[-500:]}")
+    return output_path
@@ -0,0 +1,241 @@
+# -*- coding: utf-8 -*-
+"""
+FFmpeg 管道编码器
+
+将原始 RGB 帧通过 stdin 直接写入 ffmpeg 子进程，并在同一次编码中混入音频。
+输出时长与帧数取自 ffmpeg 的 -progress 输出，无需重新打开文件校验。
+"""
+
+import subprocess
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterable, List, Optional, Tuple, Union
+
+import numpy as np
+from moviepy.config import FFMPEG_BINARY
+
+
+@dataclass
+class EncodeResult:
+    """编码结果"""
+
+    path: Path
+    duration: float  # ffmpeg 报告的输出时长（秒）
+    frames: int  # ffmpeg 报告的编码帧数
+
+
+class FFmpegEncodeError(RuntimeError):
+    """ffmpeg 编码失败"""
+
+
+class FFmpegPipeEncoder:
+    """通过 stdin 管道向 ffmpeg 写入原始帧的编码器"""
+
+    def __init__(
+        self,
+        output_path: Union[str, Path],
+        size: Tuple[int, int],
+        fps: float,
+        audio_path: Optional[Union[str, Path]] = None,
+        codec: str = "libx264",
+        preset: str = "medium",
+        audio_codec: str = "aac",
+        ffmpeg_params: Optional[List[str]] = None,
+        ffmpeg_binary: str = FFMPEG_BINARY,
+    ):
+        """初始化编码器
+
+        Args:
+            output_path: 输出文件路径
+            size: 帧尺寸 (宽, 高)
+            fps: 帧率
+            audio_path: 需要混入的音频文件，None 表示无音频
+            codec: 视频编码器
+            preset: 编码预设
+            audio_codec: 音频编码器
+            ffmpeg_params: 附加的输出参数
+            ffmpeg_binary: ffmpeg 可执行文件路径
+        """
+        self.output_path = Path(output_path)
+        self.size = (int(size[0]), int(size[1]))
+        self.fps = fps
+        self.audio_path = Path(audio_path) if audio_path else None
+        self.codec = codec
+        self.preset = preset
+        self.audio_codec = audio_codec
+        self.ffmpeg_params = list(ffmpeg_params or [])
+        self.ffmpeg_binary = ffmpeg_binary
+
+        self.frames_written = 0
+        self.result: Optional[EncodeResult] = None
+        self._proc: Optional[subprocess.Popen] = None
+        self._reader: Optional[threading.Thread] = None
+        self._stderr_lines: List[str] = []
+
+    def build_command(self) -> List[str]:
+        """构建 ffmpeg 命令行"""
+        width, height = self.size
+        cmd = [
+            self.ffmpeg_binary,
+            "-y",
+            "-hide_banner",
+            "-loglevel",
+            "error",
+            "-nostats",
+            "-progress",
+            "pipe:2",
+            "-f",
+            "rawvideo",
+            "-vcodec",
+            "rawvideo",
+            "-s",
+            f"{width}x{height}",
+            "-pix_fmt",
+            "rgb24",
+            "-r",
+            f"{self.fps}",
+            "-i",
+            "-",
+        ]
+        if self.audio_path:
+            cmd += ["-i", str(self.audio_path), "-map", "0:v:0", "-map", "1:a:0"]
+
+        cmd += ["-c:v", self.codec, "-preset", self.preset]
+        if self.audio_path:
+            cmd += ["-c:a", self.audio_codec]
+        cmd += self.ffmpeg_params
+        cmd.append(str(self.output_path))
+        return cmd
+
+    def open(self) -> "FFmpegPipeEncoder":
+        """启动 ffmpeg 子进程"""
+        self.output_path.parent.mkdir(parents=True, exist_ok=True)
+        self._proc = subprocess.Popen(
+            self.build_command(),
+            stdin=subprocess.PIPE,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE,
+        )
+        # 持续读取 stderr，避免管道写满导致死锁
+        self._reader = threading.Thread(target=self._drain_stderr, daemon=True)
+        self._reader.start()
+        return self
+
+    def write_frame(self, frame: np.ndarray):
+        """写入一帧 RGB 图像"""
+        if self._proc is None:
+            raise FFmpegEncodeError("编码器尚未启动")
+
+        height, width = frame.shape[:2]
+        if (width, height) != self.size:
+            raise ValueError(f"帧尺寸 {(width, height)} 与编码尺寸 {self.size} 不一致")
+
+        try:
+            self._proc.stdin.write(
+                np.ascontiguousarray(frame[..., :3], dtype=np.uint8).data
+            )
+        except (BrokenPipeError, OSError) as e:
+            self._proc.wait()
+            self._reader.join()
+            raise FFmpegEncodeError(f"ffmpeg 提前退出: {self._error_output()}") from e
+        self.frames_written += 1
+
+    def write_frames(self, frames: Iterable[np.ndarray]):
+        """批量写入帧"""
+        for frame in frames:
+            self.write_frame(frame)
+
+    def close(self) -> EncodeResult:
+        """结束输入并等待 ffmpeg 完成，返回 ffmpeg 报告的编码结果"""
+        if self._proc is None:
+            raise FFmpegEncodeError("编码器尚未启动")
+
+        try:
+            self._proc.stdin.close()
+        except (BrokenPipeError, OSError):
+            pass
+        returncode = self._proc.wait()
+        self._reader.join()
+        self._proc = None
+
+        if returncode != 0:
+            raise FFmpegEncodeError(
+                f"ffmpeg 退出码 {returncode}: {self._error_output()}"
+            )
+
+        progress = self.parse_progress(self._stderr_lines)
+        self.result = EncodeResult(
+            path=self.output_path,
+            duration=progress.get("out_time_us", 0) / 1_000_000,
+            frames=int(progress.get("frame", 0)),
+        )
+        return self.result
+
+    def abort(self):
+        """终止编码并删除不完整的输出文件"""
+        if self._proc is not None:
+            self._proc.kill()
+            self._proc.wait()
+            self._reader.join()
+            self._proc = None
+        if self.output_path.exists():
+            self.output_path.unlink()
+
+    def __enter__(self) -> "FFmpegPipeEncoder":
+        return self.open()
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+        return False
+
+    @staticmethod
+    def parse_progress(lines: Iterable[str]) -> dict:
+        """解析 -progress 输出，返回最后一次报告的数值字段"""
+        progress = {}
+        for line in lines:
+            key, sep, value = line.partition("=")
+            if not sep:
+                continue
+            try:
+                progress[key.strip()] = int(value.strip())
+            except ValueError:
+                continue
+        return progress
+
+    def _drain_stderr(self):
+        for raw in self._proc.stderr:
+            self._stderr_lines.append(raw.decode("utf-8", errors="replace").rstrip())
+
+    def _error_output(self) -> str:
+        errors = [line for line in self._stderr_lines if "=" not in line]
+        return "\n".join(errors[-10:]) or "无错误输出"
+
+
+def encode_clip(
+    clip,
+    output_path: Union[str, Path],
+    fps: float,
+    audio_path: Optional[Union[str, Path]] = None,
+    **encoder_kwargs,
+) -> EncodeResult:
+    """将 MoviePy 片段的帧直接写入 ffmpeg 编码
+
+    Args:
+        clip: MoviePy 视频片段
+        output_path: 输出文件路径
+        fps: 帧率
+        audio_path: 需要混入的音频文件
+        **encoder_kwargs: 传递给 FFmpegPipeEncoder 的其他参数
+
+    Returns:
+        EncodeResult: ffmpeg 报告的编码结果
+    """
+    with FFmpegPipeEncoder(
+        output_path, clip.size, fps, audio_path=audio_path, **encoder_kwargs
+    ) as encoder:
+        encoder.write_frames(clip.iter_frames(fps=fps, dtype="uint8"))
+    return encoder.result
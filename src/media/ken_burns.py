@@ -0,0 +1,187 @@
+# -*- coding: utf-8 -*-
+"""
+Ken Burns 帧生成器
+
+将静态图片渲染为缓慢平移的视频帧。所有时间点的裁剪窗口一次性向量化计算，
+源图只在初始化时重采样一次，之后每一帧都是预计算图像上的切片，
+通过 make_frame(t) 按需提供给 MoviePy，不会预先生成整段帧序列。
+"""
+
+from typing import Tuple
+
+import numpy as np
+from PIL import Image
+
+from .motion_planner import MotionPlan
+
+
+class KenBurnsRenderer:
+    """Ken Burns 平移效果渲染器
+
+    裁剪窗口为原图的 crop_ratio 倍，随时间沿一个方向匀速移动，裁剪结果再放大回原图尺寸。
+    为避免逐帧 crop + resize，初始化时把源图放大 1/crop_ratio 倍，使裁剪窗口与输出像素
+    一一对应；再沿移动方向预先生成 subpixel_steps 个亚像素相位图，逐帧只需整数偏移切片。
+    内存占用约为 subpixel_steps 张放大后的源图，与片段时长无关。
+    """
+
+    def __init__(
+        self,
+        image: Image.Image,
+        duration: float,
+        fps: int,
+        move_on_x: bool,
+        move_positive: bool,
+        crop_ratio: float = 0.9,
+        subpixel_steps: int = 4,
+    ):
+        """初始化渲染器
+
+        Args:
+            image: 源图片
+            duration: 片段时长（秒）
+            fps: 帧率
+            move_on_x: 是否沿水平方向移动（否则沿垂直方向）
+            move_positive: 是否沿坐标正方向移动
+            crop_ratio: 裁剪窗口相对原图的比例
+            subpixel_steps: 每像素的亚像素相位数，1 表示按整数像素移动
+        """
+        if duration <= 0:
+            raise ValueError(f"片段时长必须大于0: {duration}")
+        if not 0 < crop_ratio <= 1:
+            raise ValueError(f"裁剪比例必须在 (0, 1] 之间: {crop_ratio}")
+
+        self.image = image.convert("RGB")
+        self.width, self.height = self.image.size
+        self.duration = duration
+        self.fps = fps
+        self.move_on_x = move_on_x
+        self.move_positive = move_positive
+        self.crop_ratio = crop_ratio
+        self.subpixel_steps = max(int(subpixel_steps), 1)
+        self.n_frames = max(int(fps * duration), 1)
+
+        self.crop_width = self.width * crop_ratio
+        self.crop_height = self.height * crop_ratio
+
+        # 放大源图，使裁剪窗口恰好对应输出尺寸
+        up_width = max(round(self.width / crop_ratio), self.width)
+        up_height = max(round(self.height / crop_ratio), self.height)
+        self._scale_x = up_width / self.width
+        self._scale_y = up_height / self.height
+        upscaled = np.asarray(
+            self.image.resize((up_width, up_height), Image.BICUBIC), dtype=np.uint8
+        )
+        self._phases = self._build_phases(upscaled)
+
+        # 一次性计算所有帧的裁剪窗口，并换算为放大图上的量化偏移
+        times = np.arange(self.n_frames) / fps
+        lefts, uppers = self.crop_windows(times)
+        if move_on_x:
+            moving = lefts * self._scale_x
+            max_offset = up_width - self.width
+            self._fixed_offset = int(round((up_height - self.height) / 2))
+        else:
+            moving = uppers * self._scale_y
+            max_offset = up_height - self.height
+            self._fixed_offset = int(round((up_width - self.width) / 2))
+
+        quantized = np.rint(moving * self.subpixel_steps).astype(np.int64)
+        quantized = np.clip(quantized, 0, max_offset * self.subpixel_steps)
+        self._frame_offsets = quantized // self.subpixel_steps
+        self._frame_phases = quantized % self.subpixel_steps
+
+    @classmethod
+    def from_plan(
+        cls,
+        image: Image.Image,
+        duration: float,
+        fps: int,
+        plan: "MotionPlan",
+        subpixel_steps: int = 4,
+    ) -> "KenBurnsRenderer":
+        """按运动规划创建渲染器"""
+        return cls(
+            image,
+            duration,
+            fps,
+            plan.move_on_x,
+            plan.move_positive,
+            crop_ratio=plan.crop_ratio,
+            subpixel_steps=subpixel_steps,
+        )
+
+    @property
+    def size(self) -> Tuple[int, int]:
+        """输出帧尺寸 (宽, 高)"""
+        return self.width, self.height
+
+    def crop_windows(self, times: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """向量化计算给定时间点的裁剪窗口左上角（原图坐标）
+
+        Args:
+            times: 时间点数组（秒）
+
+        Returns:
+            (left 数组, upper 数组)
+        """
+        times = np.asarray(times, dtype=np.float64)
+        max_left = self.width - self.crop_width
+        max_upper = self.height - self.crop_height
+        x_speed = max_left / self.duration
+        y_speed = max_upper / self.duration
+
+        if self.move_on_x:
+            if self.move_positive:
+                lefts = np.minimum(x_speed * times, max_left)
+            else:
+                lefts = np.maximum(max_left - x_speed * times, 0)
+            uppers = np.full_like(times, max_upper / 2)
+        else:
+            lefts = np.full_like(times, max_left / 2)
+            if self.move_positive:
+                uppers = np.minimum(y_speed * times, max_upper)
+            else:
+                uppers = np.maximum(max_upper - y_speed * times, 0)
+
+        return lefts, uppers
+
+    def frame_index(self, t: float) -> int:
+        """将时间换算为帧序号"""
+        return int(np.clip(round(t * self.fps), 0, self.n_frames - 1))
+
+    def make_frame(self, t: float) -> np.ndarray:
+        """生成时间 t 处的帧（MoviePy frame_function）
+
+        返回的是预计算相位图上的只读视图，调用方不应原地修改。
+        """
+        index = self.frame_index(t)
+        phase = self._phases[self._frame_phases[index]]
+        offset = self._frame_offsets[index]
+        fixed = self._fixed_offset
+
+        if self.move_on_x:
+            return phase[fixed : fixed + self.height, offset : offset + self.width]
+        return phase[offset : offset + self.height, fixed : fixed + self.width]
+
+    def _build_phases(self, upscaled: np.ndarray) -> list:
+        """沿移动方向生成亚像素相位图（双线性插值）"""
+        axis = 1 if self.move_on_x else 0
+        upscaled.setflags(write=False)
+        phases = [upscaled]
+        if self.subpixel_steps == 1:
+            return phases
+
+        # 末尾复制一行/列作为插值的右邻居
+        edge = np.take(upscaled, [-1], axis=axis)
+        neighbour = np.concatenate(
+            [np.take(upscaled, np.arange(1, upscaled.shape[axis]), axis=axis), edge],
+            axis=axis,
+        )
+        base = upscaled.astype(np.float32)
+        delta = neighbour.astype(np.float32) - base
+        for step in range(1, self.subpixel_steps):
+            weight = step / self.subpixel_steps
+            phase = np.clip(base + delta * weight + 0.5, 0, 255).astype(np.uint8)
+            phase.setflags(write=False)
+            phases.append(phase)
+        return phases
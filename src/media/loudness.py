@@ -0,0 +1,232 @@
+# -*- coding: utf-8 -*-
+"""
+响度归一化与重采样
+
+按 ITU-R BS.1770 / EBU R128 的方法估计片段的积分响度：K 加权滤波后按 400ms 块
+（75% 重叠）计算均方，经 -70 LUFS 绝对门限和 -10 LU 相对门限后取平均。
+随后施加增益到目标响度（峰值不超过上限）、重采样到目标采样率并转换为 16 位 PCM，
+全部以 NumPy 向量化计算，一次完成。
+
+K 加权滤波在频域按滤波器的幅频响应施加（零相位），对块能量的估计与时域滤波一致；
+重采样同样在频域完成（带限插值）。
+"""
+
+import io
+import math
+import wave
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+
+# 绝对门限与相对门限
+ABSOLUTE_GATE = -70.0
+RELATIVE_GATE = -10.0
+
+_BLOCK = 0.4
+_STEP = 0.1
+_DTYPES = {2: "<i2", 4: "<i4"}
+
+
+def _biquad_response(b, a, freqs, rate):
+    """二阶滤波器在给定频率上的幅频响应"""
+    z = np.exp(-2j * np.pi * freqs / rate)
+    numerator = b[0] + b[1] * z + b[2] * z**2
+    denominator = a[0] + a[1] * z + a[2] * z**2
+    return np.abs(numerator / denominator)
+
+
+def k_weighting_response(freqs: np.ndarray, rate: int) -> np.ndarray:
+    """K 加权（高频搁架 + 高通）在给定频率上的幅频响应
+
+    滤波器系数按 BS.1770 的模拟原型在任意采样率下由双线性变换得到。
+    """
+    # 高频搁架：+4 dB，约 1.68 kHz
+    gain_db, q, fc = 3.999843853973347, 0.7071752369554196, 1681.974450955533
+    k = math.tan(math.pi * fc / rate)
+    vh = 10 ** (gain_db / 20)
+    vb = vh**0.4996667741545416
+    a0 = 1 + k / q + k * k
+    shelf_b = [
+        (vh + vb * k / q + k * k) / a0,
+        2 * (k * k - vh) / a0,
+        (vh - vb * k / q + k * k) / a0,
+    ]
+    shelf_a = [1.0, 2 * (k * k - 1) / a0, (1 - k / q + k * k) / a0]
+
+    # 高通：约 38 Hz
+    q, fc = 0.5003270373238773, 38.13547087602444
+    k = math.tan(math.pi * fc / rate)
+    a0 = 1 + k / q + k * k
+    high_b = [1.0, -2.0, 1.0]
+    high_a = [1.0, 2 * (k * k - 1) / a0, (1 - k / q + k * k) / a0]
+
+    return _biquad_response(shelf_b, shelf_a, freqs, rate) * _biquad_response(
+        high_b, high_a, freqs, rate
+    )
+
+
+def integrated_loudness(samples: np.ndarray, rate: int) -> float:
+    """积分响度（LUFS）
+
+    Args:
+        samples: 浮点采样，形状为 (帧数, 声道数)，满幅为 ±1
+        rate: 采样率
+
+    Returns:
+        float: 积分响度，静音时为 -inf
+    """
+    total = len(samples)
+    if total == 0:
+        return float("-inf")
+
+    # 末尾补零（至少 0.5 秒）避免滤波的循环卷积把结尾混入开头
+    size = 1 << int(total + rate // 2 - 1).bit_length()
+    spectrum = np.fft.rfft(samples, n=size, axis=0)
+    spectrum *= k_weighting_response(np.fft.rfftfreq(size, 1 / rate), rate)[:, None]
+    weighted = np.fft.irfft(spectrum, n=size, axis=0)[:total]
+
+    # 各块各声道的均方由累积和相减得到（单声道和立体声的声道权重均为 1）
+    block = int(round(_BLOCK * rate))
+    step = int(round(_STEP * rate))
+    cumulative = np.concatenate(
+        (np.zeros((1, samples.shape[1])), np.cumsum(weighted**2, axis=0))
+    )
+    if total < block:
+        starts, block = np.array([0]), total
+    else:
+        starts = np.arange(0, total - block + 1, step)
+    power = ((cumulative[starts + block] - cumulative[starts]) / block).sum(axis=1)
+
+    with np.errstate(divide="ignore"):
+        loudness = -0.691 + 10 * np.log10(power)
+    gated = power[loudness > ABSOLUTE_GATE]
+    if len(gated) == 0:
+        return float("-inf")
+    threshold = -0.691 + 10 * np.log10(gated.mean()) + RELATIVE_GATE
+    gated = power[(loudness > ABSOLUTE_GATE) & (loudness > threshold)]
+    return float(-0.691 + 10 * np.log10(gated.mean()))
+
+
+def resample(samples: np.ndarray, rate: int, target_rate: int) -> np.ndarray:
+    """频域带限重采样
+
+    Args:
+        samples: 浮点采样，形状为 (帧数, 声道数)
+        rate: 原采样率
+        target_rate: 目标采样率
+
+    Returns:
+        np.ndarray: 重采样后的采样
+    """
+    if rate == target_rate or len(samples) == 0:
+        return samples
+    total = len(samples)
+    target = int(round(total * target_rate / rate))
+    spectrum = np.fft.rfft(samples, axis=0)
+    bins = target // 2 + 1
+    if bins <= len(spectrum):
+        spectrum = spectrum[:bins]
+    else:
+        padding = np.zeros((bins - len(spectrum), samples.shape[1]), spectrum.dtype)
+        spectrum = np.concatenate((spectrum, padding))
+    return np.fft.irfft(spectrum, n=target, axis=0) * (target / total)
+
+
+def _read(data: bytes) -> Tuple[np.ndarray, Any]:
+    with wave.open(io.BytesIO(data), "rb") as reader:
+        params = reader.getparams()
+        frames = reader.readframes(params.nframes)
+    if params.sampwidth not in _DTYPES:
+        raise ValueError(f"不支持的采样位深: {params.sampwidth * 8} 位")
+    scale = float(2 ** (params.sampwidth * 8 - 1))
+    samples = np.frombuffer(frames, dtype=_DTYPES[params.sampwidth]) / scale
+    return samples.reshape(-1, params.nchannels), params
+
+
+def _peak_dbfs(samples: np.ndarray) -> float:
+    peak = float(np.abs(samples).max()) if len(samples) else 0.0
+    return 20 * math.log10(peak) if peak > 0 else float("-inf")
+
+
+def _finite(value: float) -> Optional[float]:
+    return round(value, 2) if math.isfinite(value) else None
+
+
+def audio_stats(data: bytes) -> Dict[str, Any]:
+    """读取 WAV 的时长、采样数、格式、响度和峰值（不做任何处理）
+
+    Args:
+        data: WAV 文件内容（16 或 32 位 PCM）
+
+    Returns:
+        Dict[str, Any]: 统计信息，响度和峰值在静音时为 None
+    """
+    samples, params = _read(data)
+    return {
+        "duration": len(samples) / params.framerate,
+        "samples": len(samples),
+        "sample_rate": params.framerate,
+        "channels": params.nchannels,
+        "loudness": _finite(integrated_loudness(samples, params.framerate)),
+        "peak_dbfs": _finite(_peak_dbfs(samples)),
+        "bytes": len(data),
+    }
+
+
+def normalize_wav(
+    data: bytes,
+    target_lufs: Optional[float] = -16.0,
+    peak_limit: float = -1.0,
+    sample_rate: int = 0,
+) -> Tuple[bytes, Dict[str, Any]]:
+    """响度归一化、重采样并转换为 16 位 PCM
+
+    Args:
+        data: WAV 文件内容（16 或 32 位 PCM）
+        target_lufs: 目标积分响度，None 表示不调整增益
+        peak_limit: 峰值上限（dBFS），增益会被限制以免超过
+        sample_rate: 目标采样率，0 表示保持原采样率
+
+    Returns:
+        Tuple[bytes, Dict[str, Any]]: 处理后的 WAV 内容和统计信息
+            （时长、采样数、格式、处理前后的响度、增益和峰值）
+    """
+    samples, params = _read(data)
+    rate = params.framerate
+    source_loudness = integrated_loudness(samples, rate)
+
+    gain_db = 0.0
+    if target_lufs is not None and math.isfinite(source_loudness):
+        gain_db = target_lufs - source_loudness
+        # 峰值受限时降低增益，而不是削波
+        headroom = peak_limit - _peak_dbfs(samples)
+        gain_db = min(gain_db, headroom)
+    processed = samples * (10 ** (gain_db / 20))
+
+    target_rate = sample_rate or rate
+    processed = resample(processed, rate, target_rate)
+    pcm = np.clip(np.round(processed * 32768), -32768, 32767).astype("<i2")
+
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as writer:
+        writer.setnchannels(params.nchannels)
+        writer.setsampwidth(2)
+        writer.setframerate(target_rate)
+        writer.writeframes(pcm.tobytes())
+    output = buffer.getvalue()
+
+    result = pcm.reshape(-1, params.nchannels) / 32768.0
+    stats = {
+        "duration": len(result) / target_rate,
+        "samples": len(result),
+        "sample_rate": target_rate,
+        "channels": params.nchannels,
+        "source_sample_rate": rate,
+        "source_loudness": _finite(source_loudness),
+        "target_loudness": target_lufs,
+        "gain_db": round(gain_db, 2),
+        "loudness": _finite(integrated_loudness(result, target_rate)),
+        "peak_dbfs": _finite(_peak_dbfs(result)),
+        "bytes": len(output),
+    }
+    return output, stats
@@ -0,0 +1,134 @@
+# -*- coding: utf-8 -*-
+"""
+静音裁剪
+
+在内存中对 WAV 的 PCM 数据做向量化的静音检测：按滑动窗口计算 RMS，
+低于阈值的窗口合并为静音区间，非静音区间两侧各保留一小段静音后拼接。
+行为与 pydub 的 split_on_silence + 拼接相同，但无需逐块在 Python 中迭代，
+也不必先写盘再读回。裁剪时可以同时换算字词时间等时间点，使其与裁剪后的音频对齐。
+"""
+
+import io
+import wave
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+_DTYPES = {2: "<i2", 4: "<i4"}
+
+
+def trim_silence(
+    data: bytes,
+    min_silence_len: int = 10,
+    silence_thresh: float = -50.0,
+    keep_silence: int = 100,
+    seek_step: int = 1,
+) -> Optional[bytes]:
+    """移除 WAV 音频中的静音段
+
+    Args:
+        data: WAV 文件内容（16 或 32 位 PCM）
+        min_silence_len: 判定为静音的最短时长（毫秒）
+        silence_thresh: 静音阈值（dBFS），窗口 RMS 不高于该值视为静音
+        keep_silence: 每段非静音两侧保留的静音时长（毫秒），相邻段之间不足时平分
+        seek_step: 检测窗口的步长（毫秒）
+
+    Returns:
+        裁剪后的 WAV 文件内容；没有可裁剪的静音时返回原始内容；
+        整段都是静音时返回 None
+
+    Raises:
+        ValueError: 不支持的采样位深
+    """
+    trimmed, _ = trim_silence_timed(
+        data, (), min_silence_len, silence_thresh, keep_silence, seek_step
+    )
+    return trimmed
+
+
+def trim_silence_timed(
+    data: bytes,
+    times: Sequence[float],
+    min_silence_len: int = 10,
+    silence_thresh: float = -50.0,
+    keep_silence: int = 100,
+    seek_step: int = 1,
+) -> Tuple[Optional[bytes], List[float]]:
+    """移除静音段，并把原音频中的时间点换算为裁剪后音频中的时间
+
+    用于保持合成时记录的字词时间与裁剪后的音频对齐。
+
+    Args:
+        data: WAV 文件内容（16 或 32 位 PCM）
+        times: 原音频中的时间点（秒）
+        其余参数同 trim_silence
+
+    Returns:
+        裁剪后的 WAV 文件内容（同 trim_silence）和换算后的时间点；
+        未裁剪或整段都是静音时时间点不变
+
+    Raises:
+        ValueError: 不支持的采样位深
+    """
+    with wave.open(io.BytesIO(data), "rb") as reader:
+        params = reader.getparams()
+        frames = reader.readframes(params.nframes)
+    if params.sampwidth not in _DTYPES:
+        raise ValueError(f"不支持的采样位深: {params.sampwidth * 8} 位")
+
+    times = list(times)
+    samples = np.frombuffer(frames, dtype=_DTYPES[params.sampwidth])
+    samples = samples.reshape(-1, params.nchannels)
+    total = len(samples)
+    per_ms = params.framerate / 1000
+    window = int(min_silence_len * per_ms)
+    if total == 0 or window <= 0 or total < window:
+        return data, times
+
+    # 各窗口的平方和由累积和相减得到，窗口 RMS 覆盖所有声道
+    energy = np.square(samples, dtype=np.float64).sum(axis=1)
+    cumulative = np.concatenate(([0.0], np.cumsum(energy)))
+    step = max(1, int(seek_step * per_ms))
+    starts = np.arange(0, total - window + 1, step)
+    if starts[-1] != total - window:
+        starts = np.append(starts, total - window)
+    rms = np.sqrt(
+        (cumulative[starts + window] - cumulative[starts]) / (window * params.nchannels)
+    )
+    max_amplitude = float(2 ** (params.sampwidth * 8 - 1))
+    threshold = 10 ** (silence_thresh / 20) * max_amplitude
+
+    # 静音窗口覆盖到的帧即为静音区间
+    silent_starts = starts[rms <= threshold]
+    coverage = np.zeros(total + 1, dtype=np.int64)
+    np.add.at(coverage, silent_starts, 1)
+    np.add.at(coverage, silent_starts + window, -1)
+    voiced = np.cumsum(coverage[:total]) == 0
+    if not voiced.any():
+        return None, times
+
+    # 非静音帧向两侧扩展 keep_silence，重叠的部分只保留一次
+    keep = int(keep_silence * per_ms)
+    voiced_count = np.concatenate(([0], np.cumsum(voiced)))
+    index = np.arange(total)
+    lower = np.maximum(index - keep, 0)
+    upper = np.minimum(index + keep + 1, total)
+    kept = voiced_count[upper] - voiced_count[lower] > 0
+    if kept.all():
+        return data, times
+
+    if times:
+        # 原音频第 i 帧之前保留的帧数，即该帧在裁剪后音频中的位置
+        positions = np.concatenate(([0], np.cumsum(kept)))
+        frames_at = np.clip(
+            np.round(np.asarray(times) * params.framerate).astype(np.int64), 0, total
+        )
+        times = (positions[frames_at] / params.framerate).tolist()
+
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as writer:
+        writer.setnchannels(params.nchannels)
+        writer.setsampwidth(params.sampwidth)
+        writer.setframerate(params.framerate)
+        writer.writeframes(samples[kept].tobytes())
+    return buffer.getvalue(), times
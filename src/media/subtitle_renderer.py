@@ -0,0 +1,166 @@
+# -*- coding: utf-8 -*-
+"""
+字幕位图渲染
+
+字体在每个进程中只加载一次；字幕按（文本、字号、样式）渲染为 RGBA 位图并缓存，
+合成时作为静态叠加层直接与帧混合，不再为每个片段创建 TextClip 重新排版。
+"""
+
+import math
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import List, Optional, Tuple
+
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+
+# 字幕位图缓存的最大条目数（每个进程）
+BITMAP_CACHE_SIZE = 256
+
+# 分词：连续的非中日韩字符（单词及其后的空白）作为一个整体，中日韩字符逐字断行
+_CJK_RANGES = (
+    "\u3000-\u303f\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff\uff00-\uffef"
+)
+_TOKEN_PATTERN = re.compile(rf"[{_CJK_RANGES}]|[^\s{_CJK_RANGES}]+\s*|\s+")
+
+
+@dataclass(frozen=True)
+class SubtitleStyle:
+    """字幕样式"""
+
+    font: Optional[str]  # 字体文件路径或字体名称，None 使用默认字体
+    font_size: int
+    color: str = "white"
+    stroke_color: Optional[str] = "black"
+    stroke_width: int = 2
+    align: str = "center"  # left / center / right
+    max_width: Optional[int] = None  # 自动换行宽度（像素），None 表示不换行
+    line_spacing: int = 4
+
+
+@dataclass(frozen=True)
+class SubtitleBitmap:
+    """渲染后的字幕位图"""
+
+    rgb: np.ndarray  # (高, 宽, 3) uint8，只读
+    alpha: np.ndarray  # (高, 宽) uint8，只读
+
+    @property
+    def size(self) -> Tuple[int, int]:
+        """位图尺寸 (宽, 高)"""
+        return self.rgb.shape[1], self.rgb.shape[0]
+
+
+def dynamic_font_size(text: str, base_font_size: int) -> int:
+    """根据字幕长度动态计算字体大小，防止长字幕被截断"""
+    char_count = len(text)
+
+    if char_count <= 30:
+        return base_font_size
+    elif char_count <= 60:
+        return max(32, base_font_size - 8)
+    elif char_count <= 90:
+        return max(28, base_font_size - 12)
+    else:
+        return max(24, base_font_size - 16)
+
+
+@lru_cache(maxsize=32)
+def load_font(font: Optional[str], size: int) -> ImageFont.FreeTypeFont:
+    """加载字体（每个进程每种字体、字号只加载一次）
+
+    Args:
+        font: 字体文件路径或系统字体名称
+        size: 字号
+
+    Returns:
+        FreeTypeFont: 字体对象，找不到字体时使用 Pillow 内置默认字体
+    """
+    if font:
+        try:
+            return ImageFont.truetype(font, size)
+        except OSError:
+            print(f"警告: 无法加载字体 {font}，使用默认字体")
+    return ImageFont.load_default(size)
+
+
+def wrap_text(
+    text: str, font: ImageFont.FreeTypeFont, max_width: Optional[int]
+) -> List[str]:
+    """按像素宽度自动换行（中日韩文字逐字断行，其他文字按单词断行）"""
+    lines = []
+    for paragraph in text.splitlines() or [""]:
+        if not max_width:
+            lines.append(paragraph)
+            continue
+
+        line = ""
+        for token in _TOKEN_PATTERN.findall(paragraph):
+            candidate = line + token
+            if line and font.getlength(candidate.rstrip()) > max_width:
+                lines.append(line.rstrip())
+                line = token.lstrip()
+            else:
+                line = candidate
+        lines.append(line.rstrip())
+    return lines
+
+
+@lru_cache(maxsize=BITMAP_CACHE_SIZE)
+def render_subtitle(text: str, style: SubtitleStyle) -> SubtitleBitmap:
+    """将字幕渲染为 RGBA 位图（按文本和样式缓存）
+
+    Args:
+        text: 字幕文本
+        style: 字幕样式
+
+    Returns:
+        SubtitleBitmap: 字幕位图
+    """
+    font = load_font(style.font, style.font_size)
+    content = "\n".join(wrap_text(text, font, style.max_width))
+    stroke_width = style.stroke_width if style.stroke_color else 0
+
+    measure = ImageDraw.Draw(Image.new("L", (1, 1)))
+    bbox = measure.multiline_textbbox(
+        (0, 0),
+        content,
+        font=font,
+        spacing=style.line_spacing,
+        align=style.align,
+        stroke_width=stroke_width,
+    )
+    left, top = math.floor(bbox[0]), math.floor(bbox[1])
+    right, bottom = math.ceil(bbox[2]), math.ceil(bbox[3])
+    width = max(right - left, 1)
+    if style.max_width:
+        width = max(width, style.max_width)
+    height = max(bottom - top, 1)
+
+    # 在 max_width 宽的画布中按对齐方式放置文本，与 caption 模式的排版一致
+    if style.align == "center":
+        x = (width - (right - left)) / 2 - left
+    elif style.align == "right":
+        x = width - right
+    else:
+        x = -left
+
+    image = Image.new("RGBA", (width, height), (0, 0, 0, 0))
+    ImageDraw.Draw(image).multiline_text(
+        (x, -top),
+        content,
+        font=font,
+        fill=style.color,
+        spacing=style.line_spacing,
+        align=style.align,
+        stroke_width=stroke_width,
+        stroke_fill=style.stroke_color,
+    )
+
+    rgba = np.asarray(image, dtype=np.uint8)
+    rgb = np.ascontiguousarray(rgba[..., :3])
+    alpha = np.ascontiguousarray(rgba[..., 3])
+    rgb.setflags(write=False)
+    alpha.setflags(write=False)
+    return SubtitleBitmap(rgb=rgb, alpha=alpha)
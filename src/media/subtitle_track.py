@@ -0,0 +1,360 @@
+# -*- coding: utf-8 -*-
+"""
+字幕轨道输出
+
+按各片段时长生成 SRT / ASS 字幕文件（有配音字词时间的片段切分为带时间的短句），可作为外挂字幕、以 mov_text 软字幕封装进 MP4
+（视频流直接拷贝），或通过一次 ffmpeg subtitles 滤镜烧录进画面。
+修改字幕文本只需重新生成字幕轨道，无需重新渲染视频片段。
+"""
+
+import subprocess
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+from moviepy.config import FFMPEG_BINARY
+from PIL import ImageColor
+
+from .ffmpeg_encoder import FFmpegEncodeError
+
+PathLike = Union[str, Path]
+
+# 优先在标点处切分字幕，句末标点处总是切分
+_PAUSES = set("，、；：,;:—")
+_SENTENCE_ENDS = set("。！？!?.…")
+
+
+@dataclass(frozen=True)
+class SubtitleCue:
+    """一条字幕"""
+
+    start: float  # 开始时间（秒）
+    end: float  # 结束时间（秒）
+    text: str
+
+
+@dataclass(frozen=True)
+class AssStyle:
+    """ASS 字幕样式"""
+
+    font_name: str = "Arial"
+    font_size: int = 60
+    color: str = "white"
+    stroke_color: Optional[str] = "black"
+    stroke_width: int = 2
+    # 字幕顶部距画面底部的像素，负值表示距顶部，0 表示垂直居中
+    pixel_from_bottom: int = 50
+    wrap_ratio: float = 0.8  # 字幕区域占画面宽度的比例
+
+
+def split_timed_subtitle(
+    text: str,
+    words: Sequence[Dict[str, Any]],
+    duration: float,
+    max_chars: int,
+) -> List[SubtitleCue]:
+    """按配音的字词时间把一个片段的字幕切分为带时间的短句
+
+    字词按顺序在字幕文本中定位，每条短句不超过 max_chars 个字符，
+    优先在标点处切分；短句在其第一个词开始发音时出现，到下一句开始时消失。
+
+    Args:
+        text: 字幕文本
+        words: 字词时间（text、start，相对片段起点的秒数），按时间排列
+        duration: 片段时长（秒）
+        max_chars: 每条短句的最大字符数，不大于 0 时不切分
+
+    Returns:
+        List[SubtitleCue]: 相对片段起点的字幕列表；无法与字词对齐时整段为一条
+    """
+    text = text.strip()
+    if not text:
+        return []
+
+    # 字词在文本中的位置 (起始字符, 结束字符, 开始时间)
+    spans = []
+    cursor = 0
+    for word in words:
+        token = str(word.get("text", "")).strip()
+        position = text.find(token, cursor) if token else -1
+        if position >= 0:
+            spans.append((position, position + len(token), float(word["start"])))
+            cursor = position + len(token)
+    if max_chars <= 0 or len(text) <= max_chars or len(spans) < 2:
+        return [SubtitleCue(start=0.0, end=duration, text=text)]
+
+    # 每条短句从第 breaks[j] 个字词开始
+    breaks = [0]
+    pause = None
+    for k in range(1, len(spans)):
+        gap = set(text[spans[k - 1][0] : spans[k][0]])
+        chunk_start = spans[breaks[-1]][0] if len(breaks) > 1 else 0
+        if gap & _SENTENCE_ENDS:
+            breaks.append(k)
+            pause = None
+            continue
+        if gap & _PAUSES:
+            pause = k
+        if spans[k][1] - chunk_start > max_chars:
+            breaks.append(pause if pause is not None else k)
+            pause = None
+
+    cues = []
+    for j, first in enumerate(breaks):
+        begin = 0 if j == 0 else spans[first][0]
+        start = 0.0 if j == 0 else min(spans[first][2], duration)
+        if j + 1 < len(breaks):
+            end_char = spans[breaks[j + 1]][0]
+            end = min(spans[breaks[j + 1]][2], duration)
+        else:
+            end_char, end = len(text), duration
+        chunk = text[begin:end_char].strip()
+        if chunk and end > start:
+            cues.append(SubtitleCue(start=start, end=end, text=chunk))
+    return cues or [SubtitleCue(start=0.0, end=duration, text=text)]
+
+
+def build_cues(
+    texts: Sequence[str],
+    durations: Sequence[float],
+    timings: Optional[Sequence[Optional[Sequence[Dict[str, Any]]]]] = None,
+    max_chars: int = 0,
+) -> List[SubtitleCue]:
+    """按片段时长累加生成字幕时间轴
+
+    Args:
+        texts: 各片段的字幕文本
+        durations: 各片段时长（秒）
+        timings: 各片段配音的字词时间，有字词时间的片段按 max_chars 切分为短句
+        max_chars: 每条短句的最大字符数，0 表示不切分
+
+    Returns:
+        List[SubtitleCue]: 字幕列表（空字幕不输出，但仍占用时间）
+    """
+    cues = []
+    start = 0.0
+    timings = timings or []
+    for i, (text, duration) in enumerate(zip(texts, durations)):
+        end = start + duration
+        words = timings[i] if i < len(timings) else None
+        if text and text.strip():
+            if words and max_chars > 0:
+                for cue in split_timed_subtitle(text, words, duration, max_chars):
+                    cues.append(
+                        SubtitleCue(
+                            start=start + cue.start, end=start + cue.end, text=cue.text
+                        )
+                    )
+            else:
+                cues.append(SubtitleCue(start=start, end=end, text=text.strip()))
+        start = end
+    return cues
+
+
+def _srt_time(seconds: float) -> str:
+    millis = int(round(seconds * 1000))
+    hours, millis = divmod(millis, 3_600_000)
+    minutes, millis = divmod(millis, 60_000)
+    secs, millis = divmod(millis, 1000)
+    return f"{hours:02d}:{minutes:02d}:{secs:02d},{millis:03d}"
+
+
+def _ass_time(seconds: float) -> str:
+    centis = int(round(seconds * 100))
+    hours, centis = divmod(centis, 360_000)
+    minutes, centis = divmod(centis, 6000)
+    secs, centis = divmod(centis, 100)
+    return f"{hours:d}:{minutes:02d}:{secs:02d}.{centis:02d}"
+
+
+def _ass_color(color: Optional[str]) -> str:
+    """颜色转换为 ASS 的 &HAABBGGRR 格式"""
+    if not color:
+        return "&HFF000000"
+    red, green, blue = ImageColor.getrgb(color)[:3]
+    return f"&H00{blue:02X}{green:02X}{red:02X}"
+
+
+def format_srt(cues: Sequence[SubtitleCue]) -> str:
+    """生成 SRT 字幕内容"""
+    blocks = []
+    for n, cue in enumerate(cues, start=1):
+        blocks.append(
+            f"{n}\n{_srt_time(cue.start)} --> {_srt_time(cue.end)}\n{cue.text}\n"
+        )
+    return "\n".join(blocks)
+
+
+def format_ass(
+    cues: Sequence[SubtitleCue], style: AssStyle, frame_size: Tuple[int, int]
+) -> str:
+    """生成 ASS 字幕内容
+
+    Args:
+        cues: 字幕列表
+        style: 字幕样式
+        frame_size: 视频尺寸 (宽, 高)，作为 ASS 坐标系
+
+    Returns:
+        str: ASS 文件内容
+    """
+    width, height = frame_size
+    margin_h = round(width * (1 - style.wrap_ratio) / 2)
+    # 与烧录字幕的定位方式一致：以字幕顶部定位
+    if style.pixel_from_bottom < 0:
+        alignment, margin_v = 8, abs(style.pixel_from_bottom)
+    elif style.pixel_from_bottom == 0:
+        alignment, margin_v = 5, 0
+    else:
+        alignment, margin_v = 8, max(height - style.pixel_from_bottom, 0)
+    outline = style.stroke_width if style.stroke_color else 0
+
+    lines = [
+        "[Script Info]",
+        "ScriptType: v4.00+",
+        f"PlayResX: {width}",
+        f"PlayResY: {height}",
+        "WrapStyle: 0",
+        "ScaledBorderAndShadow: yes",
+        "",
+        "[V4+ Styles]",
+        "Format: Name, Fontname, Fontsize, PrimaryColour, SecondaryColour, "
+        "OutlineColour, BackColour, Bold, Italic, Underline, StrikeOut, ScaleX, "
+        "ScaleY, Spacing, Angle, BorderStyle, Outline, Shadow, Alignment, "
+        "MarginL, MarginR, MarginV, Encoding",
+        f"Style: Default,{style.font_name},{style.font_size},"
+        f"{_ass_color(style.color)},{_ass_color(style.color)},"
+        f"{_ass_color(style.stroke_color)},&H00000000,0,0,0,0,100,100,0,0,1,"
+        f"{outline},0,{alignment},{margin_h},{margin_h},{margin_v},1",
+        "",
+        "[Events]",
+        "Format: Layer, Start, End, Style, Name, MarginL, MarginR, MarginV, "
+        "Effect, Text",
+    ]
+    for cue in cues:
+        text = cue.text.replace("\n", "\\N")
+        lines.append(
+            f"Dialogue: 0,{_ass_time(cue.start)},{_ass_time(cue.end)},"
+            f"Default,,0,0,0,,{text}"
+        )
+    return "\n".join(lines) + "\n"
+
+
+def write_srt(cues: Sequence[SubtitleCue], path: PathLike) -> Path:
+    """写入 SRT 文件"""
+    path = Path(path)
+    path.write_text(format_srt(cues), encoding="utf-8")
+    return path
+
+
+def write_ass(
+    cues: Sequence[SubtitleCue],
+    path: PathLike,
+    style: AssStyle,
+    frame_size: Tuple[int, int],
+) -> Path:
+    """写入 ASS 文件"""
+    path = Path(path)
+    path.write_text(format_ass(cues, style, frame_size), encoding="utf-8")
+    return path
+
+
+def _escape_filter_path(path: PathLike) -> str:
+    """转义 ffmpeg 滤镜参数中的路径"""
+    escaped = str(Path(path).resolve()).replace("\\", "/")
+    for char in (":", "'", "[", "]", ",", ";"):
+        escaped = escaped.replace(char, f"\\{char}")
+    return escaped
+
+
+def _run_ffmpeg(cmd: List[str], output_path: Path, action: str):
+    result = subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    if result.returncode != 0 or not output_path.exists():
+        if output_path.exists():
+            output_path.unlink()
+        error = result.stderr.decode("utf-8", errors="replace").strip()
+        raise FFmpegEncodeError(f"{action}失败: {error[-500:]}")
+
+
+def mux_soft_subtitles(
+    video_path: PathLike,
+    subtitle_path: PathLike,
+    output_path: PathLike,
+    language: str = "chi",
+    ffmpeg_binary: str = FFMPEG_BINARY,
+) -> Path:
+    """将字幕以 mov_text 软字幕轨道封装进 MP4（音视频流直接拷贝）
+
+    Raises:
+        FFmpegEncodeError: ffmpeg 执行失败
+    """
+    output_path = Path(output_path)
+    cmd = [
+        ffmpeg_binary,
+        "-y",
+        "-hide_banner",
+        "-loglevel",
+        "error",
+        "-i",
+        str(video_path),
+        "-i",
+        str(subtitle_path),
+        "-map",
+        "0:v",
+        "-map",
+        "0:a?",
+        "-map",
+        "1:0",
+        "-c",
+        "copy",
+        "-c:s",
+        "mov_text",
+        "-metadata:s:s:0",
+        f"language={language}",
+        "-movflags",
+        "+faststart",
+        str(output_path),
+    ]
+    _run_ffmpeg(cmd, output_path, "封装软字幕")
+    return output_path
+
+
+def burn_subtitles(
+    video_path: PathLike,
+    subtitle_path: PathLike,
+    output_path: PathLike,
+    fonts_dir: Optional[PathLike] = None,
+    preset: str = "medium",
+    ffmpeg_params: Optional[List[str]] = None,
+    ffmpeg_binary: str = FFMPEG_BINARY,
+) -> Path:
+    """通过一次 subtitles 滤镜将字幕烧录进画面（音频流直接拷贝）
+
+    Raises:
+        FFmpegEncodeError: ffmpeg 执行失败
+    """
+    output_path = Path(output_path)
+    subtitle_filter = f"subtitles=filename={_escape_filter_path(subtitle_path)}"
+    if fonts_dir:
+        subtitle_filter += f":fontsdir={_escape_filter_path(fonts_dir)}"
+    cmd = [
+        ffmpeg_binary,
+        "-y",
+        "-hide_banner",
+        "-loglevel",
+        "error",
+        "-i",
+        str(video_path),
+        "-vf",
+        subtitle_filter,
+        "-c:v",
+        "libx264",
+        "-preset",
+        preset,
+        "-c:a",
+        "copy",
+    ]
+    cmd += list(ffmpeg_params or [])
+    cmd.append(str(output_path))
+    _run_ffmpeg(cmd, output_path, "烧录字幕")
+    return output_path
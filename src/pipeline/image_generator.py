@@ -2,9 +2,12 @@ import base64
 import json
 import logging
 import os
+import re
+import shlex
 import sys
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple, Union
+from typing import Dict, List, Optional, Sequence, Tuple, Union
 
 import requests
 from tqdm import tqdm
@@ -13,13 +16,59 @@ from tqdm import tqdm
 project_root = Path(__file__).parent.parent.parent
 sys.path.insert(0, str(project_root))
 
+from src import profiler
 from src.config import config
+from src.content_cache import ContentCache, make_key
+from src.models.image_models import ImageServiceType
+from src.services.image.balancer import NoHealthyEndpointError, SDLoadBalancer
+from src.services.image.streaming import (
+    ImageStreamDecoder,
+    ImageStreamError,
+    decode_stream,
+    write_images,
+)
 
 # 配置日志
 logging.basicConfig(
     level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
 )
 
+# 图片缓存版本，缓存键的组成或含义变化时递增
+IMAGE_CACHE_VERSION = 1
+
+# 流式读取响应的块大小
+RESPONSE_CHUNK = 64 * 1024
+
+# WebUI 内置的逐行提示词脚本，用于在一次请求中生成多个场景
+PROMPTS_SCRIPT = "prompts from file or textbox"
+
+_LORA_TAG = re.compile(r"<lora:[^>]*>", re.IGNORECASE)
+
+
+def send_request(url: str, data: Dict, stream: bool = False) -> requests.Response:
+    """发送POST请求到Stable Diffusion API，失败时抛出 requests 异常
+
+    Args:
+        url: API端点URL
+        data: 请求数据
+        stream: 是否流式读取响应体（调用方负责读取并关闭响应）
+    """
+    profiler.count(profiler.NETWORK_CALLS)
+    options = {"stream": True} if stream else {}
+    response = requests.post(
+        url,
+        data=json.dumps(data),
+        headers={"Content-Type": "application/json"},
+        timeout=300,  # 5分钟超时
+        **options,
+    )
+    try:
+        response.raise_for_status()  # 抛出HTTP错误
+    except requests.exceptions.HTTPError:
+        response.close()
+        raise
+    return response
+
 
 # 发送POST请求
 def post(url: str, data: Dict) -> Optional[requests.Response]:
@@ -33,14 +82,7 @@ def post(url: str, data: Dict) -> Optional[requests.Response]:
         响应对象或None（如果请求失败）
     """
     try:
-        response = requests.post(
-            url,
-            data=json.dumps(data),
-            headers={"Content-Type": "application/json"},
-            timeout=300,  # 5分钟超时
-        )
-        response.raise_for_status()  # 抛出HTTP错误
-        return response
+        return send_request(url, data)
     except requests.exceptions.Timeout:
         logging.error("请求超时，请检查网络连接或增加超时时间")
         return None
@@ -70,14 +112,27 @@ def save_img(b64_image: str, path: Union[str, Path]) -> bool:
         path = Path(path)
         path.parent.mkdir(parents=True, exist_ok=True)  # 确保目录存在
 
-        with open(path, "wb") as file:
-            file.write(base64.b64decode(b64_image))
+        # 先写临时文件再替换，中断时不会留下不完整的图片
+        tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+        try:
+            with open(tmp_path, "wb") as file:
+                file.write(base64.b64decode(b64_image))
+            os.replace(tmp_path, path)
+        finally:
+            tmp_path.unlink(missing_ok=True)
         return True
     except Exception as e:
         logging.error(f"保存图片失败 {path}: {e}")
         return False
 
 
+def txt2img_url(api_url: str) -> str:
+    """由 SD WebUI 地址得到 txt2img 接口地址"""
+    if not api_url.endswith("/"):
+        api_url += "/"
+    return api_url + "sdapi/v1/txt2img"
+
+
 def get_prompts(path: Union[str, Path]) -> Tuple[List[str], List[Optional[str]]]:
     """从JSON文件读取提示词和LoRA参数
 
@@ -197,6 +252,315 @@ def save_generation_params(
         return False
 
 
+def image_cache_key(
+    data: Dict, service: str = ImageServiceType.STABLE_DIFFUSION.value
+) -> Optional[str]:
+    """由完整的生成请求计算图片缓存键
+
+    请求数据已包含最终提示词（含LoRA和风格）、负面提示词、种子、采样器、
+    步数等全部参数。随机种子的请求每次结果不同，不缓存。
+
+    Args:
+        data: API请求数据
+        service: 图像服务类型
+
+    Returns:
+        缓存键，不可缓存时为None
+    """
+    if data.get("seed", -1) in (-1, None):
+        return None
+    return make_key(IMAGE_CACHE_VERSION, service, data)
+
+
+def request_image(
+    balancer: SDLoadBalancer, index: int, data: Dict, scenes: int = 1
+) -> Optional[requests.Response]:
+    """在负载最低的端点上请求生成，端点故障时换用其他端点重试
+
+    Args:
+        balancer: 端点负载均衡器
+        index: 图片编号（从1开始），合并请求时为第一张的编号
+        data: API请求数据
+        scenes: 请求中包含的场景数
+
+    Returns:
+        尚未读取响应体的响应对象，请求失败时为None
+
+    Raises:
+        NoHealthyEndpointError: 没有可用的端点
+    """
+    tried = []
+    for _ in range(len(balancer.endpoints)):
+        url = balancer.acquire(exclude=tried)
+        error = None
+        try:
+            name = f"scene_{index}" if scenes == 1 else f"scenes_{index}+{scenes}"
+            with profiler.span("scene", name, scene=index, scenes=scenes) as scene:
+                try:
+                    response = send_request(txt2img_url(url), data, stream=True)
+                except requests.exceptions.RequestException as e:
+                    error = e
+                scene["status"] = "failed" if error else "ok"
+        except BaseException:
+            balancer.release(url, failed=True)
+            raise
+
+        # 5xx 或超时时探测端点状态，探测也失败才计为端点故障并换端点重试
+        failed = error is not None and balancer.confirm_failure(url, error)
+        balancer.release(url, failed=failed)
+        if error is None:
+            return response
+        logging.error(f"图片 {index} 请求失败（{url}）: {error}")
+        if not failed:
+            return None
+        tried.append(url)
+    return None
+
+
+def generate_scene(
+    balancer: SDLoadBalancer, index: int, data: Dict, output_path: Path
+) -> bool:
+    """生成一张图片并保存
+
+    Args:
+        balancer: 端点负载均衡器
+        index: 图片编号（从1开始）
+        data: API请求数据
+        output_path: 输出文件路径
+
+    Returns:
+        生成并保存是否成功
+    """
+    try:
+        response = request_image(balancer, index, data)
+    except NoHealthyEndpointError as e:
+        logging.error(f"生成失败: 图片 {index}, {e}")
+        return False
+    if response is None:
+        return False
+
+    # 边接收边解码，不在内存中保留完整的响应和base64字符串
+    try:
+        with response:
+            written = write_images(
+                response.iter_content(chunk_size=RESPONSE_CHUNK), [output_path]
+            )
+        if written:
+            logging.info(f"✅ 图片 {index} 生成成功: {output_path.name}")
+            return True
+        logging.error(f"API响应格式错误: 图片 {index}")
+    except ImageStreamError as e:
+        logging.error(f"API响应格式错误: 图片 {index}, {e}")
+    except Exception as e:
+        logging.error(f"处理响应时出错: 图片 {index}, 错误: {e}")
+    return False
+
+
+def pack_key(data: Dict) -> str:
+    """场景的合并分组键：除提示词外的全部参数，加上提示词中的LoRA
+
+    分组键相同的场景使用相同的模型、LoRA、风格和生成参数，可以合并到一个请求中。
+    """
+    settings = {key: value for key, value in data.items() if key != "prompt"}
+    loras = sorted(tag.lower() for tag in _LORA_TAG.findall(data.get("prompt", "")))
+    return make_key(settings, loras)
+
+
+def is_packable(data: Dict) -> bool:
+    """场景能否合并到逐行提示词请求中
+
+    每行只能对应一张图片，因此每次请求生成多张图片（批次大小或迭代次数大于1）的
+    场景不合并；脚本按行拆分提示词，含换行或为空的提示词也不合并。
+    """
+    prompt = data.get("prompt") or ""
+    return (
+        data.get("batch_size", 1) == 1
+        and data.get("n_iter", 1) == 1
+        and bool(prompt.strip())
+        and prompt.splitlines() == [prompt]
+    )
+
+
+def pack_tasks(
+    tasks: Sequence[Tuple[int, Dict, Path]], pack_size: int
+) -> List[List[Tuple[int, Dict, Path]]]:
+    """按分组键将场景打包，每包最多 pack_size 个，保持场景顺序
+
+    Args:
+        tasks: (图片编号, API请求数据, 输出文件路径) 列表
+        pack_size: 每包最多场景数
+
+    Returns:
+        场景包列表，按各包第一个场景的顺序排列；不可合并的场景单独成包
+    """
+    pack_size = max(1, pack_size)
+    groups: Dict[str, List[Tuple[int, Dict, Path]]] = {}
+    packs = []
+    for task in tasks:
+        if pack_size > 1 and is_packable(task[1]):
+            groups.setdefault(pack_key(task[1]), []).append(task)
+        else:
+            packs.append([task])
+
+    for group in groups.values():
+        for start in range(0, len(group), pack_size):
+            packs.append(group[start : start + pack_size])
+    packs.sort(key=lambda pack: pack[0][0])
+    return packs
+
+
+def pack_request(datas: Sequence[Dict]) -> Dict:
+    """将分组键相同的多个场景合并为一个txt2img请求
+
+    txt2img 接口的 prompt 只接受单个字符串，无法在一个批次中为每张图片指定
+    不同的提示词。这里借助 WebUI 内置的 "prompts from file or textbox" 脚本，
+    每行一个场景的提示词，脚本在一次调用中逐行依次生成（每行一次独立的生成，
+    并非同一批次），省去的是每个场景的请求和排队开销。
+
+    Args:
+        datas: 各场景的API请求数据（须满足 is_packable，且分组键相同）
+
+    Returns:
+        合并后的API请求数据
+    """
+    lines = "\n".join(f"--prompt {shlex.quote(data['prompt'])}" for data in datas)
+    packed = dict(datas[0])
+    packed.update(
+        {
+            # 基础提示词为空时，脚本直接使用每行的提示词，不做拼接
+            "prompt": "",
+            "script_name": PROMPTS_SCRIPT,
+            # checkbox_iterate, checkbox_iterate_batch, prompt_position, prompt_txt
+            "script_args": [False, False, "start", lines],
+        }
+    )
+    return packed
+
+
+def packed_prompts(info: Optional[str]) -> Optional[List[str]]:
+    """从响应的 info 字段取出各图片实际使用的提示词，无法解析时为None"""
+    try:
+        prompts = json.loads(info)["all_prompts"]
+    except (TypeError, ValueError, KeyError):
+        return None
+    return prompts if isinstance(prompts, list) else None
+
+
+def generate_pack(
+    balancer: SDLoadBalancer, pack: Sequence[Tuple[int, Dict, Path]]
+) -> List[bool]:
+    """在一个请求中生成一包场景，响应不完全对应时全部逐个重新生成
+
+    合并请求的图片先写入临时文件，只有图片数量与场景数相同、且响应 info 中的
+    提示词（如有）与各场景一致时才移动到输出路径。端点缺少脚本、脚本参数格式
+    不同或忽略 script_name 时，返回的图片不能对应到场景，全部丢弃。
+
+    Args:
+        balancer: 端点负载均衡器
+        pack: (图片编号, API请求数据, 输出文件路径) 列表
+
+    Returns:
+        各场景是否生成并保存成功
+    """
+    if len(pack) == 1:
+        return [generate_scene(balancer, *pack[0])]
+
+    first, last = pack[0][0], pack[-1][0]
+    temp_paths = [
+        path.with_name(f".{path.name}.pack.{os.getpid()}.png") for _, _, path in pack
+    ]
+    written: List[Path] = []
+    info = None
+    try:
+        data = pack_request([data for _, data, _ in pack])
+        response = request_image(balancer, first, data, scenes=len(pack))
+        if response is not None:
+            decoder = ImageStreamDecoder(temp_paths, capture=("info",))
+            with response:
+                written = decode_stream(
+                    response.iter_content(chunk_size=RESPONSE_CHUNK), decoder
+                )
+            info = decoder.captured.get("info")
+    except NoHealthyEndpointError as e:
+        logging.error(f"生成失败: 图片 {first}-{last}, {e}")
+        return [False] * len(pack)
+    except ImageStreamError as e:
+        logging.error(f"API响应格式错误: 图片 {first}-{last}, {e}")
+    except Exception as e:
+        logging.error(f"处理响应时出错: 图片 {first}-{last}, 错误: {e}")
+
+    prompts = packed_prompts(info)
+    expected = [data["prompt"] for _, data, _ in pack]
+    if len(written) == len(pack) and prompts in (None, expected):
+        for temp_path, (index, _, output_path) in zip(temp_paths, pack):
+            os.replace(temp_path, output_path)
+            logging.info(f"✅ 图片 {index} 生成成功: {output_path.name}")
+        return [True] * len(pack)
+
+    for temp_path in temp_paths:
+        temp_path.unlink(missing_ok=True)
+    logging.warning(
+        f"合并请求返回的图片与场景不对应（图片 {first}-{last}，"
+        f"{len(written)}/{len(pack)} 张），改为逐个生成"
+    )
+    return [generate_scene(balancer, *task) for task in pack]
+
+
+def generate_images(
+    tasks: Sequence[Tuple[int, Dict, Path]],
+    balancer: SDLoadBalancer,
+    max_workers: int,
+    params_file: Optional[Union[str, Path]] = None,
+    cache: Optional[ContentCache] = None,
+    pack_size: int = 1,
+) -> int:
+    """并发生成图片，每个请求完成后立即写入输出文件
+
+    Args:
+        tasks: (图片编号, API请求数据, 输出文件路径) 列表
+        balancer: 端点负载均衡器
+        max_workers: 最大并发请求数（不超过各端点在途上限之和）
+        params_file: 生成参数文件路径，为None时不记录
+        cache: 图片缓存，生成成功的可缓存图片存入其中
+        pack_size: 每个请求合并的场景数，1表示每个场景单独请求
+
+    Returns:
+        成功生成的图片数量
+    """
+    if not tasks:
+        return 0
+
+    packs = pack_tasks(tasks, pack_size)
+    max_workers = max(1, min(max_workers, balancer.capacity, len(packs)))
+    success_count = 0
+    executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="sd")
+    with executor, tqdm(total=len(tasks), desc="正在生成图片") as progress:
+        futures = {
+            executor.submit(generate_pack, balancer, pack): pack for pack in packs
+        }
+        for future in as_completed(futures):
+            pack = futures[future]
+            progress.update(len(pack))
+            try:
+                results = future.result()
+            except Exception as e:
+                logging.error(f"生成图片 {pack[0][0]} 时出错: {e}")
+                continue
+            for (_, data, output_path), ok in zip(pack, results):
+                if not ok:
+                    continue
+                success_count += 1
+                if params_file:
+                    save_generation_params(params_file, output_path.name, data)
+                cache_key = image_cache_key(data) if cache is not None else None
+                if cache_key:
+                    try:
+                        cache.put(cache_key, output_path)
+                    except OSError as e:
+                        logging.warning(f"写入图片缓存失败 {output_path.name}: {e}")
+    return success_count
+
+
 def main(json_file_path: Optional[str] = None) -> bool:
     """主函数：执行图像生成
 
@@ -216,13 +580,16 @@ def main(json_file_path: Optional[str] = None) -> bool:
             logging.error(f"  - {error}")
         return False
 
-    # 设置API URL
-    api_url = config.sd_api_url
-    if not api_url.endswith("/"):
-        api_url += "/"
-    url = api_url + "sdapi/v1/txt2img"
+    # 设置API端点
+    urls = config.sd_api_urls
+    balancer = SDLoadBalancer(
+        urls,
+        concurrency=config.sd_endpoint_concurrency,
+        poll_interval=config.sd_health_interval,
+        eject_seconds=config.sd_eject_seconds,
+    )
 
-    logging.info(f"Stable Diffusion API: {url}")
+    logging.info(f"Stable Diffusion API: {', '.join(urls)}")
 
     # 读取提示词
     if json_file_path:
@@ -249,17 +616,24 @@ def main(json_file_path: Optional[str] = None) -> bool:
     # 获取LoRA模型配置
     lora_param_dict = config.lora_models
 
-    logging.info(f"开始生成 {len(prompts)} 张图片...")
-
     # 确保临时目录存在
     config.output_dir_temp.mkdir(parents=True, exist_ok=True)
 
+    # 生成请求完全相同的图片直接从缓存取出（跨运行、跨故事共享）
+    cache = None
+    if config.image_cache:
+        cache = ContentCache(
+            config.image_cache_dir,
+            suffix=".png",
+            max_bytes=config.image_cache_max_mb * 1024 * 1024,
+        )
+
     success_count = 0
+    cached_count = 0
     total_count = len(prompts)
+    tasks = []
 
-    for i, (prompt_b, lora_param_no) in tqdm(
-        enumerate(zip(prompts, lora_param_nos)), total=total_count, desc="正在生成图片"
-    ):
+    for i, (prompt_b, lora_param_no) in enumerate(zip(prompts, lora_param_nos)):
         # 跳过空提示词
         if not prompt_b or not prompt_b.strip():
             logging.warning(f"跳过空提示词: 图片 {i+1}")
@@ -284,7 +658,6 @@ def main(json_file_path: Optional[str] = None) -> bool:
         logging.info(f"🎨 图片 {i+1} prompt: {prompt}")
 
         output_file = f"output_{i+1}.png"
-        output_path = output_dir / output_file
 
         # 跳过已存在的文件
         if output_file in existing_files:
@@ -292,32 +665,38 @@ def main(json_file_path: Optional[str] = None) -> bool:
             logging.info(f"跳过已存在的文件: {output_file}")
             continue
 
-        # 生成图片
         data = generate_data(prompt)
-        response = post(url, data)
+        output_path = output_dir / output_file
+        cache_key = image_cache_key(data) if cache is not None else None
+        if cache_key and cache.fetch(cache_key, output_path):
+            success_count += 1
+            cached_count += 1
+            logging.info(f"♻️ 图片 {i+1} 命中缓存: {output_file}")
+            save_generation_params(config.params_json_file, output_file, data)
+            continue
 
-        if response and response.status_code == 200:
-            try:
-                response_data = response.json()
-                if "images" in response_data and response_data["images"]:
-                    if save_img(response_data["images"][0], output_path):
-                        existing_files.add(output_file)
-                        success_count += 1
-                        logging.info(f"✅ 图片 {i+1} 生成成功: {output_file}")
-
-                        # 保存生成参数
-                        save_generation_params(
-                            config.params_json_file, output_file, data
-                        )
-                    else:
-                        logging.error(f"图片 {i+1} 保存失败")
-                else:
-                    logging.error(f"API响应格式错误: 图片 {i+1}")
-            except Exception as e:
-                logging.error(f"处理响应时出错: 图片 {i+1}, 错误: {e}")
-        else:
-            error_code = response.status_code if response else "连接失败"
-            logging.error(f"生成失败: 图片 {i+1}, 错误码: {error_code}")
+        tasks.append((i + 1, data, output_path))
+
+    logging.info(
+        f"开始生成 {len(tasks)} 张图片（{len(urls)} 个端点，"
+        f"最大并发 {min(config.max_workers_image, balancer.capacity)}，"
+        f"每个请求最多 {config.sd_pack_size} 个场景）..."
+    )
+    if cached_count:
+        logging.info(f"{cached_count} 张图片命中缓存，无需生成")
+    with balancer:
+        success_count += generate_images(
+            tasks,
+            balancer,
+            config.max_workers_image,
+            config.params_json_file,
+            cache,
+            pack_size=config.sd_pack_size,
+        )
+    if cache is not None:
+        evicted = cache.evict()
+        if evicted:
+            logging.info(f"图片缓存超出容量上限，已淘汰 {evicted} 个旧条目")
 
     logging.info(f"图片生成完成！成功: {success_count}/{total_count}")
     return success_count > 0
@@ -515,10 +894,7 @@ if __name__ == "__main__":
 
                 if existing_files:
                     logging.info(f"发现 {len(existing_files)} 个已生成的图片文件")
-                    api_url: str = config.sd_api_url
-                    if not api_url.endswith("/"):
-                        api_url += "/"
-                    url: str = api_url + "sdapi/v1/txt2img"
+                    url: str = txt2img_url(config.sd_api_urls[0])
 
                     redo_count: int = interactive_regenerate(
                         url,
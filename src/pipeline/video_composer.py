@@ -1,12 +1,10 @@
 import concurrent.futures
-import gc
 import os
-import random
 import shutil
 import sys
 import time
 import warnings
-from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from datetime import datetime
 from pathlib import Path
 
@@ -25,13 +23,35 @@ from moviepy.video.compositing.CompositeVideoClip import (
     CompositeVideoClip,
     concatenate_videoclips,
 )
-from moviepy.video.io.ImageSequenceClip import ImageSequenceClip
 from moviepy.video.io.VideoFileClip import VideoFileClip
-from moviepy.video.VideoClip import TextClip
+from moviepy.video.VideoClip import ImageClip, VideoClip
 from PIL import Image, ImageFilter
 from tqdm import tqdm
 
+from src import profiler
 from src.config import config
+from src.content_cache import ContentCache, make_key
+from src.media.compositing import StaticBackgroundLayer
+from src.media import audio_info
+from src.media.concat import can_stream_copy, concat_stream_copy, probe_stream_params
+from src.media.ffmpeg_encoder import FFmpegEncodeError, encode_clip
+from src.media.ken_burns import KenBurnsRenderer
+from src.media.motion_planner import PLANNER_VERSION, plan_motion
+from src.media.subtitle_renderer import (
+    SubtitleStyle,
+    dynamic_font_size,
+    load_font,
+    render_subtitle,
+)
+from src.media.subtitle_track import (
+    AssStyle,
+    build_cues,
+    burn_subtitles,
+    mux_soft_subtitles,
+    split_timed_subtitle,
+    write_ass,
+    write_srt,
+)
 
 # 获取配置的目录路径
 image_dir = config.output_dir_image
@@ -50,6 +70,46 @@ load_subtitles = config.video_load_subtitles
 enlarge_background = config.video_enlarge_background
 enable_effect = config.video_enable_effect
 effect_type = config.video_effect_type
+motion_seed = config.video_motion_seed
+motion_saliency = config.video_motion_saliency
+background_mode = config.video_background_mode
+subtitle_mode = config.video_subtitle_mode
+subtitle_max_chars = config.subtitle_max_chars
+encoder_backend = config.video_encoder_backend
+encoder_preset = config.video_preset
+concat_mode = config.video_concat_mode
+render_mode = config.video_render_mode
+scene_retries = config.video_scene_retries
+
+# 无音频时片段的默认时长（秒）
+DEFAULT_SCENE_DURATION = 2.0
+
+# 片段缓存：按输入内容和渲染参数复用已生成的片段
+# 渲染逻辑变化导致输出不同时需要递增版本号，使旧缓存失效
+CLIP_CACHE_VERSION = 3
+clip_cache = None
+if config.video_clip_cache:
+    clip_cache = ContentCache(
+        config.video_clip_cache_dir,
+        suffix=".mp4",
+        max_bytes=config.video_clip_cache_max_mb * 1024 * 1024,
+    )
+
+# 片段与最终视频共用的编码参数（各片段参数一致，便于无损拼接）
+FFMPEG_OUTPUT_PARAMS = [
+    "-pix_fmt",
+    "yuv420p",
+    "-crf",
+    "18",  # 更高质量
+    "-profile:v",
+    "baseline",  # 基线配置，最大兼容性
+    "-level",
+    "3.0",  # 兼容性级别
+    "-movflags",
+    "+faststart",  # 优化流媒体
+    "-strict",
+    "experimental",  # 允许实验性编码器
+]
 
 # 移到main函数中执行，避免在导入时打印
 # print("Step 4: 视频合成")
@@ -144,12 +204,17 @@ def load_subtitle_data(total_files, json_file_path=None):
 # subtitles = load_subtitle_data()  # 移到main函数中执行
 
 
-def create_clip(i, subtitles, retry_count=0):
-    """创建单个视频片段"""
-    max_retries = 2  # 最大重试次数
+def create_clip(i, subtitles):
+    """创建单个视频片段
+
+    Args:
+        i: 片段索引（从0开始）
+        subtitles: 全部片段的字幕列表
+
+    Returns:
+        str: 生成的临时视频文件路径，失败时返回 None
+    """
     filename = f"output_{i+1}.png"
-    audio_filename_mp3 = f"output_{i+1}.mp3"
-    audio_filename_wav = f"output_{i+1}.wav"
     subtitle = subtitles[i] if i < len(subtitles) else ""
 
     image_path = image_dir / filename
@@ -160,107 +225,76 @@ def create_clip(i, subtitles, retry_count=0):
         print(f"警告: 图片文件不存在 - {image_path}")
         return None
 
+    # 检查音频文件（压缩格式或 WAV）
+    source_audio = audio_info.find_audio(voice_dir, f"output_{i+1}")
+
+    # 烧录字幕时，有配音字词时间的片段按短句分时显示
+    cues = None
+    if load_subtitles and subtitle_mode == "burn" and subtitle and subtitle.strip():
+        cues = timed_subtitle(subtitle, source_audio)
+
+    # 输入与渲染参数均未变化时直接复用缓存的片段
+    cache_key = None
+    if clip_cache is not None:
+        try:
+            cache_key = clip_cache_key(i, image_path, source_audio, subtitle, cues)
+            if clip_cache.fetch(cache_key, temp_filename):
+                print(f"视频片段 {i+1} 未变化，复用缓存")
+                profiler.count("cache_hits")
+                return str(temp_filename)
+        except OSError as e:
+            print(f"读取片段缓存失败 {i+1}: {e}")
+            cache_key = None
+
     try:
         im = Image.open(image_path)
     except Exception as e:
         print(f"无法打开图片 {image_path}: {e}")
         return None
 
-    # 检查音频文件
-    audio_path_mp3 = voice_dir / audio_filename_mp3
-    audio_path_wav = voice_dir / audio_filename_wav
-
     audio = None
-    if audio_path_mp3.exists():
+    audio_path = None
+    audio_duration = None
+    if source_audio is not None:
         try:
-            audio = AudioFileClip(str(audio_path_mp3))
-        except Exception as e:
-            print(f"无法加载音频文件 {audio_path_mp3}: {e}")
-    elif audio_path_wav.exists():
-        try:
-            audio = AudioFileClip(str(audio_path_wav))
+            if encoder_backend == "ffmpeg":
+                # ffmpeg 后端在编码时直接混入音频文件，这里只需时长：
+                # 优先读取语音后处理写出的统计文件，无需解码音频
+                audio_duration = audio_info.audio_duration(source_audio)
+            else:
+                audio = AudioFileClip(str(source_audio))
+                audio_duration = audio.duration
+            audio_path = source_audio
         except Exception as e:
-            print(f"无法加载音频文件 {audio_path_wav}: {e}")
+            print(f"无法加载音频文件 {source_audio}: {e}")
 
-    if audio is None:
+    if audio_path is None or not audio_duration:
         print(f"警告: 未找到音频文件 output_{i+1}，将使用默认2秒时长")
         # 创建2秒的静音
-        audio_duration = 2.0
-    else:
-        audio_duration = audio.duration
-
-    # 创建字幕
-    txt_clip = None
-    if load_subtitles and subtitle and subtitle.strip():
+        audio_duration = DEFAULT_SCENE_DURATION
+        audio_path = None
+
+    # 创建字幕：位图按文本和样式缓存，作为叠加层合成
+    # 整段字幕全程显示；按字词时间切分的短句各自只在对应时间内显示，
+    # 短句较短，无需按字数缩小字体
+    # 其他字幕模式在拼接后统一输出字幕轨道，片段本身不含字幕
+    subtitle_overlays = []
+    if load_subtitles and subtitle_mode == "burn" and subtitle and subtitle.strip():
         try:
-            max_width = int(im.width * 0.8)
-
-            # 从配置获取字幕样式参数
-            base_fontsize = config.subtitle_fontsize
-            fontcolor = config.subtitle_fontcolor
-            stroke_color = config.subtitle_stroke_color
-            stroke_width = config.subtitle_stroke_width
-            font = config.subtitle_font
-            method = "caption"
-            align = config.subtitle_align
-            pixel_from_bottom = config.subtitle_pixel_from_bottom
-
-            # 动态计算字体大小，防止长字幕被截断
-            def get_dynamic_fontsize(subtitle_text, base_fontsize):
-                """根据字幕长度动态计算字体大小"""
-                char_count = len(subtitle_text)
-
-                if char_count <= 30:
-                    return base_fontsize
-                elif char_count <= 60:
-                    return max(32, base_fontsize - 8)
-                elif char_count <= 90:
-                    return max(28, base_fontsize - 12)
-                else:
-                    return max(24, base_fontsize - 16)
-
-            fontsize = get_dynamic_fontsize(subtitle, base_fontsize)
-            size = [max_width, None]
-
-            # 验证字幕配置参数
-            if fontsize <= 0:
-                print(f"警告: 字幕字体大小无效 ({fontsize})，使用默认值 60")
-                fontsize = 60
-
-            # 输出字幕调试信息
-            if len(subtitle) > 30:
-                print(
-                    f"长字幕检测: 字符数={len(subtitle)}, 调整字体大小 {base_fontsize}→{fontsize}"
-                )
-
-            txt_clip = TextClip(
-                text=subtitle,
-                font_size=fontsize,
-                color=fontcolor,
-                stroke_color=stroke_color,
-                stroke_width=stroke_width,
-                method=method,
-                text_align=align,
-                size=size,
-                font=font,
-            )
-
-            # 定义字幕位置
-            def calculate_position(t):
-                if pixel_from_bottom < 0:
-                    # 负值表示从顶部开始
-                    return ("center", abs(pixel_from_bottom))
-                elif pixel_from_bottom == 0:
-                    # 0表示居中
-                    return ("center", "center")
-                else:
-                    # 正值表示从底部开始
-                    return ("center", im.height - pixel_from_bottom)
-
-            txt_clip = txt_clip.with_position(calculate_position).with_duration(
-                audio_duration
-            )
-
+            if cues:
+                subtitle_overlays = [
+                    (
+                        render_subtitle(
+                            cue.text, subtitle_style(cue.text, im.width, fit=False)
+                        ),
+                        cue.start,
+                        cue.end,
+                    )
+                    for cue in cues
+                ]
+            else:
+                bitmap = render_subtitle(subtitle, subtitle_style(subtitle, im.width))
+                subtitle_overlays = [(bitmap, None, None)]
         except Exception as e:
             print(f"创建字幕失败: {e}")
             print(
@@ -269,86 +303,64 @@ def create_clip(i, subtitles, retry_count=0):
                 else f"字幕内容: {subtitle}"
             )
             print("提示: 请检查字幕配置参数和字体文件是否正确")
-            txt_clip = None
-    elif load_subtitles and not subtitle.strip():
-        # 字幕功能启用但当前片段无字幕内容
-        pass
-
-    # 计算Ken Burns效果参数
-    x_speed = (im.width - im.width * 9 / 10) / audio_duration
-    y_speed = (im.height - im.height * 9 / 10) / audio_duration
-
-    n_frames = int(fps * audio_duration)
-
-    def transform(img, t, move_on_x, move_positive):
-        crop_width = im.width * 9 / 10
-        crop_height = im.height * 9 / 10
-
-        if move_on_x:
-            if move_positive:
-                left = min(x_speed * t, img.width - crop_width)
-            else:
-                left = max(img.width - crop_width - x_speed * t, 0)
-            upper = (img.height - crop_height) / 2
-        else:
-            left = (img.width - crop_width) / 2
-            if move_positive:
-                upper = min(y_speed * t, img.height - crop_height)
-            else:
-                upper = max(img.height - crop_height - y_speed * t, 0)
-
-        right = left + crop_width
-        lower = upper + crop_height
-
-        cropped_img = img.crop((left, upper, right, lower))
-        resized_img = cropped_img.resize(im.size)
-
-        return np.array(resized_img)
-
-    move_on_x = random.choice([True, False])
-    move_positive = random.choice([True, False])
-
-    frames_foreground = [
-        transform(im, t / fps, move_on_x, move_positive) for t in range(n_frames)
-    ]
-    img_foreground = ImageSequenceClip(frames_foreground, fps=fps)
-
-    del frames_foreground
-    gc.collect()
+            subtitle_overlays = []
 
+    # Ken Burns效果：平移方向由种子和片段序号确定性规划，裁剪窗口向量化预计算，帧按需生成
+    motion_plan = plan_motion(im, i, seed=motion_seed, use_saliency=motion_saliency)
+    ken_burns = KenBurnsRenderer.from_plan(im, audio_duration, fps, motion_plan)
+    # 背景只生成一份：模糊（可选放大）后的原图
     img_blur = im.filter(ImageFilter.GaussianBlur(radius=30))
     if enlarge_background:
         new_size = (int(im.width * 1.1), int(im.height * 1.1))
-        img_blur = img_blur.resize(new_size, Image.ANTIALIAS)
+        img_blur = img_blur.resize(new_size, Image.LANCZOS)
 
-    frames_background = [np.array(img_blur) for _ in range(n_frames)]
-    img_background = ImageSequenceClip(frames_background, fps=fps)
+    subtitle_overlays = [
+        (bitmap, subtitle_position(img_blur.size, bitmap.size, im.height), start, end)
+        for bitmap, start, end in subtitle_overlays
+    ]
 
-    del frames_background
-    gc.collect()
+    if background_mode == "composite":
+        # 背景作为单张ImageClip，由CompositeVideoClip逐帧合成
+        img_background = ImageClip(np.array(img_blur)).with_duration(audio_duration)
+        img_foreground = VideoClip(
+            frame_function=ken_burns.make_frame, duration=audio_duration
+        )
+        layers = [
+            img_background.with_position("center"),
+            img_foreground.with_position("center"),
+        ]
+        for bitmap, position, start, end in subtitle_overlays:
+            subtitle_mask = ImageClip(bitmap.alpha / 255.0, is_mask=True)
+            start = start or 0.0
+            end = audio_duration if end is None else end
+            layers.append(
+                ImageClip(bitmap.rgb)
+                .with_mask(subtitle_mask)
+                .with_position(position)
+                .with_start(start)
+                .with_duration(end - start)
+            )
+    else:
+        # 共享只读背景，前景逐帧原地贴合，字幕作为叠加层
+        background = StaticBackgroundLayer(np.array(img_blur), ken_burns.size)
+        for bitmap, position, start, end in subtitle_overlays:
+            background.add_overlay(bitmap.rgb, bitmap.alpha, position, start, end)
+        layers = [
+            VideoClip(
+                frame_function=background.frame_function(ken_burns.make_frame),
+                duration=audio_duration,
+            )
+        ]
 
     # 设置音频
     if audio:
-        img_foreground = img_foreground.with_audio(audio)
+        layers[0] = layers[0].with_audio(audio)
 
     # 组合视频片段
-    if load_subtitles and txt_clip:
-        final_clip = CompositeVideoClip(
-            [
-                img_background.with_position("center"),
-                img_foreground.with_position("center"),
-                txt_clip,
-            ],
-            size=img_blur.size,
-        )
+    if len(layers) > 1:
+        final_clip = CompositeVideoClip(layers, size=img_blur.size)
     else:
-        final_clip = CompositeVideoClip(
-            [
-                img_background.with_position("center"),
-                img_foreground.with_position("center"),
-            ],
-            size=img_blur.size,
-        )
+        final_clip = layers[0]
 
     # 应用特效
     if enable_effect:
@@ -375,76 +387,275 @@ def create_clip(i, subtitles, retry_count=0):
         except Exception as e:
             print(f"应用特效 {effect_type} 失败: {e}")
 
-    # 生成视频片段
+    # 生成视频片段（失败时由 main 在片段级别重试）
+    # 先删除旧文件：它可能是缓存条目的硬链接，不能被原地覆盖
+    temp_filename.unlink(missing_ok=True)
     try:
-        # 使用更稳定的编码参数
-        final_clip.write_videofile(
-            str(temp_filename),
-            logger=None,
-            audio_codec="aac",
-            codec="libx264",
-            preset="slow",  # 更保守的预设，确保质量
-            ffmpeg_params=[
-                "-pix_fmt",
-                "yuv420p",
-                "-cr",
-                "18",  # 更高质量
-                "-profile:v",
-                "baseline",  # 基线配置，最大兼容性
-                "-level",
-                "3.0",  # 兼容性级别
-                "-movflags",
-                "+faststart",  # 优化流媒体
-                "-strict",
-                "experimental",  # 允许实验性编码器
-            ],
-        )
+        if encoder_backend == "ffmpeg":
+            # 帧直接通过管道写入ffmpeg，音频在同一次编码中混入
+            result = encode_clip(
+                final_clip,
+                temp_filename,
+                fps,
+                audio_path=audio_path,
+                preset=encoder_preset,
+                ffmpeg_params=FFMPEG_OUTPUT_PARAMS,
+            )
+            # 以ffmpeg报告的时长校验输出，无需重新打开文件
+            if result.duration <= 0 or result.frames <= 0:
+                raise FFmpegEncodeError(
+                    f"ffmpeg 报告的输出无效: 时长={result.duration}, 帧数={result.frames}"
+                )
+        else:
+            final_clip.write_videofile(
+                str(temp_filename),
+                fps=fps,
+                logger=None,
+                audio_codec="aac",
+                codec="libx264",
+                preset=encoder_preset,
+                ffmpeg_params=FFMPEG_OUTPUT_PARAMS,
+            )
 
-        # 短暂延迟确保文件写入完成
-        time.sleep(0.2)
+            # 短暂延迟确保文件写入完成
+            time.sleep(0.2)
 
-        # 验证生成的文件
-        if not temp_filename.exists() or temp_filename.stat().st_size == 0:
-            print(f"警告: 视频片段 {i+1} 生成的文件无效")
-            return None
+            # 验证生成的文件
+            if not temp_filename.exists() or temp_filename.stat().st_size == 0:
+                raise RuntimeError("生成的文件无效")
 
-        # 验证文件可以被 MoviePy 正确读取
-        try:
+            # 验证文件可以被 MoviePy 正确读取
             test_clip = VideoFileClip(str(temp_filename))
-            if test_clip.duration <= 0:
-                print(f"警告: 视频片段 {i+1} 时长无效")
-                test_clip.close()
-                return None
+            test_duration = test_clip.duration
             test_clip.close()
-        except Exception as e:
-            print(f"警告: 视频片段 {i+1} 无法正确读取: {e}")
-            # 删除损坏的文件并重试
-            if temp_filename.exists():
-                temp_filename.unlink()
-            if retry_count < max_retries:
-                print(f"重试生成视频片段 {i+1} (第 {retry_count + 1} 次重试)")
-                time.sleep(0.5)  # 短暂延迟后重试
-                return create_clip(i, subtitles, retry_count + 1)
-            return None
+            if test_duration <= 0:
+                raise RuntimeError("时长无效")
 
     except Exception as e:
         print(f"生成视频片段 {i+1} 失败: {e}")
-        # 删除可能存在的不完整文件并重试
+        # 删除可能存在的不完整文件
         if temp_filename.exists():
             temp_filename.unlink()
-        if retry_count < max_retries:
-            print(f"重试生成视频片段 {i+1} (第 {retry_count + 1} 次重试)")
-            time.sleep(0.5)  # 短暂延迟后重试
-            return create_clip(i, subtitles, retry_count + 1)
         return None
 
-    # 清理内存
-    del final_clip
-    gc.collect()
+    finally:
+        # 释放音频读取进程
+        if audio:
+            audio.close()
+
+    if cache_key:
+        try:
+            clip_cache.put(cache_key, temp_filename)
+        except OSError as e:
+            print(f"写入片段缓存失败 {i+1}: {e}")
 
     return str(temp_filename)
 
 
+def subtitle_style(subtitle, image_width, fit=True):
+    """根据配置和字幕长度生成字幕样式
+
+    Args:
+        subtitle: 字幕文本
+        image_width: 源图片宽度，字幕按其 80% 自动换行
+        fit: 是否按字数缩小长字幕的字体（按字词时间切分的短句无需缩小）
+
+    Returns:
+        SubtitleStyle: 字幕样式
+    """
+    base_fontsize = config.subtitle_fontsize
+    fontsize = dynamic_font_size(subtitle, base_fontsize) if fit else base_fontsize
+
+    # 验证字幕配置参数
+    if fontsize <= 0:
+        print(f"警告: 字幕字体大小无效 ({fontsize})，使用默认值 60")
+        fontsize = 60
+
+    # 输出字幕调试信息
+    if fontsize != base_fontsize:
+        print(
+            f"长字幕检测: 字符数={len(subtitle)}, 调整字体大小 {base_fontsize}→{fontsize}"
+        )
+
+    return SubtitleStyle(
+        font=config.subtitle_font,
+        font_size=fontsize,
+        color=config.subtitle_fontcolor,
+        stroke_color=config.subtitle_stroke_color,
+        stroke_width=config.subtitle_stroke_width,
+        align=config.subtitle_align,
+        max_width=int(image_width * 0.8),
+    )
+
+
+def subtitle_position(frame_size, subtitle_size, image_height):
+    """计算字幕左上角位置（水平居中）
+
+    Args:
+        frame_size: 输出帧尺寸 (宽, 高)
+        subtitle_size: 字幕位图尺寸 (宽, 高)
+        image_height: 源图片高度
+
+    Returns:
+        (x, y): 字幕左上角坐标
+    """
+    frame_width, frame_height = frame_size
+    width, height = subtitle_size
+    pixel_from_bottom = config.subtitle_pixel_from_bottom
+
+    x = int((frame_width - width) / 2)
+    if pixel_from_bottom < 0:
+        # 负值表示从顶部开始
+        y = abs(pixel_from_bottom)
+    elif pixel_from_bottom == 0:
+        # 0表示居中
+        y = int((frame_height - height) / 2)
+    else:
+        # 正值表示从底部开始
+        y = image_height - pixel_from_bottom
+    return x, y
+
+
+def clip_cache_key(i, image_path, audio_path, subtitle, cues=None):
+    """计算片段缓存键
+
+    由源图片、音频的内容哈希、字幕文本以及所有影响渲染结果的参数共同决定。
+    运动规划是片段序号、图片内容和规划参数的确定性函数，因此无需解码图片即可计算。
+
+    Args:
+        i: 片段索引
+        image_path: 源图片路径
+        audio_path: 源音频路径，无音频时为 None
+        subtitle: 字幕文本
+        cues: 按字词时间切分的字幕短句，整段显示时为 None
+
+    Returns:
+        str: 缓存键
+    """
+    settings = {
+        "version": CLIP_CACHE_VERSION,
+        "fps": fps,
+        "motion": {
+            "planner": PLANNER_VERSION,
+            "seed": motion_seed,
+            "saliency": motion_saliency,
+        },
+        "enlarge_background": enlarge_background,
+        "enable_effect": enable_effect,
+        "effect_type": effect_type if enable_effect else None,
+        "background_mode": background_mode,
+        "encoder_backend": encoder_backend,
+        "encoder_preset": encoder_preset,
+        "ffmpeg_params": FFMPEG_OUTPUT_PARAMS,
+    }
+    if load_subtitles and subtitle_mode == "burn" and subtitle and subtitle.strip():
+        settings["subtitle"] = {
+            "text": subtitle,
+            "fontsize": config.subtitle_fontsize,
+            "fontcolor": config.subtitle_fontcolor,
+            "stroke_color": config.subtitle_stroke_color,
+            "stroke_width": config.subtitle_stroke_width,
+            "font": config.subtitle_font,
+            "align": config.subtitle_align,
+            "pixel_from_bottom": config.subtitle_pixel_from_bottom,
+            "cues": [(cue.start, cue.end, cue.text) for cue in cues or []],
+        }
+    return make_key(
+        i, Path(image_path), Path(audio_path) if audio_path else None, settings
+    )
+
+
+# 需要同步到工作进程的模块级设置（spawn 方式启动的进程不会继承运行时修改）
+WORKER_SETTINGS = (
+    "image_dir",
+    "voice_dir",
+    "temp_dir",
+    "fps",
+    "motion_seed",
+    "motion_saliency",
+    "load_subtitles",
+    "enlarge_background",
+    "enable_effect",
+    "effect_type",
+    "background_mode",
+    "subtitle_mode",
+    "subtitle_max_chars",
+    "encoder_backend",
+    "encoder_preset",
+    "clip_cache",
+)
+
+# 工作进程中的字幕数据，由 _init_render_worker 在每个进程中设置一次
+_worker_subtitles = []
+
+
+def _init_render_worker(subtitles, settings):
+    """进程池初始化：每个工作进程只接收一次字幕和配置，之后的任务只传递片段索引"""
+    global _worker_subtitles
+    globals().update(settings)
+    _worker_subtitles = subtitles
+
+
+def render_scene(i, subtitles):
+    """渲染单个片段，剖析中时记录该片段的耗时和资源用量"""
+    with profiler.span("scene", f"scene_{i+1}", scene=i + 1) as scene:
+        filename = create_clip(i, subtitles)
+        scene["status"] = "ok" if filename else "failed"
+    return filename
+
+
+def _render_scene(i):
+    """工作进程入口：渲染单个片段，临时文件由工作进程自行写入"""
+    return render_scene(i, _worker_subtitles)
+
+
+def render_scenes(indices, subtitles, max_workers, use_processes):
+    """并发渲染一组片段
+
+    Args:
+        indices: 需要渲染的片段索引
+        subtitles: 全部片段的字幕列表
+        max_workers: 最大并发数
+        use_processes: 是否使用进程池（否则使用线程池）
+
+    Returns:
+        Dict[int, Optional[str]]: 片段索引到临时文件路径的映射，失败为 None
+    """
+    results = {}
+    if use_processes:
+        settings = {name: globals()[name] for name in WORKER_SETTINGS}
+        executor = ProcessPoolExecutor(
+            max_workers=min(max_workers, len(indices)),
+            initializer=_init_render_worker,
+            initargs=(subtitles, settings),
+        )
+    else:
+        executor = ThreadPoolExecutor(max_workers=max_workers)
+
+    with executor:
+        pbar = tqdm(total=len(indices), ncols=None, desc="正在生成视频片段")
+        if use_processes:
+            futures = {executor.submit(_render_scene, i): i for i in indices}
+        else:
+            futures = {executor.submit(render_scene, i, subtitles): i for i in indices}
+
+        for future in concurrent.futures.as_completed(futures):
+            i = futures[future]
+            try:
+                results[i] = future.result()
+            except Exception as e:
+                # 工作进程崩溃（如内存不足）时进程池不可用，由下一轮重试重建
+                print(f"视频片段 {i+1} 生成异常: {e}")
+                results[i] = None
+            if not results[i]:
+                print(f"视频片段 {i+1} 生成失败")
+            pbar.update(1)
+
+        pbar.close()
+
+    return results
+
+
 def main(json_file_path=None):
     """主函数：执行视频合成"""
     # 打印配置信息
@@ -453,12 +664,21 @@ def main(json_file_path=None):
     print(f"  FPS: {fps}")
     print(f"  字幕: {'启用' if load_subtitles else '禁用'}")
     if load_subtitles:
+        print(f"    - 输出方式: {subtitle_mode}")
         print(f"    - 字体大小: {config.subtitle_fontsize}")
         print(f"    - 字体颜色: {config.subtitle_fontcolor}")
         print(f"    - 字体: {config.subtitle_font}")
         print(f"    - 对齐方式: {config.subtitle_align}")
         print(f"    - 位置: {config.subtitle_pixel_from_bottom} 像素")
     print(f"  背景效果: {'启用' if enlarge_background else '禁用'}")
+    print(f"  背景图层: {background_mode}")
+    print(
+        f"  镜头规划: 种子={motion_seed}, 显著性={'启用' if motion_saliency else '禁用'}"
+    )
+    print(f"  编码后端: {encoder_backend} (preset={encoder_preset})")
+    print(f"  拼接方式: {concat_mode}")
+    print(f"  渲染方式: {render_mode} (重试次数: {scene_retries})")
+    print(f"  片段缓存: {clip_cache.cache_dir if clip_cache is not None else '禁用'}")
     print(
         f"  特效: {'启用' if enable_effect else '禁用'} ({effect_type if enable_effect else 'N/A'})"
     )
@@ -473,40 +693,28 @@ def main(json_file_path=None):
 
     subtitles = load_subtitle_data(total_files, json_file_path)
 
-    # 为了避免文件冲突，适当降低并发数
-    original_max_workers = config.max_workers_video
-    max_workers = min(original_max_workers, 3)  # 限制最大并发数为3
-
-    print(
-        f"开始生成 {total_files} 个视频片段（并发数: {max_workers}，原配置: {original_max_workers}）..."
-    )
-    if max_workers < original_max_workers:
-        print(f"为提高稳定性，已将并发数从 {original_max_workers} 调整为 {max_workers}")
-
-    temp_filenames = []
-    failed_count = 0
-
-    with ThreadPoolExecutor(max_workers=max_workers) as executor:
-        pbar = tqdm(total=total_files, ncols=None, desc="正在生成视频片段")
-        futures = {
-            executor.submit(create_clip, i, subtitles): i for i in range(total_files)
-        }
-
-        for future in concurrent.futures.as_completed(futures):
-            i = futures[future]
-            try:
-                result = future.result()
-                if result:
-                    temp_filenames.append(result)
-                else:
-                    failed_count += 1
-                    print(f"视频片段 {i+1} 生成失败")
-            except Exception as e:
-                failed_count += 1
-                print(f"视频片段 {i+1} 生成异常: {e}")
-            pbar.update(1)
+    # 进程池按配置的并发数扩展到多核；单个片段或单并发时无需启动进程池
+    max_workers = max(1, config.max_workers_video)
+    use_processes = render_mode == "process" and max_workers > 1 and total_files > 1
+    pool_name = "进程池" if use_processes else "线程池"
+    print(f"开始生成 {total_files} 个视频片段（{pool_name}，并发数: {max_workers}）...")
+
+    results = {}
+    pending = list(range(total_files))
+    for attempt in range(scene_retries + 1):
+        if attempt > 0:
+            print(f"重试 {len(pending)} 个失败的视频片段 (第 {attempt} 次重试)")
+            profiler.count(profiler.RETRIES, len(pending))
+            time.sleep(0.5)  # 短暂延迟后重试
+        results.update(render_scenes(pending, subtitles, max_workers, use_processes))
+        pending = [i for i in pending if not results.get(i)]
+        if not pending:
+            break
 
-        pbar.close()
+    # 按片段索引排序
+    rendered_indices = [i for i in sorted(results) if results[i]]
+    temp_filenames = [results[i] for i in rendered_indices]
+    failed_count = len(pending)
 
     if not temp_filenames:
         print("错误: 没有成功生成任何视频片段")
@@ -514,20 +722,177 @@ def main(json_file_path=None):
 
     print(f"成功生成 {len(temp_filenames)} 个视频片段，失败 {failed_count} 个")
 
-    # 按文件名排序
-    temp_filenames.sort(key=lambda x: int(x.split("_")[-1].split(".")[0]))
+    if clip_cache is not None:
+        evicted = clip_cache.evict()
+        if evicted:
+            print(f"片段缓存超出容量上限，已淘汰 {evicted} 个旧片段")
 
     # 合并视频片段
     print("正在合并视频片段...")
+    valid_filenames = []
+    valid_indices = []
+    for i, filename in zip(rendered_indices, temp_filenames):
+        if not os.path.exists(filename) or os.path.getsize(filename) == 0:
+            print(f"跳过无效的视频文件: {filename}")
+            continue
+        valid_filenames.append(filename)
+        valid_indices.append(i)
+
+    if not valid_filenames:
+        print("错误: 没有可用的视频片段进行合并")
+        return False
+
+    # 生成最终视频文件名
+    timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
+    final_filename = video_dir / f"output_{timestamp}.mp4"
+
+    with profiler.span("step", "concat", per_thread=False) as step:
+        merged = False
+        if concat_mode == "copy" and can_stream_copy(valid_filenames):
+            # 片段由同一套参数编码，直接流拷贝，无需解码和二次编码
+            print(f"片段参数一致，使用流拷贝拼接: {final_filename}")
+            try:
+                concat_stream_copy(valid_filenames, final_filename)
+                merged = True
+                step["method"] = "copy"
+                print(f"视频生成完成: {final_filename}")
+            except FFmpegEncodeError as e:
+                print(f"流拷贝拼接失败，回退到重新编码: {e}")
+
+        if not merged:
+            step["method"] = "reencode"
+            if not concat_with_reencode(valid_filenames, final_filename):
+                step["status"] = "failed"
+                return False
+        step["status"] = "ok"
+
+    if load_subtitles and subtitle_mode != "burn":
+        export_subtitle_track(final_filename, valid_indices, subtitles)
+
+    # 清理临时文件
+    print("清理临时文件...")
+    for filename in temp_filenames:
+        try:
+            os.remove(filename)
+        except Exception as e:
+            print(f"删除临时文件失败 {filename}: {e}")
+
+    return True
+
+
+def timed_subtitle(subtitle, audio_path):
+    """按配音统计文件中的字词时间把字幕切分为短句
+
+    Args:
+        subtitle: 字幕文本
+        audio_path: 片段音频路径，无音频时为 None
+
+    Returns:
+        list: 相对片段起点的 SubtitleCue 列表；没有字词时间或无需切分时为 None
+    """
+    if subtitle_max_chars <= 0 or audio_path is None:
+        return None
+    stats = audio_info.read_sidecar(audio_path)
+    if not stats or not stats.get("words"):
+        return None
+    cues = split_timed_subtitle(
+        subtitle, stats["words"], stats["duration"], subtitle_max_chars
+    )
+    return cues if len(cues) > 1 else None
+
+
+def scene_words(i):
+    """片段配音的字词时间，没有时为 None"""
+    audio_path = audio_info.find_audio(voice_dir, f"output_{i+1}")
+    stats = audio_info.read_sidecar(audio_path) if audio_path else None
+    return stats.get("words") if stats else None
+
+
+def scene_duration(i):
+    """片段时长：与 create_clip 一致，取片段音频的时长，无音频时为默认时长"""
+    audio_path = audio_info.find_audio(voice_dir, f"output_{i+1}")
+    if audio_path is not None:
+        try:
+            return audio_info.audio_duration(audio_path)
+        except Exception as e:
+            print(f"无法读取音频时长 {audio_path}: {e}")
+    return DEFAULT_SCENE_DURATION
+
+
+def export_subtitle_track(final_filename, scene_indices, subtitles):
+    """按片段时长输出字幕轨道
+
+    总是在最终视频旁写出 SRT 和 ASS 文件；soft 模式再封装为 mov_text 软字幕，
+    filter 模式通过一次 subtitles 滤镜烧录进画面。
+
+    Args:
+        final_filename: 最终视频文件路径
+        scene_indices: 参与拼接的片段索引（按顺序）
+        subtitles: 全部片段的字幕列表
+    """
+    texts = [subtitles[i] if i < len(subtitles) else "" for i in scene_indices]
+    durations = [scene_duration(i) for i in scene_indices]
+    timings = [scene_words(i) for i in scene_indices]
+    cues = build_cues(texts, durations, timings, subtitle_max_chars)
+    if not cues:
+        print("没有需要输出的字幕")
+        return
+
+    final_filename = Path(final_filename)
+    frame_size = probe_stream_params(final_filename)["size"]
+    font = load_font(config.subtitle_font, config.subtitle_fontsize)
+    style = AssStyle(
+        font_name=font.getname()[0],
+        font_size=config.subtitle_fontsize,
+        color=config.subtitle_fontcolor,
+        stroke_color=config.subtitle_stroke_color,
+        stroke_width=config.subtitle_stroke_width,
+        pixel_from_bottom=config.subtitle_pixel_from_bottom,
+    )
+    srt_path = write_srt(cues, final_filename.with_suffix(".srt"))
+    ass_path = write_ass(cues, final_filename.with_suffix(".ass"), style, frame_size)
+    print(f"字幕文件已生成: {srt_path.name}, {ass_path.name}")
+
+    if subtitle_mode not in ("soft", "filter"):
+        return
+
+    temp_output = final_filename.with_name(f"{final_filename.stem}.subtitled.mp4")
+    try:
+        if subtitle_mode == "soft":
+            mux_soft_subtitles(final_filename, srt_path, temp_output)
+            print("已封装软字幕轨道")
+        else:
+            fonts_dir = None
+            if config.subtitle_font and Path(config.subtitle_font).is_file():
+                fonts_dir = Path(config.subtitle_font).parent
+            burn_subtitles(
+                final_filename,
+                ass_path,
+                temp_output,
+                fonts_dir=fonts_dir,
+                preset=encoder_preset,
+                ffmpeg_params=FFMPEG_OUTPUT_PARAMS,
+            )
+            print("已通过 subtitles 滤镜烧录字幕")
+        os.replace(temp_output, final_filename)
+    except FFmpegEncodeError as e:
+        print(f"输出字幕轨道失败，保留外挂字幕文件: {e}")
+
+
+def concat_with_reencode(filenames, final_filename):
+    """解码全部片段并重新编码拼接（片段参数不一致时使用）
+
+    Args:
+        filenames: 按顺序排列的片段路径
+        final_filename: 输出文件路径
+
+    Returns:
+        bool: 是否拼接成功
+    """
     try:
         clips = []
-        for filename in temp_filenames:
+        for filename in filenames:
             try:
-                # 验证文件完整性
-                if not os.path.exists(filename) or os.path.getsize(filename) == 0:
-                    print(f"跳过无效的视频文件: {filename}")
-                    continue
-
                 clip = VideoFileClip(filename)
                 # 验证视频片段是否有效
                 if clip.duration > 0:
@@ -544,31 +909,14 @@ def main(json_file_path=None):
 
         final_video = concatenate_videoclips(clips, method="compose")
 
-        # 生成最终视频文件名
-        timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
-        final_filename = video_dir / f"output_{timestamp}.mp4"
-
         print(f"正在输出最终视频: {final_filename}")
         final_video.write_videofile(
             str(final_filename),
             logger=None,
             audio_codec="aac",
             codec="libx264",
-            preset="slow",  # 更保守的预设，确保质量
-            ffmpeg_params=[
-                "-pix_fmt",
-                "yuv420p",
-                "-cr",
-                "18",  # 更高质量
-                "-profile:v",
-                "baseline",  # 基线配置，最大兼容性
-                "-level",
-                "3.0",  # 兼容性级别
-                "-movflags",
-                "+faststart",  # 优化流媒体
-                "-strict",
-                "experimental",  # 允许实验性编码器
-            ],
+            preset=encoder_preset,
+            ffmpeg_params=FFMPEG_OUTPUT_PARAMS,
         )
 
         # 清理资源
@@ -577,21 +925,12 @@ def main(json_file_path=None):
         final_video.close()
 
         print(f"视频生成完成: {final_filename}")
+        return True
 
     except Exception as e:
         print(f"合并视频失败: {e}")
         return False
 
-    # 清理临时文件
-    print("清理临时文件...")
-    for filename in temp_filenames:
-        try:
-            os.remove(filename)
-        except Exception as e:
-            print(f"删除临时文件失败 {filename}: {e}")
-
-    return True
-
 
 def delete_all_files(directory):
     """删除目录中的所有文件"""
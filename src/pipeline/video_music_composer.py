@@ -28,6 +28,8 @@ from moviepy.video.compositing.CompositeVideoClip import (
 from moviepy.video.io.VideoFileClip import VideoFileClip
 
 from src.config import config
+from src.media.concat import can_stream_copy, concat_stream_copy, probe_stream_params
+from src.media.ffmpeg_encoder import FFmpegEncodeError
 
 
 class VideoMusicComposer:
@@ -92,14 +94,13 @@ class VideoMusicComposer:
         return music_path
 
     def calculate_total_video_duration(self, video_files: List[Path]) -> float:
-        """计算所有视频片段的总时长"""
+        """计算所有视频片段的总时长（只解析文件头，不解码）"""
         total_duration = 0.0
 
         print("正在计算视频总时长...")
         for video_file in tqdm(video_files, desc="分析视频文件"):
             try:
-                with VideoFileClip(str(video_file)) as clip:
-                    total_duration += clip.duration
+                total_duration += probe_stream_params(video_file)["duration"]
             except Exception as e:
                 print(f"警告: 无法读取视频文件 {video_file}: {e}")
                 continue
@@ -201,6 +202,11 @@ class VideoMusicComposer:
             timestamped_filename = f"{output_filename}_{timestamp}"
         output_path = self.output_dir / timestamped_filename
 
+        if config.video_concat_mode == "copy" and can_stream_copy(video_files):
+            if self.compose_with_stream_copy(video_files, music_path, output_path):
+                return True
+            print("流拷贝合成失败，回退到重新编码")
+
         try:
             print(f"开始合成 {len(video_files)} 个视频片段...")
 
@@ -297,6 +303,39 @@ class VideoMusicComposer:
             print(f"❌ 视频音乐合成失败: {e}")
             return False
 
+    def compose_with_stream_copy(
+        self, video_files: List[Path], music_path: Path, output_path: Path
+    ) -> bool:
+        """流拷贝视频并混入循环背景音乐（视频流不解码、不重新编码）
+
+        Args:
+            video_files: 按顺序排列的视频片段（编码参数一致）
+            music_path: 背景音乐文件
+            output_path: 输出文件路径
+
+        Returns:
+            bool: 是否合成成功
+        """
+        total_duration = sum(
+            probe_stream_params(video_file)["duration"] for video_file in video_files
+        )
+        print(f"片段参数一致，使用流拷贝合成，视频总时长: {total_duration:.2f}秒")
+
+        try:
+            concat_stream_copy(
+                video_files,
+                output_path,
+                list_path=self.temp_dir / f"{output_path.stem}.concat.txt",
+                audio_path=music_path,
+                duration=total_duration,
+            )
+        except FFmpegEncodeError as e:
+            print(f"流拷贝合成失败: {e}")
+            return False
+
+        print(f"✅ 视频音乐合成完成: {output_path}")
+        return True
+
     def run(
         self,
         music_filename: Optional[str] = None,
@@ -1,36 +1,80 @@
 import argparse
 import asyncio
+import functools
 import html
 import json
+import os
+import re
 import sys
+from concurrent.futures import ThreadPoolExecutor
 from io import BytesIO
 from pathlib import Path
 
-import azure.cognitiveservices.speech as speechsdk
-from azure.cognitiveservices.speech import (
-    ResultReason,
-    SpeechConfig,
-    SpeechSynthesizer,
-)
-from pydub import AudioSegment
-from pydub.silence import split_on_silence
-from tqdm.asyncio import tqdm as async_tqdm
+from tqdm import tqdm
+
+try:
+    import azure.cognitiveservices.speech as speechsdk
+    from azure.cognitiveservices.speech import (
+        CancellationErrorCode,
+        Connection,
+        ResultReason,
+        SpeechConfig,
+        SpeechSynthesizer,
+    )
+except ImportError:  # 未安装 Azure 语音 SDK 时只能使用本地引擎（TTS_PROVIDER=local）
+    speechsdk = None
 
 # 添加项目根目录到Python路径
 project_root = Path(__file__).parent.parent.parent
 sys.path.insert(0, str(project_root))
 
+from src import profiler
 from src.config import config
+from src.content_cache import ContentCache, make_key
+from src.media.audio_encoder import audio_extension, encode_audio
+from src.media.audio_info import (
+    AUDIO_EXTENSIONS,
+    audio_duration,
+    read_sidecar,
+    sidecar_path,
+    write_sidecar,
+)
+from src.media.loudness import audio_stats, normalize_wav
+from src.media.silence import trim_silence_timed
+from src.services.tts.base import TTSProvider
+from src.services.tts.batching import mark_name, plan_batches, split_wav
+from src.services.tts.local_provider import LocalTTSProvider
+from src.services.tts.pool import SynthesizerPool
+from src.services.tts.timing import (
+    BOUNDARY_TYPES,
+    boundary_record,
+    split_boundaries,
+)
+from src.services.tts.scheduler import (
+    NonRetryableError,
+    RetryableError,
+    ThrottledError,
+    TTSScheduler,
+)
+
+# 语音缓存：按规范化后的 SSML 复用已合成（并裁剪静音）的音频
+# 后处理逻辑变化导致输出不同时需要递增版本号，使旧缓存失效
+TTS_CACHE_VERSION = 2
+
+
+class SpeechProvider(TTSProvider):
+    """Azure 语音服务"""
 
-# 验证Azure配置
-if not config.azure_speech_key:
-    print("错误: 未配置Azure语音服务密钥，请在.env文件中设置AZURE_SPEECH_KEY")
-    sys.exit(1)
+    supports_batching = True
 
+    def __init__(self, scheduler=None, preconnect=False):
+        """初始化语音合成提供者
 
-class SpeechProvider:
-    def __init__(self):
-        """初始化语音合成提供者"""
+        Args:
+            scheduler: TTS 请求调度器（控制并发、速率和重试），默认按调度器默认参数创建
+            preconnect: 合成器创建时是否预先建立连接（否则在首次合成时连接）
+        """
+        super().__init__(scheduler)
         self.subscription = config.azure_speech_key
         self.region = config.azure_speech_region
         self.voice_name = config.azure_voice_name
@@ -41,87 +85,581 @@ class SpeechProvider:
         self.prosody_volume = config.azure_voice_volume
         self.emphasis_level = config.azure_voice_emphasis
         self.style_degree = config.azure_voice_style_degree
-
-    async def get_tts_audio(self, message, language, index, max_retries=3):
-        """获取TTS音频数据"""
-        for attempt in range(max_retries):
-            try:
-                speech_config = SpeechConfig(
-                    subscription=self.subscription, region=self.region
+        self.preconnect = preconnect
+        # 合成器数量与并发上限相同，请求之间复用
+        self.pool = SynthesizerPool(
+            self.create_synthesizer,
+            size=self.scheduler.max_concurrency,
+            connect=open_connection if preconnect else None,
+        )
+
+    def create_synthesizer(self):
+        """创建合成器（只在池中缺少可用实例时调用）"""
+        speech_config = SpeechConfig(subscription=self.subscription, region=self.region)
+        speech_config.speech_synthesis_voice_name = self.voice_name
+        return SpeechSynthesizer(speech_config=speech_config, audio_config=None)
+
+    def _synthesize(self, ssml_text, bookmarks=None, words=None):
+        """发起一次合成请求（阻塞调用，在线程池中执行），合成器从池中借用
+
+        Args:
+            ssml_text: SSML 文档
+            bookmarks: 传入列表时，合成过程中到达的书签以 (书签名, 音频偏移) 追加到其中
+            words: 传入列表时，合成过程中的词和标点边界以字词时间记录追加到其中
+        """
+        with self.pool.borrow() as synthesizer:
+            if bookmarks is None and words is None:
+                return synthesizer.speak_ssml_async(ssml_text).get()
+            if bookmarks is not None:
+                synthesizer.bookmark_reached.connect(
+                    lambda evt: bookmarks.append((evt.text, evt.audio_offset))
                 )
-                speech_config.speech_synthesis_voice_name = self.voice_name
-
-                synthesizer = SpeechSynthesizer(
-                    speech_config=speech_config, audio_config=None
+            if words is not None:
+                synthesizer.synthesis_word_boundary.connect(
+                    lambda evt: record_boundary(words, evt)
                 )
-
-                escaped_message = html.escape(message)
-
-                ssml_text = """
-                <speak version='1.0' xmlns='http://www.w3.org/2001/10/synthesis' xmlns:mstts='http://www.w3.org/2001/mstts' xml:lang='{language}'>
-                  <voice name='{self.voice_name}'>
-                    <mstts:express-as style='{self.style}' role='{self.role}' styledegree='{self.style_degree}'>
-                      <prosody rate='{self.prosody_rate}' pitch='{self.prosody_pitch}' volume='{self.prosody_volume}'>
-                        {escaped_message}
-                      </prosody>
-                    </mstts:express-as>
-                  </voice>
-                </speak>
-                """
-
-                loop = asyncio.get_running_loop()
-                result = await loop.run_in_executor(
-                    None, lambda: synthesizer.speak_ssml_async(ssml_text).get()
-                )
-
-                if result.reason == ResultReason.SynthesizingAudioCompleted:
-                    audio_data = BytesIO(result.audio_data)
-                    return {"index": index, "audio_data": audio_data, "error": None}
-                elif result.reason == ResultReason.Canceled:
-                    cancellation_details = speechsdk.SpeechSynthesisCancellationDetails(
-                        result
-                    )
-                    error_msg = f"语音合成被取消：{cancellation_details.reason} - {cancellation_details.error_details}"
-                    if attempt < max_retries - 1:
-                        print(
-                            f"序号 {index} 合成失败 (尝试 {attempt + 1}/{max_retries}): {error_msg}"
-                        )
-                        await asyncio.sleep(1)  # 等待1秒后重试
-                    else:
-                        return {"index": index, "audio_data": None, "error": error_msg}
-
+            try:
+                return synthesizer.speak_ssml_async(ssml_text).get()
+            finally:
+                # 合成器会被其他请求复用，不保留本次的回调
+                if bookmarks is not None:
+                    synthesizer.bookmark_reached.disconnect_all()
+                if words is not None:
+                    synthesizer.synthesis_word_boundary.disconnect_all()
+
+    def build_ssml(self, content, language):
+        """用当前的语音、风格和韵律设置包装 SSML 文档
+
+        Args:
+            content: 已转义的正文（可包含书签等 SSML 标记）
+            language: 语言代码
+
+        Returns:
+            str: SSML 文档
+        """
+        return f"""
+            <speak version='1.0' xmlns='http://www.w3.org/2001/10/synthesis' xmlns:mstts='http://www.w3.org/2001/mstts' xml:lang='{language}'>
+              <voice name='{self.voice_name}'>
+                <mstts:express-as style='{self.style}' role='{self.role}' styledegree='{self.style_degree}'>
+                  <prosody rate='{self.prosody_rate}' pitch='{self.prosody_pitch}' volume='{self.prosody_volume}'>
+                    {content}
+                  </prosody>
+                </mstts:express-as>
+              </voice>
+            </speak>
+            """
+
+    def cache_key(self, message, language):
+        """片段的语音缓存键（文本、语言、语音和韵律设置均参与计算）"""
+        ssml_text = self.build_ssml(html.escape(message), language)
+        return make_key("azure", normalize_ssml(ssml_text))
+
+    def warm_up(self, count=None):
+        """开启预连接时，并发创建并连接合成器（不超过 count 个）"""
+        if not self.preconnect:
+            return 0
+        return self.pool.warm_up(count)
+
+    def close(self):
+        self.pool.close()
+
+    def summary(self):
+        return (
+            f"合成器: 创建 {self.pool.created} 个, 共处理 {self.pool.borrowed} 次请求"
+        )
+
+    async def _request(self, ssml_text, bookmarks=None, words=None):
+        """发起一次合成并检查结果，失败时抛出对应的调度异常"""
+        profiler.count(profiler.NETWORK_CALLS)
+        loop = asyncio.get_running_loop()
+        result = await loop.run_in_executor(
+            None, lambda: self._synthesize(ssml_text, bookmarks, words)
+        )
+        if result.reason == ResultReason.SynthesizingAudioCompleted:
+            return result
+        if result.reason == ResultReason.Canceled:
+            raise cancellation_error(result)
+        raise RetryableError(f"语音合成未完成：{result.reason}")
+
+    async def get_tts_audio(self, message, language, index, max_retries=None):
+        """获取TTS音频数据
+
+        请求经调度器限制并发和速率，失败时按指数退避重试，限流时自动降低并发。
+
+        Args:
+            message: 合成文本
+            language: 语言代码
+            index: 片段序号
+            max_retries: 最大尝试次数，默认使用调度器的设置
+
+        Returns:
+            dict: index、audio_data（BytesIO，失败为 None）、error 和 words（字词时间）
+        """
+
+        async def request():
+            # 每次尝试重新记录字词时间
+            words = []
+            return await self._request(ssml_text, words=words), words
+
+        try:
+            ssml_text = self.build_ssml(html.escape(message), language)
+            result, words = await self.scheduler.submit(
+                request, max_attempts=max_retries, label=f"序号 {index} 合成"
+            )
+        except (RetryableError, NonRetryableError) as e:
+            return {"index": index, "audio_data": None, "error": str(e)}
+        except Exception as e:
+            error_msg = f"语音合成异常: {str(e)}"
+            return {"index": index, "audio_data": None, "error": error_msg}
+
+        audio_data = BytesIO(result.audio_data)
+        return {"index": index, "audio_data": audio_data, "error": None, "words": words}
+
+    async def get_tts_batch(self, lines, language, max_retries=None):
+        """将连续多行合并为一个请求合成，按书签偏移切回每行的音频
+
+        每行前插入一个书签，合成时记录各书签的音频偏移，
+        缺少书签或切分失败视为可重试错误。
+
+        Args:
+            lines: (序号, 文本) 列表
+            language: 语言代码
+            max_retries: 最大尝试次数，默认使用调度器的设置
+
+        Returns:
+            list: 每行一个结果，格式同 get_tts_audio；批次失败时每行都带有错误信息
+        """
+        indices = [index for index, _ in lines]
+        label = f"序号 {indices[0]}-{indices[-1]} 批量合成"
+        content = "\n".join(
+            f"<bookmark mark='{mark_name(index)}'/>{html.escape(message)}"
+            for index, message in lines
+        )
+
+        async def request():
+            bookmarks, words = [], []
+            result = await self._request(
+                self.build_ssml(content, language), bookmarks, words
+            )
+            offsets = dict(bookmarks)
+            missing = [i for i in indices if mark_name(i) not in offsets]
+            if missing:
+                raise RetryableError(f"{label} 缺少书签: {missing}")
+            offsets = [offsets[mark_name(i)] for i in indices]
+            try:
+                segments = split_wav(result.audio_data, offsets)
             except Exception as e:
-                error_msg = f"语音合成异常: {str(e)}"
-                if attempt < max_retries - 1:
-                    print(
-                        f"序号 {index} 合成异常 (尝试 {attempt + 1}/{max_retries}): {error_msg}"
-                    )
-                    await asyncio.sleep(1)  # 等待1秒后重试
-                else:
-                    return {"index": index, "audio_data": None, "error": error_msg}
+                raise RetryableError(f"{label} 音频切分失败: {e}") from e
+            return segments, split_boundaries(words, offsets)
 
-        return {"index": index, "audio_data": None, "error": "达到最大重试次数"}
+        try:
+            segments, timings = await self.scheduler.submit(
+                request, max_attempts=max_retries, label=label
+            )
+        except (RetryableError, NonRetryableError) as e:
+            error_msg = str(e)
+        except Exception as e:
+            error_msg = f"语音合成异常: {str(e)}"
+        else:
+            return [
+                {
+                    "index": index,
+                    "audio_data": BytesIO(segment),
+                    "error": None,
+                    "words": words,
+                }
+                for index, segment, words in zip(indices, segments, timings)
+            ]
+        return [
+            {"index": index, "audio_data": None, "error": error_msg}
+            for index in indices
+        ]
 
 
-def remove_silence(audio_path):
-    """移除音频文件中的静音部分"""
+def create_provider(scheduler):
+    """按配置创建语音合成提供者
+
+    Args:
+        scheduler: TTS 请求调度器
+
+    Returns:
+        TTSProvider: 语音合成提供者
+
+    Raises:
+        ValueError: 不支持的服务或缺少必要的依赖、配置
+    """
+    if config.tts_provider == "local":
+        return LocalTTSProvider(
+            engine=config.tts_local_engine,
+            voice=config.tts_local_voice,
+            rate=config.azure_voice_rate,
+            pitch=config.azure_voice_pitch,
+            volume=config.azure_voice_volume,
+            command=config.tts_local_command or None,
+            scheduler=scheduler,
+        )
+    if config.tts_provider != "azure":
+        raise ValueError(
+            f"不支持的语音合成服务: {config.tts_provider}（支持: azure, local）"
+        )
+    if speechsdk is None:
+        raise ValueError(
+            "未安装 Azure 语音 SDK（azure-cognitiveservices-speech），"
+            "请安装后重试或设置 TTS_PROVIDER=local 使用本地引擎"
+        )
+    if not config.azure_speech_key:
+        raise ValueError("未配置Azure语音服务密钥，请在.env文件中设置AZURE_SPEECH_KEY")
+    return SpeechProvider(scheduler, preconnect=config.tts_preconnect)
+
+
+def record_boundary(words, evt):
+    """记录词和标点边界（句子边界与词边界重叠，忽略）"""
+    record = boundary_record(evt)
+    if record["type"] in BOUNDARY_TYPES:
+        words.append(record)
+
+
+def normalize_ssml(ssml_text):
+    """去掉 SSML 中不影响合成结果的空白（缩进、换行和标签之间的空白）"""
+    return re.sub(r">\s+<", "><", re.sub(r"\s+", " ", ssml_text)).strip()
+
+
+def open_connection(synthesizer):
+    """预先建立合成器与服务端的连接，返回需要保持引用的连接对象"""
+    connection = Connection.from_speech_synthesizer(synthesizer)
+    connection.open(True)
+    return connection
+
+
+def cancellation_error(result):
+    """将被取消的合成结果转换为对应的异常（限流 / 不可重试 / 可重试）"""
+    details = speechsdk.SpeechSynthesisCancellationDetails(result)
+    error_msg = f"语音合成被取消：{details.reason} - {details.error_details}"
+    if details.error_code == CancellationErrorCode.TooManyRequests:
+        return ThrottledError(error_msg)
+    if details.error_code in (
+        CancellationErrorCode.AuthenticationFailure,
+        CancellationErrorCode.BadRequest,
+        CancellationErrorCode.Forbidden,
+    ):
+        return NonRetryableError(error_msg)
+    return RetryableError(error_msg)
+
+
+async def synthesize_scene(provider, message, language, index):
+    """合成单个片段的语音，剖析中时记录该片段的耗时、请求数和重试次数"""
+    with profiler.span("scene", f"scene_{index}", scene=index) as scene:
+        result = await provider.get_tts_audio(message, language, index)
+        scene["status"] = "failed" if result["error"] else "ok"
+    return result
+
+
+async def synthesize_batch(provider, batch, language):
+    """合成一批连续片段，批量请求失败的行逐行重新合成
+
+    Args:
+        provider: 语音合成提供者
+        batch: (序号, 文本) 列表
+        language: 语言代码
+
+    Returns:
+        list: 每行一个结果
+    """
+    if len(batch) == 1:
+        index, message = batch[0]
+        return [await synthesize_scene(provider, message, language, index)]
+
+    name = f"batch_{batch[0][0]}_{batch[-1][0]}"
+    with profiler.span("step", name, lines=len(batch)) as step:
+        results = await provider.get_tts_batch(batch, language)
+        failed = {r["index"] for r in results if r["error"]}
+        step["status"] = "failed" if failed else "ok"
+    if not failed:
+        return results
+
+    print(f"批量合成失败，逐行重试 {len(failed)} 个片段: {results[0]['error']}")
+    retried = await asyncio.gather(
+        *(
+            synthesize_scene(provider, message, language, index)
+            for index, message in batch
+            if index in failed
+        )
+    )
+    retried = {r["index"]: r for r in retried}
+    return [retried.get(r["index"], r) for r in results]
+
+
+def prepare_audio(
+    audio_path,
+    audio_data,
+    words=None,
+    target_lufs=None,
+    peak_limit=-1.0,
+    sample_rate=0,
+    audio_format="wav",
+    bitrate="64k",
+):
+    """在内存中对合成结果做后处理
+
+    移除静音部分后，一次完成响度归一化、重采样和 16 位 PCM 转换，
+    同时得到写入附属统计文件的时长和响度信息，下游无需再解码音频；
+    最后按需编码为压缩格式。字词时间随静音裁剪换算后记入统计信息。
+
+    Args:
+        audio_path: 输出路径（用于日志）
+        audio_data: 合成得到的 WAV 内容
+        words: 合成时记录的字词时间（相对合成音频起点）
+        target_lufs: 目标积分响度，None 表示不调整响度
+        peak_limit: 峰值上限（dBFS）
+        sample_rate: 输出采样率，0 表示保持原采样率
+        audio_format: 输出格式（wav、mp3、aac 或 opus）
+        bitrate: 压缩格式的码率
+
+    Returns:
+        tuple: 处理后的音频内容和统计信息；处理失败时为原始音频和 None
+
+    Raises:
+        FFmpegEncodeError: 压缩编码失败
+    """
     try:
-        # Load audio
-        audio = AudioSegment.from_wav(audio_path)
-        # Split on silence
-        chunks = split_on_silence(audio, min_silence_len=10, silence_thresh=-50)
-        if chunks:  # 确保有音频块
-            # Concatenate non-silent chunks and export
-            non_silent_audio = sum(chunks)
-            non_silent_audio.export(audio_path, format="wav")
-        else:
+        words = words or []
+        times = [time for word in words for time in (word["start"], word["end"])]
+        trimmed, times = trim_silence_timed(
+            audio_data, times, min_silence_len=10, silence_thresh=-50
+        )
+        if trimmed is None:
             print(f"警告: {audio_path} 可能完全是静音")
+            trimmed = audio_data
+        audio_data, stats = normalize_wav(trimmed, target_lufs, peak_limit, sample_rate)
+        if words:
+            stats["words"] = [
+                dict(word, start=round(start, 3), end=round(end, 3))
+                for word, start, end in zip(words, times[::2], times[1::2])
+            ]
     except Exception as e:
         print(f"处理音频文件 {audio_path} 时出错: {e}")
+        stats = None
+
+    if audio_format != "wav":
+        audio_data = encode_audio(audio_data, audio_format, bitrate)
+        if stats is not None:
+            stats.update(format=audio_format, bytes=len(audio_data))
+    return audio_data, stats
+
+
+def audio_settings():
+    """语音后处理设置（响度、峰值上限、采样率和文件格式），同时参与语音缓存键的计算"""
+    return {
+        "target_lufs": (
+            config.tts_target_loudness if config.tts_loudness_normalize else None
+        ),
+        "peak_limit": config.tts_peak_limit,
+        "sample_rate": config.tts_sample_rate,
+        "audio_format": config.tts_audio_format,
+        "bitrate": config.tts_audio_bitrate,
+    }
+
+
+def remove_outputs(output_dir, index, keep=None):
+    """删除片段的音频（各种格式）和统计文件，保留 keep 指定的文件"""
+    for extension in AUDIO_EXTENSIONS:
+        path = output_dir / f"output_{index}{extension}"
+        if path != keep:
+            path.unlink(missing_ok=True)
+    if keep is None:
+        sidecar_path(output_dir / f"output_{index}.wav").unlink(missing_ok=True)
+
+
+def write_audio(audio_path, audio_data):
+    """原子地写入音频文件，文件出现时即为最终内容
+
+    先写临时文件再替换：输出文件可能是语音缓存的硬链接，不能原地覆盖；
+    下游阶段也可以在文件出现后立即读取，不会读到写了一半的音频。
+    """
+    tmp_path = audio_path.with_name(f".{audio_path.name}.{os.getpid()}.tmp")
+    with open(tmp_path, "wb") as f:
+        f.write(audio_data)
+    os.replace(tmp_path, audio_path)
+
+
+def cached_stats(audio_path, cache_key, stats_cache=None):
+    """缓存命中片段的统计信息
+
+    附属统计文件属于同一缓存条目时直接复用，其次从统计缓存中取出
+    （包含字词时间），否则重新统计并写入（压缩格式只解析文件头读取时长）。
+    """
+    stats = read_sidecar(audio_path)
+    if stats is not None and stats.get("cache_key") == cache_key:
+        return stats
+    if stats_cache is not None and stats_cache.fetch(
+        cache_key, sidecar_path(audio_path)
+    ):
+        stats = read_sidecar(audio_path)
+    if stats is None or stats.get("cache_key") != cache_key:
+        try:
+            if audio_path.suffix == ".wav":
+                stats = audio_stats(audio_path.read_bytes())
+            else:
+                stats = {
+                    "duration": audio_duration(audio_path),
+                    "format": audio_path.suffix[1:],
+                    "bytes": audio_path.stat().st_size,
+                }
+        except Exception as e:
+            print(f"读取音频统计信息失败 - {audio_path}: {e}")
+            return None
+        stats["cache_key"] = cache_key
+        write_sidecar(audio_path, stats)
+    return stats
+
+
+async def run_tts_pipeline(
+    provider,
+    batches,
+    language,
+    output_dir,
+    cache=None,
+    cache_keys=None,
+    stats_cache=None,
+    post_workers=2,
+    on_ready=None,
+    settings=None,
+):
+    """以流水线方式合成、后处理并写入语音
+
+    合成、后处理（线程池）和写文件是三个独立的阶段，之间用有界队列连接：
+    后处理不会阻塞网络请求，下游处理慢时上游暂停取新的批次，内存占用有上限。
+    总耗时取决于最慢的阶段而不是各阶段之和。
+
+    Args:
+        provider: 语音合成提供者
+        batches: plan_batches 生成的批次列表
+        language: 语言代码
+        output_dir: 输出目录
+        cache: 语音缓存，写入后将文件存入缓存
+        cache_keys: 序号到缓存键的映射
+        stats_cache: 统计文件缓存，与音频使用相同的缓存键
+        post_workers: 后处理线程数
+        on_ready: 每个片段的音频写入完成后调用 on_ready(序号, 文件路径)
+        settings: 后处理设置（prepare_audio 的响度、峰值上限和采样率参数）
+
+    Returns:
+        list: 每个片段的结果（index、error、stats），按完成顺序排列
+    """
+    loop = asyncio.get_running_loop()
+    settings = settings or {}
+    extension = audio_extension(settings.get("audio_format", "wav"))
+    post_workers = max(1, post_workers)
+    synth_workers = max(1, min(provider.scheduler.max_concurrency, len(batches)))
+    batch_queue = asyncio.Queue()
+    synthesized = asyncio.Queue(maxsize=post_workers * 2)
+    processed = asyncio.Queue(maxsize=post_workers * 2)
+    for batch in batches:
+        batch_queue.put_nowait(batch)
+
+    post_executor = ThreadPoolExecutor(
+        max_workers=post_workers, thread_name_prefix="tts-post"
+    )
+    write_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="tts-write")
+    results = []
+    progress = tqdm(total=sum(len(batch) for batch in batches), desc="正在合成配音")
+
+    async def synthesize():
+        while not batch_queue.empty():
+            batch = batch_queue.get_nowait()
+            for result in await synthesize_batch(provider, batch, language):
+                await synthesized.put(result)
+
+    async def post_process():
+        while (result := await synthesized.get()) is not None:
+            if result["audio_data"] is not None:
+                output_path = output_dir / f"output_{result['index']}{extension}"
+                try:
+                    result["audio_data"], result["stats"] = await loop.run_in_executor(
+                        post_executor,
+                        functools.partial(
+                            prepare_audio,
+                            output_path,
+                            result["audio_data"].getvalue(),
+                            words=result.pop("words", None),
+                            **settings,
+                        ),
+                    )
+                except Exception as e:
+                    result["audio_data"] = None
+                    result["error"] = str(e)
+            await processed.put(result)
+
+    def save(index, audio_data, stats):
+        output_path = output_dir / f"output_{index}{extension}"
+        # 统计文件先于音频写入：音频出现时统计信息已经就绪
+        if stats is not None:
+            if cache_keys:
+                stats["cache_key"] = cache_keys[index]
+            sidecar = write_sidecar(output_path, stats)
+            if stats_cache is not None:
+                stats_cache.put(cache_keys[index], sidecar)
+        write_audio(output_path, audio_data)
+        if cache is not None:
+            cache.put(cache_keys[index], output_path)
+        return output_path
+
+    async def write():
+        while (result := await processed.get()) is not None:
+            index = result["index"]
+            audio_data = result.pop("audio_data")
+            progress.update(1)
+            if result["error"]:
+                print(f"合成失败 - 序号 {index}: {result['error']}")
+            elif audio_data is None:
+                result["error"] = "未返回音频数据"
+            else:
+                try:
+                    output_path = await loop.run_in_executor(
+                        write_executor, save, index, audio_data, result.get("stats")
+                    )
+                except Exception as e:
+                    result["error"] = f"保存音频文件失败: {e}"
+                    print(f"保存音频文件失败 - 序号 {index}: {e}")
+                else:
+                    if on_ready is not None:
+                        on_ready(index, output_path)
+            results.append(result)
 
+    async def run_stage(worker, count, next_queue, consumers):
+        # 本阶段的所有协程结束后，通知下一阶段的每个消费者退出
+        try:
+            await asyncio.gather(*(worker() for _ in range(count)))
+        finally:
+            for _ in range(consumers):
+                await next_queue.put(None)
 
-async def process_text_files(input_file, output_dir, language):
-    """处理文本文件生成语音"""
+    try:
+        await asyncio.gather(
+            run_stage(synthesize, synth_workers, synthesized, post_workers),
+            run_stage(post_process, post_workers, processed, 1),
+            write(),
+        )
+    finally:
+        progress.close()
+        post_executor.shutdown()
+        write_executor.shutdown()
+    return results
+
+
+async def process_text_files(input_file, output_dir, language, on_ready=None):
+    """处理文本文件生成语音
+
+    Args:
+        input_file: 分镜 JSON 文件
+        output_dir: 音频输出目录
+        language: 语言代码
+        on_ready: 每个片段的音频就绪（合成写入完成或从缓存取出）后调用
+            on_ready(序号, 文件路径)，下游阶段可以据此逐个片段开始处理
+
+    Returns:
+        list: 每个片段的结果（index、error）
+    """
     print("Step 3: 语音合成")
     print(f"输入文件: {input_file}")
     print(f"输出目录: {output_dir}")
@@ -171,45 +709,133 @@ async def process_text_files(input_file, output_dir, language):
 
         print(f"找到 {len(texts)} 个文本片段")
 
-        provider = SpeechProvider()
-
-        # 创建任务
-        tasks = [provider.get_tts_audio(text, language, index) for index, text in texts]
-
+        scheduler = TTSScheduler(
+            max_concurrency=config.tts_max_concurrency,
+            rate=config.tts_rate_limit,
+            max_attempts=config.tts_max_attempts,
+            backoff_base=config.tts_backoff_base,
+            backoff_max=config.tts_backoff_max,
+        )
+        print(
+            f"并发上限: {scheduler.max_concurrency}, "
+            f"速率上限: {config.tts_rate_limit or '不限'} 次/秒, "
+            f"最大尝试次数: {scheduler.max_attempts}"
+        )
+        # 合成请求在线程池中阻塞等待，线程数需覆盖并发上限
+        asyncio.get_running_loop().set_default_executor(
+            ThreadPoolExecutor(max_workers=scheduler.max_concurrency)
+        )
+        try:
+            provider = create_provider(scheduler)
+        except ValueError as e:
+            print(f"错误: {e}")
+            return []
+        print(f"语音合成服务: {provider}")
+
+        # 命中语音缓存的片段直接取出，只合成新增或修改过的文本
+        cache = None
+        stats_cache = None
+        cache_keys = {}
+        settings = audio_settings()
+        extension = audio_extension(settings["audio_format"])
+        if config.tts_cache:
+            cache = ContentCache(
+                config.tts_cache_dir,
+                suffix=extension,
+                max_bytes=config.tts_cache_max_mb * 1024 * 1024,
+            )
+            # 统计文件（时长、响度和字词时间）随音频一起缓存
+            stats_cache = ContentCache(
+                config.tts_cache_dir,
+                suffix=".json",
+                max_bytes=config.tts_cache_max_mb * 1024 * 1024,
+            )
+            cache_keys = {
+                index: make_key(
+                    TTS_CACHE_VERSION,
+                    provider.cache_key(text, language),
+                    json.dumps(settings, sort_keys=True),
+                )
+                for index, text in texts
+            }
         results = []
-        success_count = 0
-        error_count = 0
-
-        for f in async_tqdm(
-            asyncio.as_completed(tasks), total=len(tasks), desc="正在合成配音"
-        ):
-            result = await f
-
-            if result["error"]:
-                print(f"合成失败 - 序号 {result['index']}: {result['error']}")
-                error_count += 1
-                continue
-
-            audio_data = result["audio_data"]
-            if audio_data:
-                output_path = output_dir / f"output_{result['index']}.wav"
-                try:
-                    with open(output_path, "wb") as f:
-                        f.write(audio_data.getbuffer())
-                    remove_silence(
-                        output_path
-                    )  # Remove silence after saving the audio file
-                    success_count += 1
-                except Exception as e:
-                    print(f"保存音频文件失败 - 序号 {result['index']}: {e}")
-                    error_count += 1
+        pending = []
+        for index, text in texts:
+            output_path = output_dir / f"output_{index}{extension}"
+            if cache is not None and cache.fetch(cache_keys[index], output_path):
+                # 切换过格式时删除其他格式的旧文件，下游按扩展名查找时不会取错
+                remove_outputs(output_dir, index, keep=output_path)
+                results.append(
+                    {
+                        "index": index,
+                        "error": None,
+                        "cached": True,
+                        "stats": cached_stats(
+                            output_path, cache_keys[index], stats_cache
+                        ),
+                    }
+                )
             else:
-                error_count += 1
+                pending.append((index, text))
+        cached_count = len(results)
+        # 需要重新合成的片段先删除旧文件，输出目录中存在的音频都是最终结果
+        for index, _ in pending:
+            remove_outputs(output_dir, index)
+        if cache is not None:
+            profiler.count("cache_hits", cached_count)
+            print(f"语音缓存命中 {cached_count} 个片段，需要合成 {len(pending)} 个")
+
+        # 连续多行合并为一个请求，返回后按书签切回每行的音频
+        batch_size = config.tts_batch_size if provider.supports_batching else 1
+        batches = plan_batches(pending, batch_size)
+        if len(batches) < len(pending):
+            print(f"批量合成: {len(pending)} 个片段合并为 {len(batches)} 个请求")
+
+        if batches:
+            # 并发创建并连接合成器（不超过请求数），首批请求无需等待握手
+            warmed = await asyncio.get_running_loop().run_in_executor(
+                None, provider.warm_up, len(batches)
+            )
+            if warmed:
+                print(f"已预连接 {warmed} 个合成器")
 
-            results.append(result)
+        if on_ready is not None:
+            for result in results:
+                on_ready(
+                    result["index"], output_dir / f"output_{result['index']}{extension}"
+                )
+
+        if batches:
+            results += await run_tts_pipeline(
+                provider,
+                batches,
+                language,
+                output_dir,
+                cache=cache,
+                cache_keys=cache_keys,
+                stats_cache=stats_cache,
+                post_workers=config.tts_postprocess_workers,
+                on_ready=on_ready,
+                settings=settings,
+            )
+        error_count = sum(1 for result in results if result["error"])
+        success_count = len(results) - error_count
 
         # CSV文件无需关闭
         print(f"语音合成完成！成功: {success_count}, 失败: {error_count}")
+        if cache is not None:
+            evicted = cache.evict()
+            stats_cache.evict()
+            if evicted:
+                print(f"语音缓存超出容量上限，已淘汰 {evicted} 个旧条目")
+        provider.close()
+        if provider.summary():
+            print(provider.summary())
+        if scheduler.throttled:
+            print(
+                f"合成期间被限流 {scheduler.throttled} 次，"
+                f"最终并发上限: {scheduler.limit}"
+            )
         return results
 
     except Exception as e:
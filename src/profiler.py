@@ -0,0 +1,457 @@
+# -*- coding: utf-8 -*-
+"""
+流水线性能剖析
+
+按阶段和片段记录墙钟时间、CPU 时间、峰值内存、磁盘读写字节数、网络请求数和重试次数，
+运行结束后在输出目录生成 JSON / CSV 报告，用于判断时间花在了哪个服务或编码环节。
+
+主进程调用 start_session 开启剖析后，事件文件路径通过环境变量传递给各阶段子进程
+（以及子进程中的工作进程），它们以追加方式写入同一个 JSONL 事件文件；
+未开启剖析时所有记录函数均为空操作。
+"""
+
+import atexit
+import contextvars
+import csv
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+
+try:
+    import resource
+except ImportError:  # Windows 不提供 resource 模块，只记录时间和计数
+    resource = None
+
+PathLike = Union[str, Path]
+
+# 事件文件路径和当前阶段名称，由主进程写入环境变量并被子进程继承
+EVENTS_ENV = "STORY_FLOW_PROFILE_EVENTS"
+STAGE_ENV = "STORY_FLOW_PROFILE_STAGE"
+
+# 常用计数器名称
+NETWORK_CALLS = "network_calls"
+RETRIES = "retries"
+
+# CSV 报告的固定列，计数器按名称追加在后面
+CSV_FIELDS = (
+    "kind",
+    "stage",
+    "name",
+    "status",
+    "pid",
+    "wall_time",
+    "cpu_time",
+    "child_cpu_time",
+    "peak_rss_mb",
+    "read_bytes",
+    "write_bytes",
+)
+
+# 当前所在的 span 计数器栈（按线程和 asyncio 任务隔离）
+_span_stack: contextvars.ContextVar = contextvars.ContextVar(
+    "profiler_span_stack", default=()
+)
+_write_lock = threading.Lock()
+_session: Optional["ProfileSession"] = None
+
+
+@dataclass
+class ResourceUsage:
+    """资源用量快照"""
+
+    cpu_time: float = 0.0  # 用户态 + 内核态 CPU 时间（秒）
+    peak_rss_mb: float = 0.0  # 峰值常驻内存（MB）
+    read_bytes: int = 0  # 块设备读取字节数（页缓存命中不计）
+    write_bytes: int = 0  # 块设备写入字节数
+
+    @classmethod
+    def from_rusage(cls, usage) -> "ResourceUsage":
+        """由 resource.struct_rusage 转换"""
+        # Linux 的 ru_maxrss 单位为 KB，macOS 为字节
+        rss_scale = 1024 * 1024 if sys.platform == "darwin" else 1024
+        return cls(
+            cpu_time=usage.ru_utime + usage.ru_stime,
+            peak_rss_mb=usage.ru_maxrss / rss_scale,
+            read_bytes=usage.ru_inblock * 512,
+            write_bytes=usage.ru_oublock * 512,
+        )
+
+
+def _usage(who: Optional[int]) -> Optional[ResourceUsage]:
+    if resource is None or who is None:
+        return None
+    return ResourceUsage.from_rusage(resource.getrusage(who))
+
+
+def _thread_scope() -> Optional[int]:
+    """当前线程的资源统计范围，平台不支持时退化为整个进程"""
+    if resource is None:
+        return None
+    return getattr(resource, "RUSAGE_THREAD", resource.RUSAGE_SELF)
+
+
+def enabled() -> bool:
+    """当前进程是否处于剖析中"""
+    return bool(os.environ.get(EVENTS_ENV))
+
+
+def current_stage() -> Optional[str]:
+    """当前所属的流水线阶段名称"""
+    return os.environ.get(STAGE_ENV) or None
+
+
+def record_event(event: Dict[str, Any]):
+    """向事件文件追加一条记录（多进程并发写入时每条记录一次写完）"""
+    path = os.environ.get(EVENTS_ENV)
+    if not path:
+        return
+    event.setdefault("stage", current_stage())
+    event.setdefault("pid", os.getpid())
+    line = (json.dumps(event, ensure_ascii=False, default=str) + "\n").encode("utf-8")
+    with _write_lock:
+        fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, line)
+        finally:
+            os.close(fd)
+
+
+def count(name: str, n: int = 1):
+    """累加计数器（如网络请求数、重试次数）
+
+    计入当前线程（或 asyncio 任务）最内层的 span；不在任何 span 内时单独记录一条计数事件，
+    汇总时按阶段合计。
+    """
+    if not enabled():
+        return
+    stack = _span_stack.get()
+    if stack:
+        stack[-1][name] += n
+    else:
+        record_event({"type": "count", "name": name, "n": n})
+
+
+@contextmanager
+def span(kind: str, name: str, per_thread: bool = True, **labels) -> Iterator[dict]:
+    """记录一段代码的耗时和资源用量
+
+    kind 为 stage 时表示在当前进程内运行的阶段，期间的所有记录都归属该阶段。
+
+    Args:
+        kind: 记录类型（如 stage、scene）
+        name: 名称
+        per_thread: CPU 时间和磁盘读写按当前线程统计（否则按整个进程）；
+            同一线程中并发的 asyncio 任务只有墙钟时间和计数器是独立的
+        **labels: 附加字段
+
+    Yields:
+        dict: 附加字段，调用方可在代码块内补充（如 status）
+    """
+    fields = dict(labels)
+    if not enabled():
+        yield fields
+        return
+
+    scope = _thread_scope() if per_thread else getattr(resource, "RUSAGE_SELF", None)
+    children_scope = getattr(resource, "RUSAGE_CHILDREN", None)
+    previous_stage = current_stage()
+    if kind == "stage":
+        os.environ[STAGE_ENV] = name
+    counters = Counter()
+    token = _span_stack.set(_span_stack.get() + (counters,))
+    started_at = time.time()
+    start_wall = time.perf_counter()
+    start = _usage(scope)
+    start_children = _usage(children_scope)
+    try:
+        yield fields
+    except BaseException:
+        fields.setdefault("status", "error")
+        raise
+    finally:
+        _span_stack.reset(token)
+        if kind == "stage":
+            if previous_stage is None:
+                os.environ.pop(STAGE_ENV, None)
+            else:
+                os.environ[STAGE_ENV] = previous_stage
+        event = {
+            "type": "span",
+            "kind": kind,
+            "name": name,
+            "started_at": started_at,
+            "wall_time": time.perf_counter() - start_wall,
+        }
+        end = _usage(scope)
+        end_children = _usage(children_scope)
+        if start is not None and end is not None:
+            event["cpu_time"] = end.cpu_time - start.cpu_time
+            event["read_bytes"] = end.read_bytes - start.read_bytes
+            event["write_bytes"] = end.write_bytes - start.write_bytes
+            # 线程统计的 maxrss 仍是整个进程的峰值
+            event["peak_rss_mb"] = end.peak_rss_mb
+        if start_children is not None and end_children is not None:
+            # 期间结束的子进程（如 ffmpeg）的 CPU 时间，线程并发时为整个进程的合计
+            event["child_cpu_time"] = end_children.cpu_time - start_children.cpu_time
+        event["counters"] = dict(counters)
+        event.update(fields)
+        if kind == "stage":
+            event["stage"] = name
+        record_event(event)
+
+
+def _read_pipes(proc: subprocess.Popen) -> Tuple[List[threading.Thread], dict]:
+    """在后台线程读取子进程的输出管道，避免管道写满阻塞子进程"""
+    outputs = {}
+    threads = []
+    for name in ("stdout", "stderr"):
+        stream = getattr(proc, name)
+        if stream is None:
+            continue
+
+        def read(name=name, stream=stream):
+            outputs[name] = stream.read()
+            stream.close()
+
+        thread = threading.Thread(target=read, daemon=True)
+        thread.start()
+        threads.append(thread)
+    return threads, outputs
+
+
+def run_stage(stage: str, cmd: List[str], **kwargs) -> subprocess.CompletedProcess:
+    """以子进程运行一个流水线阶段，剖析中时记录其资源用量
+
+    参数与 subprocess.run 相同（支持 capture_output / text / cwd / stdin 等）。
+    子进程及其等待过的后代进程的 CPU 时间、峰值内存和磁盘读写由 wait4 取得。
+
+    Returns:
+        subprocess.CompletedProcess: 运行结果
+    """
+    if not enabled() or not hasattr(os, "wait4"):
+        return subprocess.run(cmd, **kwargs)
+
+    if kwargs.pop("capture_output", False):
+        kwargs["stdout"] = subprocess.PIPE
+        kwargs["stderr"] = subprocess.PIPE
+    env = dict(kwargs.pop("env", None) or os.environ)
+    env[STAGE_ENV] = stage
+
+    started_at = time.time()
+    start_wall = time.perf_counter()
+    proc = subprocess.Popen(cmd, env=env, **kwargs)
+    threads, outputs = _read_pipes(proc)
+    try:
+        _, status, rusage = os.wait4(proc.pid, 0)
+    except BaseException:
+        proc.kill()
+        proc.wait()
+        raise
+    proc.returncode = os.waitstatus_to_exitcode(status)
+    wall_time = time.perf_counter() - start_wall
+    for thread in threads:
+        thread.join()
+
+    usage = ResourceUsage.from_rusage(rusage)
+    record_event(
+        {
+            "type": "span",
+            "kind": "stage",
+            "name": stage,
+            "stage": stage,
+            "status": "ok" if proc.returncode == 0 else "failed",
+            "started_at": started_at,
+            "wall_time": wall_time,
+            "cpu_time": usage.cpu_time,
+            "peak_rss_mb": usage.peak_rss_mb,
+            "read_bytes": usage.read_bytes,
+            "write_bytes": usage.write_bytes,
+            "counters": {},
+        }
+    )
+    return subprocess.CompletedProcess(
+        proc.args, proc.returncode, outputs.get("stdout"), outputs.get("stderr")
+    )
+
+
+def load_events(path: PathLike) -> List[dict]:
+    """读取事件文件（跳过被中断写入的不完整行）"""
+    events = []
+    path = Path(path)
+    if not path.exists():
+        return events
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                events.append(json.loads(line))
+            except json.JSONDecodeError:
+                continue
+    return events
+
+
+def summarize(events: List[dict]) -> Dict[str, Any]:
+    """按阶段汇总事件
+
+    Returns:
+        dict: stages（每个阶段的资源用量及其内部所有计数器之和）和 spans（全部记录）
+    """
+    spans = [event for event in events if event.get("type") == "span"]
+    stage_counters: Dict[Optional[str], Counter] = {}
+    scene_counts: Counter = Counter()
+    for event in events:
+        stage = event.get("stage")
+        counters = stage_counters.setdefault(stage, Counter())
+        if event.get("type") == "count":
+            counters[event["name"]] += event.get("n", 1)
+        else:
+            counters.update(event.get("counters") or {})
+            if event.get("kind") == "scene":
+                scene_counts[stage] += 1
+
+    stages = []
+    for event in spans:
+        if event.get("kind") != "stage":
+            continue
+        stage = dict(event)
+        stage["counters"] = dict(stage_counters.get(event["name"], {}))
+        stage["scenes"] = scene_counts.get(event["name"], 0)
+        stages.append(stage)
+    return {"stages": stages, "spans": spans}
+
+
+def write_report(
+    events: List[dict], output_dir: PathLike, run_id: str
+) -> Tuple[Path, Path]:
+    """写出 JSON 和 CSV 报告
+
+    Args:
+        events: 事件列表
+        output_dir: 报告目录
+        run_id: 运行标识（用于文件名）
+
+    Returns:
+        (JSON 报告路径, CSV 报告路径)
+    """
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    summary = summarize(events)
+
+    json_path = output_dir / f"profile_{run_id}.json"
+    report = {"run_id": run_id, **summary}
+    json_path.write_text(
+        json.dumps(report, ensure_ascii=False, indent=2, default=str),
+        encoding="utf-8",
+    )
+
+    counter_names = sorted(
+        {name for event in summary["spans"] for name in event.get("counters") or {}}
+        | {NETWORK_CALLS, RETRIES}
+    )
+    csv_path = output_dir / f"profile_{run_id}.csv"
+    with open(csv_path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(CSV_FIELDS + tuple(counter_names))
+        # 阶段行使用汇总后的计数器，其余行使用各自记录的计数器
+        for event in summary["stages"] + [
+            event for event in summary["spans"] if event.get("kind") != "stage"
+        ]:
+            counters = event.get("counters") or {}
+            writer.writerow(
+                [event.get(field, "") for field in CSV_FIELDS]
+                + [counters.get(name, 0) for name in counter_names]
+            )
+    return json_path, csv_path
+
+
+def print_summary(events: List[dict]):
+    """在控制台打印各阶段的用量摘要"""
+    stages = summarize(events)["stages"]
+    if not stages:
+        return
+    print("\n📊 性能剖析摘要:")
+    for stage in stages:
+        counters = stage["counters"]
+        print(
+            f"  {stage['name']}: 耗时 {stage['wall_time']:.1f}s, "
+            f"CPU {stage.get('cpu_time', 0):.1f}s, "
+            f"峰值内存 {stage.get('peak_rss_mb', 0):.0f}MB, "
+            f"网络请求 {counters.get(NETWORK_CALLS, 0)}, "
+            f"重试 {counters.get(RETRIES, 0)}"
+        )
+
+
+class ProfileSession:
+    """一次剖析会话：创建事件文件，结束时生成报告"""
+
+    def __init__(self, output_dir: PathLike, run_id: Optional[str] = None):
+        """初始化会话
+
+        Args:
+            output_dir: 报告目录
+            run_id: 运行标识，默认使用当前时间
+        """
+        self.output_dir = Path(output_dir)
+        self.run_id = run_id or datetime.now().strftime("%Y%m%d%H%M%S")
+        self.events_path = self.output_dir / f"profile_{self.run_id}.events.jsonl"
+        self._previous_env = None
+        self.finished = False
+
+    def start(self):
+        """开启剖析，之后启动的子进程都会写入本会话的事件文件"""
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        self.events_path.touch()
+        self._previous_env = os.environ.get(EVENTS_ENV)
+        os.environ[EVENTS_ENV] = str(self.events_path)
+
+    def finish(self) -> Tuple[Path, Path]:
+        """结束剖析并生成报告（事件文件保留在报告旁）
+
+        Returns:
+            (JSON 报告路径, CSV 报告路径)
+        """
+        if self._previous_env is None:
+            os.environ.pop(EVENTS_ENV, None)
+        else:
+            os.environ[EVENTS_ENV] = self._previous_env
+        self.finished = True
+        events = load_events(self.events_path)
+        print_summary(events)
+        return write_report(events, self.output_dir, self.run_id)
+
+
+def start_session(output_dir: PathLike) -> ProfileSession:
+    """开启进程级剖析会话，进程退出时自动生成报告
+
+    Args:
+        output_dir: 报告目录
+
+    Returns:
+        ProfileSession: 会话对象
+    """
+    global _session
+    _session = ProfileSession(output_dir)
+    _session.start()
+    atexit.register(finish_session)
+    print(f"性能剖析已开启，事件记录: {_session.events_path}")
+    return _session
+
+
+def finish_session() -> Optional[Tuple[Path, Path]]:
+    """结束当前剖析会话并生成报告（可重复调用）"""
+    global _session
+    session, _session = _session, None
+    if session is None or session.finished:
+        return None
+    json_path, csv_path = session.finish()
+    print(f"性能剖析报告: {json_path}")
+    print(f"              {csv_path}")
+    return json_path, csv_path
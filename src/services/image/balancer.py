@@ -0,0 +1,308 @@
+# -*- coding: utf-8 -*-
+"""
+SD WebUI 负载均衡
+
+维护多个 SD WebUI 端点的状态：后台线程定期请求各端点的 /sdapi/v1/progress，
+记录队列深度和响应延迟；每个 txt2img 请求分配给负载最低的健康端点。
+连续失败的端点被剔除，冷却期过后由探测请求确认恢复后重新加入。
+最后一个健康端点不会被剔除，以免单个异常请求导致剩余的图片全部失败。
+"""
+
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+# 延迟的指数滑动平均系数
+LATENCY_SMOOTHING = 0.3
+
+
+class NoHealthyEndpointError(Exception):
+    """没有可用的 SD WebUI 端点"""
+
+
+@dataclass
+class EndpointState:
+    """单个端点的状态"""
+
+    url: str  # 以 / 结尾的 WebUI 地址
+    healthy: bool = True
+    inflight: int = 0  # 本进程发出、尚未完成的请求数
+    queue_depth: int = 0  # progress 接口报告的剩余任务数
+    latency: float = 0.0  # progress 请求耗时（秒，滑动平均）
+    failures: int = 0  # 连续失败次数
+    retry_at: float = 0.0  # 被剔除后允许重新探测的时间
+
+    @property
+    def load(self) -> int:
+        """负载：本进程的在途请求和服务端报告的队列取较大者"""
+        return max(self.inflight, self.queue_depth)
+
+
+def normalize_url(url: str) -> str:
+    return url if url.endswith("/") else url + "/"
+
+
+def is_endpoint_failure(error: Exception) -> bool:
+    """判断请求异常是否可能由端点故障引起
+
+    连接错误、超时和 5xx 可能是端点故障；4xx 是请求本身的问题，换端点也无济于事。
+    5xx 和超时也可能只与单个请求有关（如高分辨率任务显存不足），
+    需要再由 SDLoadBalancer.confirm_failure 探测确认。
+    """
+    if isinstance(error, requests.exceptions.HTTPError) and error.response is not None:
+        return error.response.status_code >= 500
+    return True
+
+
+def queue_depth(progress: Dict[str, Any]) -> int:
+    """由 progress 接口的响应估计端点的剩余任务数
+
+    WebUI 只报告当前任务的批次进度（state.job_count / job_no），
+    空闲时 job 为空且 progress 为 0。
+    """
+    state = progress.get("state") or {}
+    if not state.get("job") and not progress.get("progress"):
+        return 0
+    job_count = int(state.get("job_count") or 0)
+    job_no = int(state.get("job_no") or 0)
+    return max(job_count - job_no, 1)
+
+
+class SDLoadBalancer:
+    """SD WebUI 端点负载均衡器
+
+    Args:
+        urls: 各端点的 WebUI 地址（如 http://127.0.0.1:7860）
+        concurrency: 每个端点的在途请求数上限
+        poll_interval: 状态轮询间隔（秒），0 表示不启动后台轮询
+        failure_threshold: 连续失败多少次后剔除端点
+        eject_seconds: 剔除后多久重新探测
+        timeout: 轮询请求超时（秒）
+    """
+
+    def __init__(
+        self,
+        urls: Sequence[str],
+        concurrency: int = 1,
+        poll_interval: float = 5.0,
+        failure_threshold: int = 2,
+        eject_seconds: float = 30.0,
+        timeout: float = 5.0,
+    ):
+        self.endpoints = [EndpointState(normalize_url(url)) for url in urls]
+        if not self.endpoints:
+            raise ValueError("至少需要一个 SD WebUI 端点")
+        self.concurrency = max(1, concurrency)
+        self.poll_interval = poll_interval
+        self.failure_threshold = max(1, failure_threshold)
+        self.eject_seconds = eject_seconds
+        self.timeout = timeout
+        self._by_url = {endpoint.url: endpoint for endpoint in self.endpoints}
+        self._condition = threading.Condition()
+        self._stop = threading.Event()
+        self._poller: Optional[threading.Thread] = None
+
+    @property
+    def urls(self) -> List[str]:
+        return [endpoint.url for endpoint in self.endpoints]
+
+    @property
+    def capacity(self) -> int:
+        """所有端点的在途请求数上限之和"""
+        return len(self.endpoints) * self.concurrency
+
+    def healthy_count(self) -> int:
+        with self._condition:
+            return sum(endpoint.healthy for endpoint in self.endpoints)
+
+    # ---------------- 状态轮询 ----------------
+
+    def poll(self):
+        """请求所有待检查端点的 progress 接口，更新队列深度、延迟和健康状态
+
+        健康端点每次都检查；被剔除的端点在冷却期过后才探测，成功即重新加入。
+        """
+        now = time.monotonic()
+        with self._condition:
+            targets = [e for e in self.endpoints if e.healthy or now >= e.retry_at]
+        for endpoint in targets:
+            try:
+                self._check(endpoint)
+            except (requests.exceptions.RequestException, ValueError) as e:
+                self._record_failure(endpoint, f"状态检查失败: {e}")
+
+    def confirm_failure(self, url: str, error: Exception) -> bool:
+        """判断失败的请求是否应计为端点故障
+
+        4xx 不计；5xx、超时和连接错误时探测端点的 progress 接口，
+        探测也失败才计为端点故障，探测成功说明端点正常、只是这个请求失败了。
+
+        Args:
+            url: acquire 返回的地址
+            error: 请求抛出的异常
+
+        Returns:
+            bool: 是否为端点故障（调用方据此调用 release(url, failed=...)）
+        """
+        if not is_endpoint_failure(error):
+            return False
+        try:
+            self._check(self._by_url[url])
+        except (requests.exceptions.RequestException, ValueError) as e:
+            logger.warning(f"SD端点状态检查失败: {url}, {e}")
+            return True
+        return False
+
+    def _check(self, endpoint: EndpointState):
+        """请求端点的 progress 接口并更新状态，失败时抛出异常"""
+        started = time.monotonic()
+        response = requests.get(
+            endpoint.url + "sdapi/v1/progress",
+            params={"skip_current_image": "true"},
+            timeout=self.timeout,
+        )
+        response.raise_for_status()
+        depth = queue_depth(response.json())
+        latency = time.monotonic() - started
+        with self._condition:
+            endpoint.queue_depth = depth
+            endpoint.latency = (
+                latency
+                if endpoint.latency == 0
+                else endpoint.latency + LATENCY_SMOOTHING * (latency - endpoint.latency)
+            )
+            if not endpoint.healthy:
+                logger.info(f"SD端点恢复，重新加入: {endpoint.url}")
+            endpoint.healthy = True
+            endpoint.failures = 0
+            self._condition.notify_all()
+
+    def start(self):
+        """启动后台轮询线程（重复调用无副作用）"""
+        with self._condition:
+            if self.poll_interval <= 0 or self._poller is not None:
+                return
+            self._stop.clear()
+            self._poller = threading.Thread(
+                target=self._poll_loop, name="sd-balancer", daemon=True
+            )
+            self._poller.start()
+
+    def close(self):
+        """停止后台轮询"""
+        self._stop.set()
+        if self._poller is not None:
+            self._poller.join(timeout=self.timeout + 1)
+            self._poller = None
+
+    def __enter__(self) -> "SDLoadBalancer":
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _poll_loop(self):
+        while not self._stop.is_set():
+            try:
+                self.poll()
+            except Exception as e:
+                logger.warning(f"SD端点状态轮询出错: {e}")
+            self._stop.wait(self.poll_interval)
+
+    # ---------------- 请求分配 ----------------
+
+    def acquire(
+        self, timeout: Optional[float] = None, exclude: Sequence[str] = ()
+    ) -> str:
+        """取得负载最低的健康端点，健康端点全部占满时等待
+
+        负载相同时选择延迟较低的端点。
+
+        Args:
+            timeout: 最长等待时间（秒），None 表示一直等待
+            exclude: 不参与分配的端点（如本次请求已失败过的端点）
+
+        Returns:
+            str: 端点的 WebUI 地址（以 / 结尾）
+
+        Raises:
+            NoHealthyEndpointError: 健康端点都已被排除，或等待超时
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._condition:
+            while True:
+                # 最后一个健康端点不会被剔除，健康端点总是至少有一个
+                candidates = [
+                    e for e in self.endpoints if e.healthy and e.url not in exclude
+                ]
+                if not candidates:
+                    raise NoHealthyEndpointError("没有其他可用的SD端点")
+                available = [e for e in candidates if e.inflight < self.concurrency]
+                if available:
+                    endpoint = min(available, key=lambda e: (e.load, e.latency))
+                    endpoint.inflight += 1
+                    return endpoint.url
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    raise NoHealthyEndpointError("等待空闲SD端点超时")
+                self._condition.wait(remaining)
+
+    def release(self, url: str, failed: bool = False):
+        """归还端点并记录请求结果
+
+        Args:
+            url: acquire 返回的地址
+            failed: 请求是否因端点故障失败（见 confirm_failure）
+        """
+        endpoint = self._by_url[url]
+        with self._condition:
+            endpoint.inflight -= 1
+            if not failed:
+                endpoint.failures = 0
+            self._condition.notify_all()
+        if failed:
+            self._record_failure(endpoint, "请求失败")
+
+    @contextmanager
+    def borrow(self) -> Iterator[str]:
+        """借用端点，代码块抛出异常时记为失败"""
+        url = self.acquire()
+        try:
+            yield url
+        except BaseException:
+            self.release(url, failed=True)
+            raise
+        self.release(url)
+
+    def _record_failure(self, endpoint: EndpointState, reason: str):
+        with self._condition:
+            endpoint.failures += 1
+            if endpoint.failures < self.failure_threshold:
+                return
+            endpoint.retry_at = time.monotonic() + self.eject_seconds
+            if not endpoint.healthy:
+                return
+            # 不剔除最后一个健康端点：剔除后剩余的请求只能全部失败，
+            # 保留它则每个请求仍各自尝试，端点恢复后即可继续生成
+            last = not any(e.healthy for e in self.endpoints if e is not endpoint)
+            if not last:
+                endpoint.healthy = False
+                self._condition.notify_all()
+        if not last:
+            logger.warning(
+                f"SD端点连续失败 {endpoint.failures} 次（{reason}），"
+                f"暂时剔除 {self.eject_seconds:g} 秒: {endpoint.url}"
+            )
+        elif endpoint.failures == self.failure_threshold:
+            logger.warning(
+                f"SD端点连续失败 {endpoint.failures} 次（{reason}），"
+                f"但它是最后一个可用端点，不剔除: {endpoint.url}"
+            )
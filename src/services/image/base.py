@@ -67,6 +67,11 @@ class ImageServiceBase(ABC):
             List[str]: 支持的模型名称列表
         """
 
+    def close(self) -> None:
+        """
+        释放服务占用的资源（如后台线程），默认无需处理
+        """
+
     async def get_status(self, force_refresh: bool = False) -> ServiceStatus:
         """
         获取服务状态
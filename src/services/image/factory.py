@@ -151,6 +151,8 @@ class ImageServiceFactory:
         """
         清除所有服务实例
         """
+        for service in self._service_instances.values():
+            service.close()
         self._service_instances.clear()
         self.logger.info("清除所有服务实例")
 
@@ -167,7 +169,7 @@ class ImageServiceFactory:
         removed = False
 
         if service_type in self._service_instances:
-            del self._service_instances[service_type]
+            self._service_instances.pop(service_type).close()
             removed = True
 
         if service_type in self._service_classes:
@@ -18,6 +18,7 @@ from typing import Any, Dict, List, Optional
 import requests
 from tqdm import tqdm
 
+from ... import profiler
 from ...config import Config
 from ...models.image_models import (
     ImageGenerationRequest,
@@ -250,6 +251,7 @@ class LiblibService(ImageServiceBase):
             print(f"请求体: {json.dumps(data, indent=2, ensure_ascii=False)}")
         print("=" * 40)
 
+        profiler.count(profiler.NETWORK_CALLS)
         try:
             if method.upper() == "POST":
                 response = self.session.post(
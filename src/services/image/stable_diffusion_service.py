@@ -11,18 +11,20 @@ import base64
 import json
 import os
 import time
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional
 
 import requests
 
+from ... import profiler
 from ...config import config
 from ...models.image_models import (
     ImageGenerationRequest,
     ImageGenerationResponse,
     ImageServiceType,
 )
+from .balancer import NoHealthyEndpointError, SDLoadBalancer
 from .base import ImageServiceBase
 
 
@@ -55,6 +57,10 @@ class StableDiffusionConfig:
     adetailer_face_model: str = "face_yolov8n.pt"
     adetailer_hand_model: str = "hand_yolov8n.pt"
     timeout: int = 300  # 5分钟超时
+    api_urls: List[str] = field(default_factory=list)  # 多端点，为空时只用 api_url
+    endpoint_concurrency: int = 2
+    health_interval: float = 5.0
+    eject_seconds: float = 30.0
 
 
 class StableDiffusionService(ImageServiceBase):
@@ -81,7 +87,17 @@ class StableDiffusionService(ImageServiceBase):
             self.api_url += "/"
         self.txt2img_url = self.api_url + "sdapi/v1/txt2img"
 
-        self.logger.info(f"Stable Diffusion服务初始化完成，API URL: {self.api_url}")
+        # 多端点负载均衡（只有一个端点时同样适用）
+        self.balancer = SDLoadBalancer(
+            self.config.api_urls or [self.config.api_url],
+            concurrency=self.config.endpoint_concurrency,
+            poll_interval=self.config.health_interval,
+            eject_seconds=self.config.eject_seconds,
+        )
+
+        self.logger.info(
+            f"Stable Diffusion服务初始化完成，API URL: {', '.join(self.balancer.urls)}"
+        )
 
     def _load_config_from_global(self) -> StableDiffusionConfig:
         """从全局配置加载Stable Diffusion配置"""
@@ -108,6 +124,10 @@ class StableDiffusionService(ImageServiceBase):
             adetailer_enabled=config.sd_adetailer_enabled,
             adetailer_face_model=config.sd_adetailer_face_model,
             adetailer_hand_model=config.sd_adetailer_hand_model,
+            api_urls=config.sd_api_urls,
+            endpoint_concurrency=config.sd_endpoint_concurrency,
+            health_interval=config.sd_health_interval,
+            eject_seconds=config.sd_eject_seconds,
         )
 
     def generate_image(
@@ -164,10 +184,9 @@ class StableDiffusionService(ImageServiceBase):
             if not self.config.api_url or not self.config.api_url.startswith("http"):
                 return False
 
-            # 发送健康检查请求
-            health_url = self.api_url + "sdapi/v1/options"
-            response = requests.get(health_url, timeout=10)
-            return response.status_code == 200
+            # 检查各端点的状态接口，至少一个健康即可用
+            self.balancer.poll()
+            return self.balancer.healthy_count() > 0
 
         except Exception as e:
             self.logger.warning(f"Stable Diffusion服务健康检查失败: {str(e)}")
@@ -239,17 +258,51 @@ class StableDiffusionService(ImageServiceBase):
         Returns:
             requests.Response: 响应对象，失败时返回None
         """
-        try:
-            response = requests.post(
-                self.txt2img_url,
-                data=json.dumps(data),
-                headers={"Content-Type": "application/json"},
-                timeout=self.config.timeout,
+        self.balancer.start()
+        # 端点故障时换用其他健康端点重试
+        tried = []
+        for _ in range(len(self.balancer.endpoints)):
+            try:
+                url = self.balancer.acquire(exclude=tried)
+            except NoHealthyEndpointError as e:
+                self.logger.error(f"Stable Diffusion API请求失败: {str(e)}")
+                return None
+
+            profiler.count(profiler.NETWORK_CALLS)
+            try:
+                response = requests.post(
+                    url + "sdapi/v1/txt2img",
+                    data=json.dumps(data),
+                    headers={"Content-Type": "application/json"},
+                    timeout=self.config.timeout,
+                )
+            except requests.exceptions.RequestException as e:
+                failed = self.balancer.confirm_failure(url, e)
+                self.balancer.release(url, failed=failed)
+                self.logger.error(f"Stable Diffusion API请求失败（{url}）: {str(e)}")
+                if not failed:
+                    return None
+                tried.append(url)
+                continue
+
+            if response.status_code < 500:
+                self.balancer.release(url)
+                return response
+            # 5xx 可能只与这个请求有关（如显存不足），探测也失败才换端点重试
+            error = requests.exceptions.HTTPError(response=response)
+            failed = self.balancer.confirm_failure(url, error)
+            self.balancer.release(url, failed=failed)
+            self.logger.error(
+                f"Stable Diffusion API请求失败（{url}），错误码: {response.status_code}"
             )
-            return response
-        except requests.exceptions.RequestException as e:
-            self.logger.error(f"Stable Diffusion API请求失败: {str(e)}")
-            return None
+            if not failed:
+                return None
+            tried.append(url)
+        return None
+
+    def close(self):
+        """停止端点状态的后台轮询"""
+        self.balancer.close()
 
     def save_image(self, image_data: str, output_path: Path) -> bool:
         """保存base64图像到文件
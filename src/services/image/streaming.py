@@ -0,0 +1,266 @@
+# -*- coding: utf-8 -*-
+"""
+txt2img 响应的流式解码
+
+SD WebUI 的 txt2img 响应是 {"images": ["<base64>", ...], "parameters": {...},
+"info": "..."}，高分辨率图片的 base64 字符串可达数十 MB。这里边接收边扫描 JSON，
+只跟踪 images 数组内的字符串，按 4 字符对齐分块解码 base64 并写入目标文件，
+不保留完整的响应文本、base64 字符串或解码后的图片，
+单个请求的峰值内存约为一个接收块加一个解码块。
+"""
+
+import binascii
+import os
+import re
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Union
+
+PathLike = Union[str, Path]
+
+# 每累积这么多 base64 字符解码写入一次（须为 4 的倍数）
+DECODE_CHUNK = 256 * 1024
+
+# 字符串内需要特殊处理的字符：结束引号和转义符
+_STRING_SPECIAL = re.compile(rb'["\\]')
+_ESCAPES = {
+    ord('"'): b'"',
+    ord("\\"): b"\\",
+    ord("/"): b"/",
+    ord("b"): b"\b",
+    ord("f"): b"\f",
+    ord("n"): b"\n",
+    ord("r"): b"\r",
+    ord("t"): b"\t",
+}
+_WHITESPACE = b" \t\r\n"
+
+
+class ImageStreamError(Exception):
+    """txt2img 响应格式错误或不完整"""
+
+
+class _Base64File:
+    """分块解码 base64 并原子地写入文件"""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(self.tmp_path, "wb")
+        self._pending = bytearray()
+
+    def write(self, chunk: bytes):
+        self._pending += chunk
+        if len(self._pending) >= DECODE_CHUNK:
+            usable = len(self._pending) // 4 * 4
+            self._decode(usable)
+
+    def _decode(self, size: int):
+        try:
+            self._file.write(binascii.a2b_base64(self._pending[:size]))
+        except binascii.Error as e:
+            raise ImageStreamError(f"图片base64数据无效: {e}") from e
+        del self._pending[:size]
+
+    def finish(self):
+        """解码剩余数据并替换目标文件"""
+        if len(self._pending) % 4:
+            raise ImageStreamError("图片base64数据长度无效")
+        self._decode(len(self._pending))
+        self._file.close()
+        os.replace(self.tmp_path, self.path)
+
+    def abort(self):
+        self._file.close()
+        self.tmp_path.unlink(missing_ok=True)
+
+
+class ImageStreamDecoder:
+    """增量解析 txt2img 响应，将 images 数组中的图片依次写入目标文件
+
+    Args:
+        paths: 各图片的输出路径，超出数量的图片被丢弃（不解码）
+        capture: 需要保留的顶层字符串字段（如 info），解析后存入 captured
+    """
+
+    def __init__(self, paths: Sequence[PathLike], capture: Sequence[str] = ()):
+        self.paths = [Path(path) for path in paths]
+        self.written: List[Path] = []
+        self.captured: Dict[str, str] = {}
+        self._capture = {key.encode() for key in capture}
+        self._value = bytearray()
+        self.image_count = 0
+        self._found_images = False
+        self._carry = b""
+        self._depth = 0
+        self._expect_key = False
+        self._key: Optional[bytearray] = None
+        self._value_key = b""
+        self._in_images = False
+        # 当前字符串的用途：None 不在字符串内，key / image / capture / skip
+        self._string: Optional[str] = None
+        self._writer: Optional[_Base64File] = None
+
+    def feed(self, data: bytes):
+        """处理一段响应数据"""
+        if self._carry:
+            data = self._carry + data
+            self._carry = b""
+        pos = 0
+        size = len(data)
+        while pos < size:
+            if self._string is not None:
+                match = _STRING_SPECIAL.search(data, pos)
+                end = match.start() if match else size
+                if end > pos:
+                    self._string_data(data[pos:end])
+                if match is None:
+                    return
+                if data[end] == ord('"'):
+                    self._end_string()
+                    pos = end + 1
+                    continue
+                # 转义序列可能被接收块截断，留到下一块处理
+                escape = data[end + 1 : end + 2]
+                if not escape or (escape == b"u" and end + 6 > size):
+                    self._carry = data[end:]
+                    return
+                if escape == b"u":
+                    char = chr(int(data[end + 2 : end + 6], 16))
+                    # 代理对的两半分别转义，逐个编码时需保留代理字符
+                    self._string_data(char.encode("utf-8", "surrogatepass"))
+                    pos = end + 6
+                else:
+                    self._string_data(_ESCAPES.get(escape[0], b""))
+                    pos = end + 2
+                continue
+
+            char = data[pos]
+            pos += 1
+            if char in _WHITESPACE:
+                continue
+            if char == ord('"'):
+                self._start_string()
+            elif char in b"{[":
+                if (
+                    self._depth == 1
+                    and char == ord("[")
+                    and self._value_key == b"images"
+                ):
+                    self._in_images = True
+                    self._found_images = True
+                elif self._depth == 0 and char != ord("{"):
+                    raise ImageStreamError("响应不是JSON对象")
+                self._depth += 1
+                if self._depth == 1:
+                    self._expect_key = True
+            elif char in b"}]":
+                if self._in_images and self._depth == 2:
+                    self._in_images = False
+                self._depth -= 1
+            elif self._depth == 1 and char == ord(","):
+                self._expect_key = True
+                self._value_key = b""
+            elif self._depth == 1 and char == ord(":"):
+                self._expect_key = False
+
+    def close(self) -> List[Path]:
+        """结束解析
+
+        Returns:
+            List[Path]: 已写入的图片路径
+
+        Raises:
+            ImageStreamError: 响应不完整或不含 images 字段
+        """
+        if self._string is not None or self._depth != 0 or self._carry:
+            self.abort()
+            raise ImageStreamError("响应不完整")
+        if not self._found_images:
+            raise ImageStreamError("API响应中没有images字段")
+        return self.written
+
+    def abort(self):
+        """放弃解析，删除未完成的临时文件"""
+        if self._writer is not None:
+            self._writer.abort()
+            self._writer = None
+
+    def _start_string(self):
+        if self._depth == 1 and self._expect_key:
+            self._string = "key"
+            self._key = bytearray()
+        elif self._in_images and self._depth == 2:
+            self._string = "image"
+            if self.image_count < len(self.paths):
+                self._writer = _Base64File(self.paths[self.image_count])
+        elif self._depth == 1 and self._value_key in self._capture:
+            self._string = "capture"
+            self._value = bytearray()
+        else:
+            self._string = "skip"
+
+    def _string_data(self, chunk: bytes):
+        if self._string == "image":
+            if self._writer is not None:
+                self._writer.write(chunk)
+        elif self._string == "key":
+            self._key += chunk
+        elif self._string == "capture":
+            self._value += chunk
+
+    def _end_string(self):
+        if self._string == "key":
+            self._value_key = bytes(self._key)
+            self._key = None
+        elif self._string == "image":
+            if self._writer is not None:
+                self._writer.finish()
+                self.written.append(self._writer.path)
+                self._writer = None
+            self.image_count += 1
+        elif self._string == "capture":
+            # 经 UTF-16 往返，将分别转义的代理对合并为完整字符
+            value = self._value.decode("utf-8", "surrogatepass")
+            value = value.encode("utf-16", "surrogatepass").decode("utf-16")
+            self.captured[self._value_key.decode()] = value
+            self._value = bytearray()
+        self._string = None
+
+
+def write_images(chunks: Iterable[bytes], paths: Sequence[PathLike]) -> List[Path]:
+    """流式解析 txt2img 响应，将图片依次写入目标文件
+
+    Args:
+        chunks: 响应数据块（如 response.iter_content()）
+        paths: 各图片的输出路径，按 images 数组顺序对应
+
+    Returns:
+        List[Path]: 已写入的图片路径（响应中图片少于路径数时较短）
+
+    Raises:
+        ImageStreamError: 响应格式错误、不完整或 base64 数据无效
+    """
+    return decode_stream(chunks, ImageStreamDecoder(paths))
+
+
+def decode_stream(chunks: Iterable[bytes], decoder: ImageStreamDecoder) -> List[Path]:
+    """将响应数据块依次交给解码器，出错时删除未完成的临时文件
+
+    Args:
+        chunks: 响应数据块
+        decoder: 图片流解码器（可通过 decoder.captured 取得保留的字段）
+
+    Returns:
+        List[Path]: 已写入的图片路径
+
+    Raises:
+        ImageStreamError: 响应格式错误、不完整或 base64 数据无效
+    """
+    try:
+        for chunk in chunks:
+            decoder.feed(chunk)
+    except BaseException:
+        decoder.abort()
+        raise
+    return decoder.close()
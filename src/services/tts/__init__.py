@@ -0,0 +1,32 @@
+# -*- coding: utf-8 -*-
+"""
+语音合成服务模块
+
+提供语音合成提供者接口和本地离线引擎、TTS 请求调度（并发、速率限制和重试）、
+可复用的合成器池和批量合成的分组切分
+"""
+
+from .base import TTSProvider
+from .batching import plan_batches, split_wav
+from .local_provider import LocalTTSProvider
+from .pool import SynthesizerPool
+from .scheduler import (
+    NonRetryableError,
+    RetryableError,
+    ThrottledError,
+    TokenBucket,
+    TTSScheduler,
+)
+
+__all__ = [
+    "LocalTTSProvider",
+    "NonRetryableError",
+    "RetryableError",
+    "SynthesizerPool",
+    "ThrottledError",
+    "TokenBucket",
+    "TTSProvider",
+    "TTSScheduler",
+    "plan_batches",
+    "split_wav",
+]
@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+"""
+语音合成提供者基类
+
+定义语音合成流水线使用的统一接口，云端（Azure）和本地引擎均实现该接口
+"""
+
+import asyncio
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from .scheduler import TTSScheduler
+
+
+class TTSProvider(ABC):
+    """语音合成提供者基类
+
+    合成结果统一为 dict：index（片段序号）、audio_data（WAV 内容的 BytesIO，
+    失败为 None）和 error（错误信息，成功为 None）。
+    """
+
+    # 是否支持将多行合并为一个请求（get_tts_batch）
+    supports_batching = False
+
+    def __init__(self, scheduler: Optional[TTSScheduler] = None):
+        """
+        初始化语音合成提供者
+
+        Args:
+            scheduler: 请求调度器（控制并发、速率和重试），默认按调度器默认参数创建
+        """
+        self.scheduler = scheduler or TTSScheduler()
+
+    @abstractmethod
+    async def get_tts_audio(
+        self, message: str, language: str, index: int, max_retries: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """
+        合成单个片段
+
+        Args:
+            message: 合成文本
+            language: 语言代码
+            index: 片段序号
+            max_retries: 最大尝试次数，默认使用调度器的设置
+
+        Returns:
+            Dict[str, Any]: 合成结果
+        """
+
+    @abstractmethod
+    def cache_key(self, message: str, language: str) -> str:
+        """
+        片段的语音缓存键，须包含所有影响合成结果的设置
+
+        Args:
+            message: 合成文本
+            language: 语言代码
+
+        Returns:
+            str: 缓存键
+        """
+
+    async def get_tts_batch(
+        self,
+        lines: Sequence[Tuple[int, str]],
+        language: str,
+        max_retries: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        合成多个片段，默认逐行合成
+
+        Args:
+            lines: (序号, 文本) 列表
+            language: 语言代码
+            max_retries: 最大尝试次数
+
+        Returns:
+            List[Dict[str, Any]]: 每行一个合成结果
+        """
+        return list(
+            await asyncio.gather(
+                *(
+                    self.get_tts_audio(message, language, index, max_retries)
+                    for index, message in lines
+                )
+            )
+        )
+
+    def warm_up(self, count: Optional[int] = None) -> int:
+        """
+        合成开始前的准备（如预先建立连接）
+
+        Args:
+            count: 预计同时进行的请求数
+
+        Returns:
+            int: 准备好的实例数
+        """
+        return 0
+
+    def close(self) -> None:
+        """释放资源"""
+
+    def summary(self) -> str:
+        """
+        合成结束后的统计信息
+
+        Returns:
+            str: 统计信息，无可报告内容时为空字符串
+        """
+        return ""
+
+    def __str__(self) -> str:
+        return self.__class__.__name__
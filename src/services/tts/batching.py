@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+"""
+批量合成的分组与切分
+
+连续的若干行文本合并为一个 SSML 请求，每行前插入书签（bookmark），
+服务端返回整段音频和各书签的音频偏移，再按偏移把 PCM 切回每行一个 WAV，
+使请求次数降低一个数量级而每个片段的输出文件不变。
+"""
+
+import io
+import wave
+from typing import List, Sequence, Tuple
+
+# SDK 中音频偏移的单位为 100 纳秒
+TICKS_PER_SECOND = 10_000_000
+
+
+def mark_name(index: int) -> str:
+    """片段对应的书签名"""
+    return f"line_{index}"
+
+
+def plan_batches(
+    texts: Sequence[Tuple[int, str]], batch_size: int
+) -> List[List[Tuple[int, str]]]:
+    """将文本片段按顺序分为每批最多 batch_size 行
+
+    Args:
+        texts: (序号, 文本) 列表
+        batch_size: 每批行数，不大于 1 时每行单独一批
+
+    Returns:
+        list: 批次列表
+    """
+    size = max(1, batch_size)
+    return [list(texts[i : i + size]) for i in range(0, len(texts), size)]
+
+
+def split_wav(data: bytes, offsets: Sequence[int]) -> List[bytes]:
+    """在给定的音频偏移处切分 WAV
+
+    第 i 段从 offsets[i] 开始，到 offsets[i + 1]（最后一段到音频结尾）结束，
+    第一段之前的音频并入第一段。每段保持原始的采样格式。
+
+    Args:
+        data: 完整的 WAV 文件内容
+        offsets: 各段起始的音频偏移（100 纳秒），须按升序排列
+
+    Returns:
+        list: 每段的 WAV 文件内容
+
+    Raises:
+        ValueError: 偏移非升序或超出音频长度
+    """
+    with wave.open(io.BytesIO(data), "rb") as reader:
+        params = reader.getparams()
+        frames = reader.readframes(params.nframes)
+
+    frame_size = params.nchannels * params.sampwidth
+    total = len(frames) // frame_size
+    starts = [round(offset * params.framerate / TICKS_PER_SECOND) for offset in offsets]
+    if any(b < a for a, b in zip(starts, starts[1:])):
+        raise ValueError("书签偏移不是升序")
+    if starts and starts[-1] > total:
+        raise ValueError(f"书签偏移超出音频长度: {starts[-1]} > {total} 帧")
+
+    bounds = [0] + starts[1:] + [total]
+    segments = []
+    for begin, end in zip(bounds, bounds[1:]):
+        buffer = io.BytesIO()
+        with wave.open(buffer, "wb") as writer:
+            writer.setnchannels(params.nchannels)
+            writer.setsampwidth(params.sampwidth)
+            writer.setframerate(params.framerate)
+            writer.writeframes(frames[begin * frame_size : end * frame_size])
+        segments.append(buffer.getvalue())
+    return segments
@@ -0,0 +1,190 @@
+# -*- coding: utf-8 -*-
+"""
+本地语音合成
+
+以子进程调用 CPU 上运行的离线引擎（espeak-ng / espeak / piper）合成 WAV，
+无需网络和密钥，适合草稿预览和离线测试流水线性能。
+语速、音高和音量沿用 Azure 语音的 SSML 韵律配置并换算为引擎参数。
+"""
+
+import asyncio
+import shlex
+import subprocess
+import tempfile
+from io import BytesIO
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from ...content_cache import make_key
+from .base import TTSProvider
+from .prosody import pitch_factor, rate_factor, volume_factor
+from .scheduler import NonRetryableError, RetryableError, TTSScheduler
+
+SUPPORTED_ENGINES = ("espeak-ng", "espeak", "piper")
+
+# espeak 的默认语速（词/分钟）、音高（0-99）和音量（0-200）
+_ESPEAK_SPEED = 175
+_ESPEAK_PITCH = 50
+_ESPEAK_AMPLITUDE = 100
+
+# 语言代码到 espeak 语音名的映射（其余取语言代码的前缀）
+_ESPEAK_VOICES = {"zh": "cmn", "yue": "yue"}
+
+
+class LocalTTSProvider(TTSProvider):
+    """本地离线语音合成
+
+    Args:
+        engine: 引擎名称（espeak-ng、espeak 或 piper）
+        voice: espeak 的语音名（为空时按语言选择），或 piper 的模型文件路径
+        rate: SSML 语速（如 "medium"、"+10%"）
+        pitch: SSML 音高（piper 不支持）
+        volume: SSML 音量（piper 不支持）
+        command: 引擎命令行（可包含参数），默认与引擎名称相同
+        timeout: 单次合成的超时时间（秒）
+        scheduler: 请求调度器，并发上限即同时运行的引擎进程数
+    """
+
+    def __init__(
+        self,
+        engine: str = "espeak-ng",
+        voice: str = "",
+        rate: str = "default",
+        pitch: str = "default",
+        volume: str = "default",
+        command: Optional[str] = None,
+        timeout: float = 60.0,
+        scheduler: Optional[TTSScheduler] = None,
+    ):
+        super().__init__(scheduler)
+        if engine not in SUPPORTED_ENGINES:
+            raise ValueError(
+                f"不支持的本地语音合成引擎: {engine}（支持: {', '.join(SUPPORTED_ENGINES)}）"
+            )
+        self.engine = engine
+        self.voice = voice
+        self.prosody_rate = rate
+        self.prosody_pitch = pitch
+        self.prosody_volume = volume
+        self.command = shlex.split(command) if command else [engine]
+        self.timeout = timeout
+
+    def build_command(self, language: str, output_path: Path) -> List[str]:
+        """生成引擎命令行，文本从标准输入传入
+
+        Args:
+            language: 语言代码
+            output_path: WAV 输出路径
+
+        Returns:
+            List[str]: 命令行参数
+        """
+        rate = rate_factor(self.prosody_rate)
+        if self.engine == "piper":
+            # piper 以音素时长倍数控制语速
+            return self.command + [
+                "--model",
+                self.voice,
+                "--length_scale",
+                f"{1 / max(rate, 0.1):.3f}",
+                "--output_file",
+                str(output_path),
+            ]
+
+        voice = self.voice or _ESPEAK_VOICES.get(
+            language.split("-")[0].lower(), language.split("-")[0].lower()
+        )
+        pitch = min(99, max(0, round(_ESPEAK_PITCH * pitch_factor(self.prosody_pitch))))
+        amplitude = min(
+            200, max(0, round(_ESPEAK_AMPLITUDE * volume_factor(self.prosody_volume)))
+        )
+        return self.command + [
+            "-v",
+            voice,
+            "-s",
+            str(max(80, round(_ESPEAK_SPEED * rate))),
+            "-p",
+            str(pitch),
+            "-a",
+            str(amplitude),
+            "-w",
+            str(output_path),
+            "--stdin",
+        ]
+
+    def _synthesize(self, message: str, language: str) -> bytes:
+        """运行引擎合成一段文本（阻塞调用，在线程池中执行）"""
+        with tempfile.TemporaryDirectory(prefix="story_flow_tts_") as tmp_dir:
+            output_path = Path(tmp_dir) / "output.wav"
+            cmd = self.build_command(language, output_path)
+            try:
+                result = subprocess.run(
+                    cmd,
+                    input=message.encode("utf-8"),
+                    capture_output=True,
+                    timeout=self.timeout,
+                )
+            except FileNotFoundError as e:
+                raise NonRetryableError(
+                    f"未找到本地语音合成引擎 {self.command[0]}，请先安装或设置 TTS_LOCAL_COMMAND"
+                ) from e
+            except subprocess.TimeoutExpired as e:
+                raise RetryableError(f"本地语音合成超时（{self.timeout} 秒）") from e
+
+            if result.returncode != 0 or not output_path.exists():
+                stderr = result.stderr.decode("utf-8", errors="replace").strip()
+                raise NonRetryableError(
+                    f"本地语音合成失败（退出码 {result.returncode}）: {stderr}"
+                )
+            return output_path.read_bytes()
+
+    async def get_tts_audio(
+        self, message: str, language: str, index: int, max_retries: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """合成单个片段
+
+        Args:
+            message: 合成文本
+            language: 语言代码
+            index: 片段序号
+            max_retries: 最大尝试次数，默认使用调度器的设置
+
+        Returns:
+            Dict[str, Any]: index、audio_data（BytesIO，失败为 None）和 error
+        """
+
+        async def request():
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(None, self._synthesize, message, language)
+
+        try:
+            audio_data = await self.scheduler.submit(
+                request, max_attempts=max_retries, label=f"序号 {index} 本地合成"
+            )
+        except (RetryableError, NonRetryableError) as e:
+            return {"index": index, "audio_data": None, "error": str(e)}
+        except Exception as e:
+            error_msg = f"语音合成异常: {str(e)}"
+            return {"index": index, "audio_data": None, "error": error_msg}
+        return {"index": index, "audio_data": BytesIO(audio_data), "error": None}
+
+    def cache_key(self, message: str, language: str) -> str:
+        """片段的语音缓存键（文本、语言、引擎、命令行和韵律设置均参与计算）"""
+        return make_key(
+            "local",
+            self.engine,
+            # 命令行可能带有模型、音色文件、语速等影响合成结果的参数
+            self.command,
+            self.voice,
+            self.prosody_rate,
+            self.prosody_pitch,
+            self.prosody_volume,
+            language,
+            " ".join(message.split()),
+        )
+
+    def summary(self) -> str:
+        return f"本地引擎: {self.engine}"
+
+    def __str__(self) -> str:
+        return f"{self.__class__.__name__}({self.engine})"
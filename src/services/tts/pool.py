@@ -0,0 +1,153 @@
+# -*- coding: utf-8 -*-
+"""
+语音合成器池
+
+维护固定数量的合成器实例并在请求之间复用，创建时可预先建立与服务端的连接，
+避免每个请求重复初始化 SDK 和握手。合成器在线程池中阻塞使用，因此池是线程安全的。
+"""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+
+class SynthesizerPool:
+    """合成器池
+
+    Args:
+        factory: 创建合成器的函数
+        size: 合成器数量上限（应不小于请求并发数）
+        connect: 预连接函数，接收新建的合成器，返回需要保持引用的连接对象（可为 None）
+    """
+
+    def __init__(
+        self,
+        factory: Callable[[], Any],
+        size: int,
+        connect: Optional[Callable[[Any], Any]] = None,
+    ):
+        self.size = max(1, size)
+        self.created = 0  # 累计创建的合成器数
+        self.borrowed = 0  # 累计借出次数
+        self._factory = factory
+        self._connect = connect
+        self._idle: List[Any] = []
+        self._live = 0
+        self._connections: Dict[int, Any] = {}
+        self._condition = threading.Condition()
+
+    def _create(self) -> Any:
+        synthesizer = self._factory()
+        connection = None
+        if self._connect is not None:
+            try:
+                connection = self._connect(synthesizer)
+            except Exception as e:
+                # 预连接只是优化，失败时由首次合成建立连接
+                print(f"合成器预连接失败，将在首次合成时连接: {e}")
+        with self._condition:
+            self._connections[id(synthesizer)] = connection
+            self.created += 1
+        return synthesizer
+
+    def acquire(self) -> Any:
+        """借出一个合成器，优先复用最近归还的实例，池满时等待归还
+
+        Returns:
+            合成器实例
+        """
+        with self._condition:
+            while True:
+                if self._idle:
+                    self.borrowed += 1
+                    return self._idle.pop()
+                if self._live < self.size:
+                    self._live += 1
+                    self.borrowed += 1
+                    break
+                self._condition.wait()
+
+        try:
+            return self._create()
+        except BaseException:
+            with self._condition:
+                self._live -= 1
+                self._condition.notify()
+            raise
+
+    def release(self, synthesizer: Any, discard: bool = False):
+        """归还合成器
+
+        Args:
+            synthesizer: 借出的合成器
+            discard: 是否丢弃（如请求异常后连接状态未知），之后按需重新创建
+        """
+        connection = None
+        with self._condition:
+            if discard:
+                self._live -= 1
+                connection = self._connections.pop(id(synthesizer), None)
+            else:
+                self._idle.append(synthesizer)
+            self._condition.notify()
+        _close(connection)
+
+    @contextmanager
+    def borrow(self) -> Iterator[Any]:
+        """借用合成器，代码块抛出异常时丢弃该实例"""
+        synthesizer = self.acquire()
+        try:
+            yield synthesizer
+        except BaseException:
+            self.release(synthesizer, discard=True)
+            raise
+        self.release(synthesizer)
+
+    def warm_up(self, count: Optional[int] = None) -> int:
+        """并行创建并预连接合成器，放入空闲队列
+
+        Args:
+            count: 预热数量，默认填满整个池
+
+        Returns:
+            int: 新建的合成器数量
+        """
+        with self._condition:
+            count = min(count or self.size, self.size - self._live)
+            self._live += max(count, 0)
+        if count <= 0:
+            return 0
+
+        def prepare(_):
+            try:
+                synthesizer = self._create()
+            except Exception as e:
+                print(f"创建合成器失败: {e}")
+                with self._condition:
+                    self._live -= 1
+                    self._condition.notify()
+                return 0
+            self.release(synthesizer)
+            return 1
+
+        with ThreadPoolExecutor(max_workers=count) as executor:
+            return sum(executor.map(prepare, range(count)))
+
+    def close(self):
+        """关闭所有空闲合成器的连接"""
+        with self._condition:
+            idle, self._idle = self._idle, []
+            self._live -= len(idle)
+            connections = [self._connections.pop(id(s), None) for s in idle]
+        for connection in connections:
+            _close(connection)
+
+
+def _close(connection: Any):
+    if connection is None:
+        return
+    try:
+        connection.close()
+    except Exception:
+        pass
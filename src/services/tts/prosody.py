@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+"""
+SSML 韵律设置解析
+
+将 SSML prosody 的 rate / pitch / volume 取值（命名值、百分比、半音、数值）
+换算为相对默认值的倍数，使本地引擎可以沿用 Azure 语音的韵律配置。
+"""
+
+import re
+from typing import Optional
+
+# 命名取值对应的倍数（与 Azure 语音服务的定义一致）
+_RATES = {
+    "x-slow": 0.5,
+    "slow": 0.64,
+    "medium": 1.0,
+    "default": 1.0,
+    "fast": 1.55,
+    "x-fast": 2.0,
+}
+_PITCHES = {
+    "x-low": 0.55,
+    "low": 0.8,
+    "medium": 1.0,
+    "default": 1.0,
+    "high": 1.2,
+    "x-high": 1.45,
+}
+# 音量为 0-100 的绝对值，默认 100
+_VOLUMES = {
+    "silent": 0.0,
+    "x-soft": 0.2,
+    "soft": 0.4,
+    "medium": 0.6,
+    "loud": 0.8,
+    "x-loud": 1.0,
+    "default": 1.0,
+}
+
+_NUMBER = r"([+-]?\d+(?:\.\d+)?)"
+
+
+def _relative(value: str) -> Optional[float]:
+    """解析百分比（+10%）和半音（-2st）形式的相对变化，无法识别时返回 None"""
+    match = re.fullmatch(_NUMBER + "%", value)
+    if match:
+        return max(0.0, 1 + float(match.group(1)) / 100)
+    match = re.fullmatch(_NUMBER + "st", value)
+    if match:
+        return 2 ** (float(match.group(1)) / 12)
+    return None
+
+
+def rate_factor(value: str) -> float:
+    """语速倍数：命名值、百分比或倍数（如 1.2）"""
+    value = (value or "default").strip().lower()
+    if value in _RATES:
+        return _RATES[value]
+    relative = _relative(value)
+    if relative is not None:
+        return relative
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        return 1.0
+
+
+def pitch_factor(value: str) -> float:
+    """音高倍数：命名值、百分比或半音（Hz 等绝对值按默认音高处理）"""
+    value = (value or "default").strip().lower()
+    if value in _PITCHES:
+        return _PITCHES[value]
+    relative = _relative(value)
+    return 1.0 if relative is None else relative
+
+
+def volume_factor(value: str) -> float:
+    """音量倍数（1.0 为默认音量）：命名值、带符号的相对值或 0-100 的绝对值"""
+    value = (value or "default").strip().lower()
+    if value in _VOLUMES:
+        return _VOLUMES[value]
+    try:
+        if value[0] in "+-":
+            # 带符号为相对变化：+10% 或 +10 均表示默认音量的 110%
+            return max(0.0, 1 + float(value.rstrip("%")) / 100)
+        return max(0.0, float(value.rstrip("%")) / 100)
+    except ValueError:
+        return 1.0
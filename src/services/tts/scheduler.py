@@ -0,0 +1,227 @@
+# -*- coding: utf-8 -*-
+"""
+TTS 请求调度器
+
+限制同时进行的合成请求数和每秒请求数（令牌桶），失败时按带抖动的指数退避重试。
+遇到限流（429）时并发上限减半并暂停发送新请求，连续成功后逐步恢复（AIMD），
+使大量片段在配额允许的范围内以最高吞吐合成，而不是集中触发限流后同时失败。
+"""
+
+import asyncio
+import random
+import time
+from typing import Any, Awaitable, Callable, Optional
+
+from ... import profiler
+
+
+class RetryableError(Exception):
+    """可重试的请求错误（如网络超时、服务暂时不可用）"""
+
+
+class ThrottledError(RetryableError):
+    """请求被限流"""
+
+    def __init__(self, message: str, retry_after: Optional[float] = None):
+        """初始化
+
+        Args:
+            message: 错误信息
+            retry_after: 服务端建议的等待时间（秒）
+        """
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class NonRetryableError(Exception):
+    """不可重试的请求错误（如认证失败、请求内容无效）"""
+
+
+class TokenBucket:
+    """令牌桶：平均速率不超过 rate，允许 burst 个请求的突发"""
+
+    def __init__(
+        self,
+        rate: float,
+        burst: int = 1,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """初始化令牌桶
+
+        Args:
+            rate: 每秒补充的令牌数，0 表示不限速
+            burst: 桶容量
+            clock: 时钟函数（秒）
+        """
+        self.rate = rate
+        self.capacity = max(1, burst)
+        self.tokens = float(self.capacity)
+        self._clock = clock
+        self._updated = clock()
+        self._blocked_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def _refill(self, now: float):
+        if self.rate > 0:
+            elapsed = max(now - self._updated, 0.0)
+            self.tokens = min(self.capacity, self.tokens + elapsed * self.rate)
+        self._updated = now
+
+    def block_for(self, seconds: float):
+        """在指定时间内暂停发放令牌（如服务端要求等待）"""
+        self._blocked_until = max(self._blocked_until, self._clock() + seconds)
+
+    async def acquire(self):
+        """获取一个令牌，按先后顺序等待"""
+        async with self._lock:
+            while True:
+                now = self._clock()
+                self._refill(now)
+                wait = self._blocked_until - now
+                if wait <= 0:
+                    if self.rate <= 0:
+                        return
+                    if self.tokens >= 1:
+                        self.tokens -= 1
+                        return
+                    wait = (1 - self.tokens) / self.rate
+                await asyncio.sleep(wait)
+
+
+class TTSScheduler:
+    """TTS 请求调度器
+
+    Args:
+        max_concurrency: 最大并发请求数
+        rate: 每秒最大请求数，0 表示不限速
+        burst: 令牌桶容量（允许的突发请求数），默认与最大并发数相同
+        max_attempts: 每个请求的最大尝试次数
+        backoff_base: 退避基准时间（秒），第 n 次重试最多等待 base * 2^n
+        backoff_max: 单次退避的最长时间（秒）
+        min_concurrency: 限流时并发数下限
+        rng: 随机数生成器（用于退避抖动）
+        clock: 时钟函数（秒）
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = 4,
+        rate: float = 0.0,
+        burst: Optional[int] = None,
+        max_attempts: int = 3,
+        backoff_base: float = 1.0,
+        backoff_max: float = 30.0,
+        min_concurrency: int = 1,
+        rng: Optional[random.Random] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.max_concurrency = max(1, max_concurrency)
+        self.min_concurrency = min(max(1, min_concurrency), self.max_concurrency)
+        self.limit = self.max_concurrency
+        self.max_attempts = max(1, max_attempts)
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.bucket = TokenBucket(rate, burst or self.max_concurrency, clock)
+        self.active = 0
+        self.throttled = 0
+        self._rng = rng or random.Random()
+        self._clock = clock
+        self._successes = 0
+        self._last_decrease = float("-inf")
+        self._condition = asyncio.Condition()
+
+    def backoff_delay(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        """第 attempt 次失败后的等待时间（完全抖动的指数退避）
+
+        Args:
+            attempt: 已失败的次数（从0开始）
+            retry_after: 服务端建议的等待时间
+
+        Returns:
+            float: 等待秒数
+        """
+        ceiling = min(self.backoff_max, self.backoff_base * (2**attempt))
+        delay = self._rng.uniform(0, ceiling)
+        if retry_after:
+            delay = max(delay, retry_after)
+        return delay
+
+    def _on_success(self):
+        # 加性增：每完成一轮（当前上限个）成功请求，并发上限加一
+        self._successes += 1
+        if self._successes >= self.limit and self.limit < self.max_concurrency:
+            self.limit += 1
+            self._successes = 0
+
+    def _on_throttle(self, started_at: float, retry_after: Optional[float]):
+        self.throttled += 1
+        profiler.count("throttled")
+        if retry_after:
+            self.bucket.block_for(retry_after)
+        # 乘性减：同一批并发请求的限流只减一次
+        if started_at > self._last_decrease:
+            self.limit = max(self.min_concurrency, self.limit // 2)
+            self._last_decrease = self._clock()
+            self._successes = 0
+
+    async def _acquire_slot(self):
+        async with self._condition:
+            await self._condition.wait_for(lambda: self.active < self.limit)
+            self.active += 1
+
+    async def _release_slot(self):
+        async with self._condition:
+            self.active -= 1
+            self._condition.notify_all()
+
+    async def submit(
+        self,
+        request: Callable[[], Awaitable[Any]],
+        max_attempts: Optional[int] = None,
+        label: str = "请求",
+    ) -> Any:
+        """在并发和速率限制下执行请求，失败时退避重试
+
+        Args:
+            request: 无参协程函数，每次调用发起一次请求；抛出 ThrottledError 表示被限流，
+                NonRetryableError 表示无需重试，其他异常均视为可重试
+            max_attempts: 最大尝试次数，默认使用调度器的设置
+            label: 日志中的请求名称
+
+        Returns:
+            请求的返回值
+
+        Raises:
+            Exception: 最后一次尝试的异常（或不可重试的异常）
+        """
+        max_attempts = max(1, max_attempts or self.max_attempts)
+        for attempt in range(max_attempts):
+            retry_after = None
+            await self._acquire_slot()
+            try:
+                await self.bucket.acquire()
+                started_at = self._clock()
+                result = await request()
+            except NonRetryableError:
+                raise
+            except ThrottledError as e:
+                self._on_throttle(started_at, e.retry_after)
+                retry_after = e.retry_after
+                error = e
+            except Exception as e:
+                error = e
+            else:
+                self._on_success()
+                return result
+            finally:
+                await self._release_slot()
+
+            if attempt == max_attempts - 1:
+                raise error
+            delay = self.backoff_delay(attempt, retry_after)
+            print(
+                f"{label} 失败 (尝试 {attempt + 1}/{max_attempts}): {error}，"
+                f"{delay:.1f} 秒后重试"
+            )
+            profiler.count(profiler.RETRIES)
+            await asyncio.sleep(delay)
@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+"""
+字词时间
+
+合成时服务端按顺序报告每个词和标点的音频偏移与时长（word boundary 事件），
+这里将其记录为相对片段音频起点的时间（秒），随统计文件保存，
+字幕可以据此切分为带时间的短句，无需分析音频。
+"""
+
+from typing import Any, Dict, List, Sequence
+
+from .batching import TICKS_PER_SECOND
+
+# 记录的边界类型（句子边界与词边界重叠，不单独记录）
+BOUNDARY_TYPES = ("word", "punctuation")
+
+
+def boundary_record(evt: Any) -> Dict[str, Any]:
+    """将 SDK 的 word boundary 事件转换为字词时间记录
+
+    Args:
+        evt: SpeechSynthesisWordBoundaryEventArgs（text、audio_offset、duration、
+            boundary_type）
+
+    Returns:
+        Dict[str, Any]: text、start、end（秒，相对本次请求的音频起点）和 type
+    """
+    start = evt.audio_offset / TICKS_PER_SECOND
+    duration = evt.duration
+    duration = (
+        duration.total_seconds()
+        if hasattr(duration, "total_seconds")
+        else float(duration or 0) / TICKS_PER_SECOND
+    )
+    kind = str(evt.boundary_type).rsplit(".", 1)[-1].lower()
+    return {"text": evt.text, "start": start, "end": start + duration, "type": kind}
+
+
+def split_boundaries(
+    words: Sequence[Dict[str, Any]], offsets: Sequence[int]
+) -> List[List[Dict[str, Any]]]:
+    """按 split_wav 的切分点把字词时间分配到各段，并换算为相对段起点的时间
+
+    Args:
+        words: boundary_record 生成的记录，按时间排列
+        offsets: 各段起始的音频偏移（100 纳秒），第一段从音频起点开始
+
+    Returns:
+        List[List[Dict[str, Any]]]: 每段的字词时间
+    """
+    starts = [0.0] + [offset / TICKS_PER_SECOND for offset in offsets[1:]]
+    segments = [[] for _ in starts]
+    segment = 0
+    for word in words:
+        while segment + 1 < len(starts) and word["start"] >= starts[segment + 1]:
+            segment += 1
+        shift = starts[segment]
+        segments[segment].append(
+            dict(word, start=word["start"] - shift, end=word["end"] - shift)
+        )
+    return segments
@@ -0,0 +1,84 @@
+"""音频压缩编码的单元测试"""
+
+import io
+import wave
+
+import numpy as np
+import pytest
+
+from src.media.audio_encoder import (
+    AUDIO_FORMATS,
+    audio_extension,
+    build_audio_command,
+    encode_audio,
+)
+from src.media.audio_info import audio_duration, find_audio
+from src.media.ffmpeg_encoder import FFmpegEncodeError
+
+RATE = 48000
+
+
+def make_wav(seconds):
+    """指定时长的 440 Hz 单声道 16 位 WAV"""
+    t = np.arange(int(RATE * seconds)) / RATE
+    pcm = (np.sin(2 * np.pi * 440 * t) * 8000).astype("<i2")
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as writer:
+        writer.setnchannels(1)
+        writer.setsampwidth(2)
+        writer.setframerate(RATE)
+        writer.writeframes(pcm.tobytes())
+    return buffer.getvalue()
+
+
+class TestAudioEncoder:
+    """音频压缩编码的测试"""
+
+    def test_extensions(self):
+        """测试格式对应的扩展名，不支持的格式报错"""
+        assert audio_extension("wav") == ".wav"
+        assert audio_extension("aac") == ".m4a"
+        with pytest.raises(ValueError):
+            audio_extension("flac")
+
+    def test_build_command(self, temp_dir):
+        """测试命令行从 stdin 读取 WAV 并设置码率"""
+        cmd = build_audio_command(temp_dir / "a.opus", "opus", "32k", "ffmpeg")
+        assert cmd[0] == "ffmpeg"
+        assert cmd[cmd.index("-i") + 1] == "pipe:0"
+        assert cmd[cmd.index("-c:a") + 1] == "libopus"
+        assert cmd[cmd.index("-b:a") + 1] == "32k"
+        assert cmd[-1] == str(temp_dir / "a.opus")
+
+    def test_wav_passthrough(self):
+        """测试 wav 格式原样返回，不启动 ffmpeg"""
+        data = make_wav(0.1)
+        assert encode_audio(data, "wav", ffmpeg_binary="/nonexistent") is data
+
+    @pytest.mark.parametrize("audio_format", ["mp3", "aac", "opus"])
+    def test_encode_keeps_duration(self, audio_format, temp_dir):
+        """测试压缩后体积显著减小，时长与原音频一致"""
+        data = make_wav(2.0)
+        encoded = encode_audio(data, audio_format, "64k")
+
+        assert len(encoded) < len(data) / 5
+        path = temp_dir / f"output_1{AUDIO_FORMATS[audio_format][0]}"
+        path.write_bytes(encoded)
+        assert audio_duration(path) == pytest.approx(2.0, abs=0.08)
+
+    def test_encode_failure(self):
+        """测试无效输入时抛出 FFmpegEncodeError"""
+        with pytest.raises(FFmpegEncodeError):
+            encode_audio(b"not a wav", "mp3")
+
+
+class TestFindAudio:
+    """片段音频查找的测试"""
+
+    def test_lookup_order(self, temp_dir):
+        """测试压缩格式优先于 WAV，不存在时返回 None"""
+        assert find_audio(temp_dir, "output_1") is None
+        (temp_dir / "output_1.wav").write_bytes(b"")
+        assert find_audio(temp_dir, "output_1") == temp_dir / "output_1.wav"
+        (temp_dir / "output_1.opus").write_bytes(b"")
+        assert find_audio(temp_dir, "output_1") == temp_dir / "output_1.opus"
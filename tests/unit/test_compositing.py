@@ -0,0 +1,122 @@
+"""图层合成工具的单元测试"""
+
+import numpy as np
+import pytest
+
+from src.media.compositing import StaticBackgroundLayer
+
+
+class TestStaticBackgroundLayer:
+    """静态背景图层的测试"""
+
+    def test_foreground_is_centered(self):
+        """测试前景居中贴合，背景边框保持不变"""
+        background = np.full((12, 20, 3), 7, dtype=np.uint8)
+        layer = StaticBackgroundLayer(background, (10, 6))
+        foreground = np.full((6, 10, 3), 200, dtype=np.uint8)
+
+        frame = layer.compose(foreground)
+
+        assert layer.offset == (5, 3)
+        assert (frame[3:9, 5:15] == 200).all()
+        assert (frame[:3] == 7).all()
+        assert (frame[:, :5] == 7).all()
+
+    def test_background_stored_once_and_read_only(self):
+        """测试背景只读且不随合成被修改"""
+        background = np.zeros((4, 4, 3), dtype=np.uint8)
+        layer = StaticBackgroundLayer(background, (4, 4))
+
+        layer.compose(np.full((4, 4, 3), 255, dtype=np.uint8))
+
+        assert not layer.background.flags.writeable
+        assert (layer.background == 0).all()
+
+    def test_frame_function_wraps_foreground(self):
+        """测试帧函数包装"""
+        layer = StaticBackgroundLayer(np.zeros((4, 6, 3), dtype=np.uint8), (2, 2))
+        make_frame = layer.frame_function(
+            lambda t: np.full((2, 2, 3), int(t * 10), dtype=np.uint8)
+        )
+
+        frame = make_frame(1.5)
+
+        assert frame.shape == (4, 6, 3)
+        assert (frame[1:3, 2:4] == 15).all()
+
+    def test_foreground_larger_than_background(self):
+        """测试前景大于背景时报错"""
+        with pytest.raises(ValueError):
+            StaticBackgroundLayer(np.zeros((4, 4, 3), dtype=np.uint8), (5, 4))
+
+    def test_overlay_blended_on_border_and_foreground(self):
+        """测试叠加层在背景边框和前景区域都正确混合，且逐帧不累积"""
+        background = np.zeros((10, 10, 3), dtype=np.uint8)
+        layer = StaticBackgroundLayer(background, (4, 4))
+        rgb = np.full((2, 10, 3), 200, dtype=np.uint8)
+        alpha = np.full((2, 10), 255, dtype=np.uint8)
+        alpha[:, 0] = 0
+        layer.add_overlay(rgb, alpha, (0, 4))
+
+        for value in (50, 100):
+            frame = layer.compose(np.full((4, 4, 3), value, dtype=np.uint8))
+            # 边框部分与前景部分都被完全覆盖
+            assert (frame[4:6, 1:] == 200).all()
+            # alpha 为 0 的列保持背景
+            assert (frame[4:6, 0] == 0).all()
+            # 叠加层之外的前景保持原值
+            assert (frame[3, 3:7] == value).all()
+
+    def test_overlay_half_transparent(self):
+        """测试半透明叠加层按 alpha 混合"""
+        layer = StaticBackgroundLayer(np.zeros((4, 4, 3), dtype=np.uint8), (4, 4))
+        layer.add_overlay(
+            np.full((4, 4, 3), 255, dtype=np.uint8),
+            np.full((4, 4), 128, dtype=np.uint8),
+            (0, 0),
+        )
+
+        frame = layer.compose(np.full((4, 4, 3), 100, dtype=np.uint8))
+
+        expected = round((255 * 128 + 100 * 127) / 255)
+        assert (np.abs(frame.astype(int) - expected) <= 1).all()
+
+    def test_overlay_clipped_to_frame(self):
+        """测试超出画面的叠加层被裁剪"""
+        layer = StaticBackgroundLayer(np.zeros((4, 4, 3), dtype=np.uint8), (2, 2))
+        layer.add_overlay(
+            np.full((3, 3, 3), 255, dtype=np.uint8),
+            np.full((3, 3), 255, dtype=np.uint8),
+            (-1, 2),
+        )
+
+        frame = layer.compose(np.zeros((2, 2, 3), dtype=np.uint8))
+
+        assert (frame[2:4, 0:2] == 255).all()
+        assert (frame[:2] == 0).all()
+        assert (frame[:, 2:] == 0).all()
+
+    def test_timed_overlays(self):
+        """测试限时叠加层只在对应时间显示，切换时不残留，静态叠加层不受影响"""
+        layer = StaticBackgroundLayer(np.zeros((6, 6, 3), dtype=np.uint8), (2, 2))
+        layer.add_overlay(
+            np.full((1, 6, 3), 50, dtype=np.uint8),
+            np.full((1, 6), 255, dtype=np.uint8),
+            (0, 0),
+        )
+        for value, start, end in ((100, 0.0, 1.0), (200, 1.0, 2.0)):
+            layer.add_overlay(
+                np.full((2, 6, 3), value, dtype=np.uint8),
+                np.full((2, 6), 255, dtype=np.uint8),
+                (0, 2),
+                start,
+                end,
+            )
+        make_frame = layer.frame_function(lambda t: np.full((2, 2, 3), 9, np.uint8))
+
+        assert (make_frame(0.5)[2:4] == 100).all()
+        assert (make_frame(1.5)[2:4] == 200).all()
+        frame = make_frame(2.5)
+        assert (frame[2:4, 2:4] == 9).all()
+        assert (frame[2:4, :2] == 0).all()
+        assert (frame[0] == 50).all()
@@ -0,0 +1,144 @@
+"""视频片段流拷贝拼接的单元测试"""
+
+import wave
+
+import numpy as np
+import pytest
+from moviepy.video.io.ffmpeg_reader import ffmpeg_parse_infos
+
+from src.media.concat import (
+    build_concat_command,
+    can_stream_copy,
+    concat_stream_copy,
+    write_concat_list,
+)
+from src.media.ffmpeg_encoder import FFmpegEncodeError, encode_clip
+
+
+def _make_clip(path, size, n_frames, fps=10):
+    """编码一个测试片段"""
+    clip = _StubClip(size, n_frames)
+    encode_clip(
+        clip, path, fps, preset="ultrafast", ffmpeg_params=["-pix_fmt", "yuv420p"]
+    )
+    return path
+
+
+def _make_wav(path, seconds, sample_rate=16000):
+    """生成一段正弦波音频"""
+    t = np.arange(int(seconds * sample_rate)) / sample_rate
+    samples = (np.sin(2 * np.pi * 440 * t) * 8000).astype(np.int16)
+    with wave.open(str(path), "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(sample_rate)
+        f.writeframes(samples.tobytes())
+    return path
+
+
+class TestStreamCopyConcat:
+    """流拷贝拼接的测试"""
+
+    def test_homogeneous_clips_can_stream_copy(self, temp_dir):
+        """测试参数一致的片段可以流拷贝"""
+        paths = [
+            _make_clip(temp_dir / f"clip_{i}.mp4", (64, 48), 10) for i in range(2)
+        ]
+
+        assert can_stream_copy(paths)
+
+    def test_mismatched_clips_fall_back(self, temp_dir):
+        """测试分辨率不一致的片段不能流拷贝"""
+        paths = [
+            _make_clip(temp_dir / "clip_0.mp4", (64, 48), 10),
+            _make_clip(temp_dir / "clip_1.mp4", (32, 48), 10),
+        ]
+
+        assert not can_stream_copy(paths)
+
+    def test_missing_file_cannot_stream_copy(self, temp_dir):
+        """测试无法读取的文件不能流拷贝"""
+        assert not can_stream_copy([temp_dir / "missing.mp4"])
+        assert not can_stream_copy([])
+
+    def test_concat_duration_is_sum(self, temp_dir):
+        """测试拼接结果时长为片段时长之和，且清理文件列表"""
+        paths = [
+            _make_clip(temp_dir / f"clip_{i}.mp4", (64, 48), 10) for i in range(3)
+        ]
+        output = temp_dir / "final.mp4"
+
+        concat_stream_copy(paths, output)
+
+        infos = ffmpeg_parse_infos(str(output))
+        assert infos["duration"] == pytest.approx(3.0, abs=0.15)
+        assert not (temp_dir / "final.concat.txt").exists()
+
+    def test_concat_with_looped_music(self, temp_dir):
+        """测试混入循环背景音乐并截断到视频时长"""
+        paths = [
+            _make_clip(temp_dir / f"clip_{i}.mp4", (64, 48), 10) for i in range(2)
+        ]
+        music = _make_wav(temp_dir / "music.wav", 0.5)
+        output = temp_dir / "final.mp4"
+
+        concat_stream_copy(paths, output, audio_path=music, duration=2.0)
+
+        infos = ffmpeg_parse_infos(str(output))
+        assert infos["audio_found"]
+        assert infos["duration"] == pytest.approx(2.0, abs=0.15)
+
+    def test_concat_failure_raises(self, temp_dir):
+        """测试 ffmpeg 失败时抛出异常且不留下输出文件"""
+        bad = temp_dir / "bad.mp4"
+        bad.write_bytes(b"not a video")
+        output = temp_dir / "final.mp4"
+
+        with pytest.raises(FFmpegEncodeError):
+            concat_stream_copy([bad], output)
+        assert not output.exists()
+
+
+class TestConcatCommand:
+    """拼接命令和文件列表的测试"""
+
+    def test_list_escapes_quotes(self, temp_dir):
+        """测试文件列表对单引号转义"""
+        list_path = write_concat_list([temp_dir / "it's.mp4"], temp_dir / "list.txt")
+
+        content = list_path.read_text(encoding="utf-8")
+        assert content.startswith("file '")
+        assert "it'\\''s.mp4" in content
+
+    def test_command_copies_all_streams(self, temp_dir):
+        """测试无替换音轨时拷贝全部流"""
+        cmd = build_concat_command(temp_dir / "list.txt", temp_dir / "out.mp4")
+
+        assert cmd[cmd.index("-c") + 1] == "copy"
+        assert "-stream_loop" not in cmd
+
+    def test_command_with_music_copies_video_only(self, temp_dir):
+        """测试替换音轨时只拷贝视频流"""
+        cmd = build_concat_command(
+            temp_dir / "list.txt",
+            temp_dir / "out.mp4",
+            audio_path=temp_dir / "music.mp3",
+            duration=12.5,
+        )
+
+        assert cmd[cmd.index("-c:v") + 1] == "copy"
+        assert cmd[cmd.index("-stream_loop") + 1] == "-1"
+        assert cmd[cmd.index("-t") + 1] == "12.500"
+
+
+class _StubClip:
+    """最小化的片段对象，只提供编码所需的接口"""
+
+    def __init__(self, size, n_frames):
+        self.size = size
+        self.n_frames = n_frames
+
+    def iter_frames(self, fps, dtype):
+        width, height = self.size
+        for i in range(self.n_frames):
+            yield np.full((height, width, 3), i * 10 % 255, dtype=dtype)
@@ -148,6 +148,17 @@ class TestConfig:
         with patch.dict(os.environ, {'SD_STYLE': 'Harry Potter-style children\'s stories'}):
             config_with_style = Config()
             assert config_with_style.sd_style == 'Harry Potter-style children\'s stories'
+
+    def test_sd_api_urls(self):
+        """测试SD端点列表，未配置SD_API_URLS时使用SD_API_URL"""
+        with patch.dict(os.environ, {'SD_API_URL': 'http://a:7860', 'SD_API_URLS': ''}):
+            assert Config().sd_api_urls == ['http://a:7860']
+        with patch.dict(os.environ, {'SD_API_URLS': 'http://a:7860, http://b:7860'}):
+            config = Config()
+            assert config.sd_api_urls == ['http://a:7860', 'http://b:7860']
+            assert config.sd_endpoint_concurrency >= 1
+        with patch.dict(os.environ, {'SD_API_URLS': 'http://a:7860,b:7860'}):
+            assert any('SD_API_URLS' in e for e in Config().validate_config())
     
     def test_azure_speech_configuration(self):
         """测试Azure语音配置"""
@@ -0,0 +1,101 @@
+"""内容寻址文件缓存的单元测试"""
+
+import hashlib
+import os
+from pathlib import Path
+
+from src.content_cache import ContentCache, hash_file, make_key
+
+
+class TestMakeKey:
+    """缓存键计算的测试"""
+
+    def test_key_is_stable(self, temp_dir):
+        """测试相同输入得到相同的键，字典键顺序无关"""
+        source = temp_dir / "a.bin"
+        source.write_bytes(b"hello")
+
+        first = make_key(source, "text", {"a": 1, "b": 2})
+        second = make_key(source, "text", {"b": 2, "a": 1})
+
+        assert first == second
+        assert len(first) == 64
+
+    def test_key_follows_file_content(self, temp_dir):
+        """测试 Path 按文件内容而不是路径计算"""
+        source = temp_dir / "a.bin"
+        source.write_bytes(b"hello")
+        before = make_key(source)
+
+        source.write_bytes(b"world")
+
+        assert make_key(source) != before
+        assert hash_file(source) == hashlib.sha256(b"world").hexdigest()
+
+    def test_parts_are_delimited(self):
+        """测试分段拼接不会产生相同的键"""
+        assert make_key("ab", "c") != make_key("a", "bc")
+        assert make_key(None) != make_key("")
+
+
+class TestContentCache:
+    """缓存读写与淘汰的测试"""
+
+    def test_put_and_fetch(self, temp_dir):
+        """测试存入后可以取出到新路径"""
+        cache = ContentCache(temp_dir / "cache", suffix=".mp4")
+        source = temp_dir / "clip.mp4"
+        source.write_bytes(b"video")
+
+        assert not cache.fetch("ab" * 32, temp_dir / "out.mp4")
+        cache.put("ab" * 32, source)
+        source.unlink()
+
+        assert cache.fetch("ab" * 32, temp_dir / "out.mp4")
+        assert (temp_dir / "out.mp4").read_bytes() == b"video"
+        assert cache.path_for("ab" * 32).parent.name == "ab"
+
+    def test_fetch_replaces_existing_file(self, temp_dir):
+        """测试取出时替换已存在的目标文件"""
+        cache = ContentCache(temp_dir / "cache")
+        cache.put_bytes("cd" * 32, b"new")
+        dest = temp_dir / "out.bin"
+        dest.write_bytes(b"old")
+
+        assert cache.fetch("cd" * 32, dest)
+        assert dest.read_bytes() == b"new"
+
+    def test_fetch_onto_existing_link(self, temp_dir):
+        """测试目标已是缓存条目的硬链接时不残留临时文件"""
+        cache = ContentCache(temp_dir / "cache")
+        dest = temp_dir / "out.bin"
+        dest.write_bytes(b"audio")
+        cache.put("ef" * 32, dest)
+
+        assert cache.fetch("ef" * 32, dest)
+        assert dest.read_bytes() == b"audio"
+        assert [p.name for p in temp_dir.iterdir() if p.is_file()] == ["out.bin"]
+
+    def test_evict_least_recently_used(self, temp_dir):
+        """测试超出容量时淘汰最久未使用的条目"""
+        cache = ContentCache(temp_dir / "cache", max_bytes=10)
+        keys = ["0" * 64, "1" * 64, "2" * 64]
+        for n, key in enumerate(keys):
+            path = cache.put_bytes(key, b"x" * 5)
+            os.utime(path, (1000 + n, 1000 + n))
+
+        # 访问最早的条目后，它不应被淘汰
+        cache.get(keys[0])
+
+        assert cache.evict() == 1
+        assert cache.get(keys[0]) is not None
+        assert cache.get(keys[1]) is None
+        assert cache.get(keys[2]) is not None
+
+    def test_unlimited_cache_never_evicts(self, temp_dir):
+        """测试容量为 0 时不淘汰"""
+        cache = ContentCache(temp_dir / "cache")
+        cache.put_bytes("0" * 64, b"x" * 100)
+
+        assert cache.evict() == 0
+        assert isinstance(cache.get("0" * 64), Path)
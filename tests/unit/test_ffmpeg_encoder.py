@@ -0,0 +1,103 @@
+"""FFmpeg 管道编码器的单元测试"""
+
+import numpy as np
+import pytest
+
+from src.media.ffmpeg_encoder import (
+    FFmpegEncodeError,
+    FFmpegPipeEncoder,
+    encode_clip,
+)
+
+
+class TestFFmpegPipeEncoder:
+    """FFmpeg 管道编码器的测试"""
+
+    def test_build_command_with_audio(self, temp_dir):
+        """测试带音频时的命令行"""
+        encoder = FFmpegPipeEncoder(
+            temp_dir / "out.mp4",
+            (64, 48),
+            30,
+            audio_path=temp_dir / "a.wav",
+            preset="fast",
+            ffmpeg_params=["-crf", "18"],
+        )
+        cmd = encoder.build_command()
+
+        assert cmd[cmd.index("-s") + 1] == "64x48"
+        assert cmd[cmd.index("-pix_fmt") + 1] == "rgb24"
+        assert str(temp_dir / "a.wav") in cmd
+        assert "1:a:0" in cmd
+        assert cmd[cmd.index("-preset") + 1] == "fast"
+        assert cmd[-3:] == ["-crf", "18", str(temp_dir / "out.mp4")]
+
+    def test_build_command_without_audio(self, temp_dir):
+        """测试无音频时不映射音频流"""
+        cmd = FFmpegPipeEncoder(temp_dir / "out.mp4", (64, 48), 25).build_command()
+
+        assert "-c:a" not in cmd
+        assert "-map" not in cmd
+
+    def test_parse_progress_keeps_last_values(self):
+        """测试解析 -progress 输出"""
+        lines = [
+            "frame=10",
+            "out_time_us=N/A",
+            "out_time_us=400000",
+            "progress=continue",
+            "frame=30",
+            "out_time_us=1000000",
+            "progress=end",
+            "some error line",
+        ]
+
+        progress = FFmpegPipeEncoder.parse_progress(lines)
+
+        assert progress["frame"] == 30
+        assert progress["out_time_us"] == 1000000
+
+    def test_frame_size_mismatch(self, temp_dir):
+        """测试帧尺寸不一致时报错"""
+        with FFmpegPipeEncoder(temp_dir / "out.mp4", (64, 48), 10) as encoder:
+            encoder.write_frame(np.zeros((48, 64, 3), dtype=np.uint8))
+            with pytest.raises(ValueError):
+                encoder.write_frame(np.zeros((10, 10, 3), dtype=np.uint8))
+
+    def test_encode_reports_duration(self, temp_dir):
+        """测试编码后由 ffmpeg 报告时长和帧数"""
+        clip = _StubClip((64, 48), 20)
+        result = encode_clip(
+            clip,
+            temp_dir / "out.mp4",
+            10,
+            preset="ultrafast",
+            ffmpeg_params=["-pix_fmt", "yuv420p"],
+        )
+
+        assert result.frames == 20
+        assert result.duration == pytest.approx(2.0, abs=0.15)
+        assert (temp_dir / "out.mp4").stat().st_size > 0
+
+    def test_encode_failure_raises(self, temp_dir):
+        """测试 ffmpeg 失败时抛出异常"""
+        encoder = FFmpegPipeEncoder(
+            temp_dir / "out.mp4", (64, 48), 10, ffmpeg_params=["-invalid-option"]
+        )
+
+        with pytest.raises(FFmpegEncodeError):
+            with encoder:
+                encoder.write_frame(np.zeros((48, 64, 3), dtype=np.uint8))
+
+
+class _StubClip:
+    """最小化的片段对象，只提供编码所需的接口"""
+
+    def __init__(self, size, n_frames):
+        self.size = size
+        self.n_frames = n_frames
+
+    def iter_frames(self, fps, dtype):
+        width, height = self.size
+        for i in range(self.n_frames):
+            yield np.full((height, width, 3), i * 10 % 255, dtype=dtype)
@@ -3,16 +3,25 @@
 import pytest
 import json
 import base64
+import shlex
+import threading
+import time
 import pandas as pd
 from pathlib import Path
-from unittest.mock import Mock, patch, mock_open
+from unittest.mock import MagicMock, Mock, patch, mock_open
 
 from src.pipeline.image_generator import (
     post,
     save_img,
     get_prompts,
-    generate_data
+    generate_data,
+    generate_images,
+    image_cache_key,
+    pack_request,
+    pack_tasks
 )
+from src.content_cache import ContentCache
+from src.services.image.balancer import SDLoadBalancer
 
 
 class TestImageGenerator:
@@ -333,4 +342,229 @@ class TestImageGenerator:
         prompt = ",".join(prompt_parts)
         
         expected_prompt = "masterpiece,(best quality),a mountain view"
-        assert prompt == expected_prompt
\ No newline at end of file
+        assert prompt == expected_prompt
+
+def txt2img_response(images):
+    """流式读取的 txt2img 响应"""
+    response = MagicMock(status_code=200)
+    response.iter_content.return_value = [json.dumps({"images": images}).encode()]
+    return response
+
+
+PNG_B64 = "iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAADUlEQVR42mP8/5+hHgAHggJ/PchI7wAAAABJRU5ErkJggg=="
+
+
+class TestConcurrentGeneration:
+    """多端点并发生成的测试"""
+
+    def test_generate_across_endpoints(self, temp_dir):
+        """测试请求分散到各端点并发执行，单端点在途数不超过上限"""
+        lock = threading.Lock()
+        inflight = {}
+        peak = {}
+
+        def fake_post(url, data, headers, timeout, **kwargs):
+            with lock:
+                inflight[url] = inflight.get(url, 0) + 1
+                peak[url] = max(peak.get(url, 0), inflight[url])
+            time.sleep(0.05)
+            with lock:
+                inflight[url] -= 1
+            return txt2img_response([PNG_B64])
+
+        balancer = SDLoadBalancer(["http://a", "http://b"], poll_interval=0)
+        urls = ["http://a/sdapi/v1/txt2img", "http://b/sdapi/v1/txt2img"]
+        tasks = [
+            (i, {"prompt": f"p{i}"}, temp_dir / f"output_{i}.png") for i in range(1, 7)
+        ]
+        params_file = temp_dir / "params.json"
+
+        with patch("requests.post", side_effect=fake_post):
+            count = generate_images(tasks, balancer, 8, params_file)
+
+        assert count == 6
+        assert peak == {urls[0]: 1, urls[1]: 1}
+        for i in range(1, 7):
+            assert (temp_dir / f"output_{i}.png").stat().st_size > 0
+        assert not list(temp_dir.glob(".*.tmp"))
+        assert len(params_file.read_text(encoding="utf-8").splitlines()) == 6
+
+    def test_failed_scene_not_recorded(self, temp_dir):
+        """测试生成失败的图片不写入文件和参数记录"""
+        response = txt2img_response([])
+        tasks = [(1, {"prompt": "p"}, temp_dir / "output_1.png")]
+        params_file = temp_dir / "params.json"
+
+        with patch("requests.post", return_value=response):
+            balancer = SDLoadBalancer(["http://a"], poll_interval=0)
+            count = generate_images(tasks, balancer, 2, params_file)
+
+        assert count == 0
+        assert not (temp_dir / "output_1.png").exists()
+        assert not params_file.exists()
+
+
+class TestImageCache:
+    """按生成请求哈希缓存图片的测试"""
+
+    def test_cache_key(self):
+        """测试缓存键覆盖全部生成参数，随机种子不缓存"""
+        data = {"prompt": "masterpiece,a cat,<lora:x:0.8>", "seed": 42, "steps": 20}
+        assert image_cache_key(data) == image_cache_key(dict(data))
+        assert image_cache_key(data) != image_cache_key(dict(data, steps=30))
+        assert image_cache_key(data) != image_cache_key(data, service="liblib_f1")
+        assert image_cache_key(dict(data, seed=-1)) is None
+
+    def test_generated_images_reused(self, temp_dir):
+        """测试生成的图片存入缓存，之后以硬链接取出到其他位置"""
+        response = txt2img_response([PNG_B64])
+        cache = ContentCache(temp_dir / "cache", suffix=".png")
+        data = {"prompt": "p", "seed": 42}
+        tasks = [
+            (1, data, temp_dir / "a" / "output_1.png"),
+            (2, dict(data, seed=-1), temp_dir / "a" / "output_2.png"),
+        ]
+
+        with patch("requests.post", return_value=response):
+            balancer = SDLoadBalancer(["http://a"], poll_interval=0)
+            assert generate_images(tasks, balancer, 2, cache=cache) == 2
+
+        assert len(list((temp_dir / "cache").glob("*/*.png"))) == 1
+        reused = temp_dir / "b" / "output_5.png"
+        reused.parent.mkdir()
+        assert cache.fetch(image_cache_key(data), reused)
+        assert reused.stat().st_ino == tasks[0][2].stat().st_ino
+
+
+class TestScenePacking:
+    """多个场景合并为一个请求的测试"""
+
+    def test_pack_tasks_groups_by_settings_and_lora(self, temp_dir):
+        """测试只有参数和LoRA相同的场景才合并，每包不超过上限"""
+        base = {"seed": 42, "steps": 20}
+        datas = [
+            dict(base, prompt="a,<lora:x:0.8>"),
+            dict(base, prompt="b,<lora:y:0.8>"),
+            dict(base, prompt="c,<lora:x:0.8>"),
+            dict(base, prompt="d,<lora:x:0.8>"),
+            dict(base, prompt="e,<lora:x:0.8>", steps=30),
+        ]
+        tasks = [(i, d, temp_dir / f"output_{i}.png") for i, d in enumerate(datas, 1)]
+
+        packs = pack_tasks(tasks, 2)
+
+        assert [[task[0] for task in pack] for pack in packs] == [
+            [1, 3], [2], [4], [5]
+        ]
+        assert pack_tasks(tasks, 1) == [[task] for task in tasks]
+
+    def test_unpackable_scenes_sent_alone(self, temp_dir):
+        """测试多图批次和含换行的提示词不合并"""
+        datas = [
+            {"prompt": "a", "seed": 42, "batch_size": 2},
+            {"prompt": "b", "seed": 42, "batch_size": 2},
+            {"prompt": "c\nd", "seed": 42},
+            {"prompt": "e", "seed": 42},
+            {"prompt": "f", "seed": 42},
+        ]
+        tasks = [(i, d, temp_dir / f"output_{i}.png") for i, d in enumerate(datas, 1)]
+
+        packs = pack_tasks(tasks, 4)
+
+        assert [[task[0] for task in pack] for pack in packs] == [
+            [1], [2], [3], [4, 5]
+        ]
+
+    def test_pack_request(self):
+        """测试合并请求每行一个提示词，其余参数与单独请求相同"""
+        datas = [
+            {"prompt": 'a "cat", <lora:x:0.8>', "seed": 42, "steps": 20},
+            {"prompt": "a dog's house", "seed": 42, "steps": 20},
+        ]
+
+        packed = pack_request(datas)
+
+        assert packed["script_name"] == "prompts from file or textbox"
+        assert packed["prompt"] == ""
+        assert packed["seed"] == 42 and packed["steps"] == 20
+        lines = packed["script_args"][-1].splitlines()
+        assert [shlex.split(line) for line in lines] == [
+            ["--prompt", datas[0]["prompt"]],
+            ["--prompt", datas[1]["prompt"]],
+        ]
+        assert datas[0]["prompt"] == 'a "cat", <lora:x:0.8>'
+
+    def test_packed_images_split_to_scenes(self, temp_dir):
+        """测试一次请求返回的多张图片按顺序写入各场景，参数和缓存按场景记录"""
+        images = [base64.b64encode(bytes([i]) * 30).decode() for i in range(3)]
+        cache = ContentCache(temp_dir / "cache", suffix=".png")
+        tasks = [
+            (i, {"prompt": f"p{i}", "seed": 42}, temp_dir / f"output_{i}.png")
+            for i in range(1, 4)
+        ]
+        info = json.dumps({"all_prompts": ["p1", "p2", "p3"]})
+        response = packed_response(images, info)
+        params_file = temp_dir / "params.json"
+
+        with patch("requests.post", return_value=response) as post:
+            balancer = SDLoadBalancer(["http://a"], poll_interval=0)
+            count = generate_images(tasks, balancer, 2, params_file, cache, 4)
+
+        assert count == 3
+        assert post.call_count == 1
+        for i, (_, data, path) in enumerate(tasks):
+            assert path.read_bytes() == bytes([i]) * 30
+            assert cache.get(image_cache_key(data)) is not None
+        assert len(params_file.read_text(encoding="utf-8").splitlines()) == 3
+        assert sorted(p.name for p in temp_dir.glob("output_*")) == [
+            "output_1.png", "output_2.png", "output_3.png"
+        ]
+
+    @pytest.mark.parametrize(
+        "image_count, info",
+        [
+            # 端点忽略脚本，只返回一张基础提示词的图片
+            (1, None),
+            # 图片数量相同，但 info 显示提示词与场景不对应
+            (2, json.dumps({"all_prompts": ["start", "start"]})),
+        ],
+    )
+    def test_mismatched_pack_generated_individually(self, temp_dir, image_count, info):
+        """测试合并请求的图片与场景不对应时全部丢弃，逐个单独请求"""
+        images = [base64.b64encode(b"wrong").decode()] * image_count
+        singles = [base64.b64encode(name.encode()).decode() for name in ("a", "b")]
+        responses = [
+            packed_response(images, info),
+            txt2img_response([singles[0]]),
+            txt2img_response([singles[1]]),
+        ]
+        tasks = [
+            (i, {"prompt": f"p{i}", "seed": 42}, temp_dir / f"output_{i}.png")
+            for i in (1, 2)
+        ]
+        cache = ContentCache(temp_dir / "cache", suffix=".png")
+
+        with patch("requests.post", side_effect=responses) as post:
+            balancer = SDLoadBalancer(["http://a"], poll_interval=0)
+            count = generate_images(tasks, balancer, 2, cache=cache, pack_size=2)
+
+        assert count == 2
+        assert post.call_count == 3
+        calls = post.call_args_list
+        sent = [json.loads(call.kwargs["data"]) for call in calls]
+        assert sent[0]["script_name"] == "prompts from file or textbox"
+        assert sent[1:] == [task[1] for task in tasks]
+        assert (temp_dir / "output_1.png").read_bytes() == b"a"
+        assert (temp_dir / "output_2.png").read_bytes() == b"b"
+        assert cache.get(image_cache_key(tasks[0][1])).read_bytes() == b"a"
+        assert not list(temp_dir.glob(".*"))
+
+
+def packed_response(images, info=None):
+    """带 info 字段的流式 txt2img 响应"""
+    body = {"images": images}
+    if info is not None:
+        body["info"] = info
+    response = MagicMock(status_code=200)
+    response.iter_content.return_value = [json.dumps(body).encode()]
+    return response
@@ -0,0 +1,115 @@
+"""txt2img 响应流式解码的单元测试"""
+
+import base64
+import json
+import os
+import tracemalloc
+
+import pytest
+
+from src.services.image.streaming import (
+    ImageStreamDecoder,
+    ImageStreamError,
+    decode_stream,
+    write_images,
+)
+
+
+def chunked(data, size):
+    return [data[i : i + size] for i in range(0, len(data), size)]
+
+
+def payload(images, escape_slash=False):
+    """构造与 WebUI 相同结构的 txt2img 响应"""
+    body = json.dumps(
+        {
+            "images": [base64.b64encode(image).decode() for image in images],
+            "parameters": {"prompt": 'a "cat", [images]', "seed": 42, "tags": []},
+            "info": json.dumps({"images": ["not an image"], "infotexts": ["中文"]}),
+        }
+    )
+    if escape_slash:
+        body = body.replace("/", "\\/")
+    return body.encode()
+
+
+class TestWriteImages:
+    """流式解码写入的测试"""
+
+    @pytest.mark.parametrize("chunk_size", [1, 7, 4096])
+    def test_decodes_across_chunk_boundaries(self, temp_dir, chunk_size):
+        """测试任意切块（含转义序列被截断）都能还原图片"""
+        image = os.urandom(3000)
+        data = payload([image], escape_slash=True)
+
+        written = write_images(chunked(data, chunk_size), [temp_dir / "output_1.png"])
+
+        assert written == [temp_dir / "output_1.png"]
+        assert written[0].read_bytes() == image
+
+    def test_multiple_images(self, temp_dir):
+        """测试按顺序写入多张图片，多出的图片被丢弃"""
+        images = [os.urandom(100 + i) for i in range(3)]
+        paths = [temp_dir / "a.png", temp_dir / "b.png"]
+
+        written = write_images(chunked(payload(images), 50), paths)
+
+        assert written == paths
+        assert [path.read_bytes() for path in paths] == images[:2]
+        assert sorted(p.name for p in temp_dir.iterdir()) == ["a.png", "b.png"]
+
+    def test_peak_memory_below_image_size(self, temp_dir):
+        """测试解码时不保留完整的响应和图片"""
+        image = os.urandom(8 * 1024 * 1024)
+        data = payload([image])
+        chunks = iter(chunked(data, 64 * 1024))
+
+        tracemalloc.start()
+        try:
+            write_images(chunks, [temp_dir / "big.png"])
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+        assert (temp_dir / "big.png").read_bytes() == image
+        assert peak < 2 * 1024 * 1024
+
+    def test_escaped_surrogate_pair(self, temp_dir):
+        """测试其他字段中转义的代理对（如 emoji）不影响解码"""
+        image = os.urandom(300)
+        data = payload([image]).replace(b'"info": "', b'"info": "\\ud83d\\ude00', 1)
+
+        written = write_images(chunked(data, 5), [temp_dir / "output_1.png"])
+
+        assert written[0].read_bytes() == image
+
+    def test_capture_top_level_field(self, temp_dir):
+        """测试保留顶层 info 字段（含转义），嵌套的同名字段不受影响"""
+        image = os.urandom(300)
+        data = payload([image]).replace(b'"info": "', b'"info": "\\ud83d\\ude00', 1)
+        decoder = ImageStreamDecoder([temp_dir / "output_1.png"], capture=("info",))
+
+        decode_stream(chunked(data, 3), decoder)
+
+        info = decoder.captured["info"]
+        assert info.startswith("\U0001f600")
+        assert json.loads(info[1:]) == {"images": ["not an image"], "infotexts": ["中文"]}
+
+    def test_truncated_response(self, temp_dir):
+        """测试响应中断时报错，不留下不完整的文件"""
+        data = payload([os.urandom(5000)])
+        with pytest.raises(ImageStreamError):
+            write_images([data[: len(data) // 2]], [temp_dir / "output_1.png"])
+        assert list(temp_dir.iterdir()) == []
+
+    def test_missing_images(self, temp_dir):
+        """测试响应中没有 images 字段时报错，空数组返回空列表"""
+        with pytest.raises(ImageStreamError):
+            write_images([b'{"detail": "Not Found", "info": "images"}'], ["x.png"])
+        assert write_images([b'{"images": [], "info": ""}'], ["x.png"]) == []
+
+    def test_invalid_base64(self, temp_dir):
+        """测试 base64 数据无效时报错"""
+        with pytest.raises(ImageStreamError):
+            write_images([b'{"images": ["abcde"]}'], [temp_dir / "output_1.png"])
+        assert list(temp_dir.iterdir()) == []
@@ -0,0 +1,72 @@
+"""Ken Burns 帧生成器的单元测试"""
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from src.media.ken_burns import KenBurnsRenderer
+
+
+def _gradient_image(width=200, height=100):
+    """生成水平渐变测试图片，便于验证平移方向"""
+    row = np.linspace(0, 255, width, dtype=np.uint8)
+    data = np.stack([np.tile(row, (height, 1))] * 3, axis=-1)
+    return Image.fromarray(data)
+
+
+class TestKenBurnsRenderer:
+    """Ken Burns 渲染器的测试"""
+
+    def test_crop_windows_match_linear_motion(self):
+        """测试裁剪窗口与匀速平移公式一致"""
+        renderer = KenBurnsRenderer(_gradient_image(), 2.0, 10, True, True)
+        lefts, uppers = renderer.crop_windows(np.array([0.0, 1.0, 2.0, 5.0]))
+
+        assert lefts.tolist() == pytest.approx([0.0, 10.0, 20.0, 20.0])
+        assert uppers.tolist() == pytest.approx([5.0] * 4)
+
+    def test_crop_windows_negative_vertical(self):
+        """测试垂直反向移动"""
+        renderer = KenBurnsRenderer(_gradient_image(), 2.0, 10, False, False)
+        lefts, uppers = renderer.crop_windows(np.array([0.0, 2.0]))
+
+        assert lefts.tolist() == pytest.approx([10.0, 10.0])
+        assert uppers.tolist() == pytest.approx([10.0, 0.0])
+
+    def test_frames_have_source_size(self):
+        """测试每一帧都与源图尺寸一致"""
+        renderer = KenBurnsRenderer(_gradient_image(), 1.0, 12, True, False)
+
+        for i in range(renderer.n_frames):
+            frame = renderer.make_frame(i / renderer.fps)
+            assert frame.shape == (100, 200, 3)
+            assert frame.dtype == np.uint8
+
+    def test_horizontal_pan_moves_towards_right(self):
+        """测试正向水平平移时画面内容逐渐变亮（渐变图向右平移）"""
+        renderer = KenBurnsRenderer(_gradient_image(), 2.0, 10, True, True)
+
+        first = renderer.make_frame(0).mean()
+        last = renderer.make_frame(renderer.duration).mean()
+
+        assert last > first
+
+    def test_frame_index_is_clamped(self):
+        """测试超出时长的时间点被限制在有效帧范围内"""
+        renderer = KenBurnsRenderer(_gradient_image(), 1.0, 10, True, True)
+
+        assert renderer.frame_index(-1) == 0
+        assert renderer.frame_index(100) == renderer.n_frames - 1
+
+    def test_frames_are_read_only(self):
+        """测试返回的帧为只读视图，防止污染预计算数据"""
+        renderer = KenBurnsRenderer(_gradient_image(), 1.0, 10, True, True)
+        frame = renderer.make_frame(0.5)
+
+        with pytest.raises(ValueError):
+            frame[0, 0, 0] = 0
+
+    def test_invalid_duration(self):
+        """测试无效时长"""
+        with pytest.raises(ValueError):
+            KenBurnsRenderer(_gradient_image(), 0, 30, True, True)
@@ -0,0 +1,134 @@
+"""本地语音合成和韵律换算的单元测试"""
+
+import sys
+import textwrap
+
+import pytest
+
+from src.services.tts.local_provider import LocalTTSProvider
+from src.services.tts.prosody import pitch_factor, rate_factor, volume_factor
+from src.services.tts.scheduler import TTSScheduler
+
+# 模拟 espeak：把标准输入的文本和命令行参数写入 -w 指定的 WAV
+FAKE_ENGINE = textwrap.dedent(
+    """
+    import sys, wave
+    args = sys.argv[1:]
+    text = sys.stdin.buffer.read()
+    if b"fail" in text:
+        sys.stderr.write("bad input")
+        sys.exit(2)
+    with wave.open(args[args.index("-w") + 1], "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(22050)
+        f.writeframes(text + b" " + " ".join(args).encode())
+    """
+)
+
+
+class TestProsody:
+    """SSML 韵律取值换算的测试"""
+
+    def test_rate(self):
+        """测试语速的命名值、百分比和倍数"""
+        assert rate_factor("medium") == 1.0
+        assert rate_factor("x-slow") == 0.5
+        assert rate_factor("+10%") == pytest.approx(1.1)
+        assert rate_factor("-50%") == pytest.approx(0.5)
+        assert rate_factor("1.5") == 1.5
+        assert rate_factor("") == 1.0
+
+    def test_pitch(self):
+        """测试音高的百分比、半音，Hz 按默认处理"""
+        assert pitch_factor("high") == 1.2
+        assert pitch_factor("-20%") == pytest.approx(0.8)
+        assert pitch_factor("+12st") == pytest.approx(2.0)
+        assert pitch_factor("+0Hz") == 1.0
+
+    def test_volume(self):
+        """测试音量的带符号相对值和 0-100 绝对值"""
+        assert volume_factor("+30%") == pytest.approx(1.3)
+        assert volume_factor("-10") == pytest.approx(0.9)
+        assert volume_factor("50") == pytest.approx(0.5)
+        assert volume_factor("soft") == 0.4
+        assert volume_factor("unknown") == 1.0
+
+
+class TestLocalTTSProvider:
+    """本地引擎的测试"""
+
+    def test_espeak_command_uses_prosody(self, temp_dir):
+        """测试 espeak 参数由 SSML 韵律设置换算，语音按语言选择"""
+        provider = LocalTTSProvider(rate="+10%", pitch="high", volume="+30%")
+
+        cmd = provider.build_command("zh-CN", temp_dir / "out.wav")
+
+        assert cmd[0] == "espeak-ng"
+        options = dict(zip(cmd[1:-1:2], cmd[2:-1:2]))
+        assert options == {
+            "-v": "cmn",
+            "-s": "193",
+            "-p": "60",
+            "-a": "130",
+            "-w": str(temp_dir / "out.wav"),
+        }
+        assert cmd[-1] == "--stdin"
+
+    def test_piper_command(self, temp_dir):
+        """测试 piper 使用模型文件，语速换算为时长倍数"""
+        provider = LocalTTSProvider(
+            engine="piper", voice="zh.onnx", rate="fast", command="/opt/piper/piper"
+        )
+
+        cmd = provider.build_command("zh-CN", temp_dir / "out.wav")
+
+        assert cmd[:3] == ["/opt/piper/piper", "--model", "zh.onnx"]
+        assert cmd[cmd.index("--length_scale") + 1] == "0.645"
+
+    def test_unsupported_engine(self):
+        """测试不支持的引擎"""
+        with pytest.raises(ValueError):
+            LocalTTSProvider(engine="say")
+
+    @pytest.mark.asyncio
+    async def test_synthesizes_with_subprocess(self, temp_dir):
+        """测试以子进程运行引擎，文本从标准输入传入"""
+        script = temp_dir / "fake_espeak.py"
+        script.write_text(FAKE_ENGINE, encoding="utf-8")
+        provider = LocalTTSProvider(command=f"{sys.executable} {script}")
+
+        result = await provider.get_tts_audio("你好", "zh-CN", 3)
+
+        assert result["index"] == 3
+        assert result["error"] is None
+        assert "你好".encode() in result["audio_data"].getvalue()
+
+    @pytest.mark.asyncio
+    async def test_engine_failure_is_not_retried(self, temp_dir):
+        """测试引擎报错或未安装时返回错误，不重试"""
+        script = temp_dir / "fake_espeak.py"
+        script.write_text(FAKE_ENGINE, encoding="utf-8")
+        scheduler = TTSScheduler(max_attempts=3, backoff_base=0)
+        provider = LocalTTSProvider(
+            command=f"{sys.executable} {script}", scheduler=scheduler
+        )
+        missing = LocalTTSProvider(command=str(temp_dir / "missing"))
+
+        failed = await provider.get_tts_audio("fail", "zh-CN", 1)
+        not_installed = await missing.get_tts_audio("你好", "zh-CN", 2)
+
+        assert "bad input" in failed["error"]
+        assert failed["audio_data"] is None
+        assert "TTS_LOCAL_COMMAND" in not_installed["error"]
+
+    def test_cache_key_follows_settings(self):
+        """测试缓存键随文本、韵律设置和命令行变化，忽略空白差异"""
+        provider = LocalTTSProvider()
+        key = provider.cache_key("你好 世界", "zh-CN")
+
+        assert provider.cache_key(" 你好\n世界 ", "zh-CN") == key
+        assert provider.cache_key("你好", "zh-CN") != key
+        assert LocalTTSProvider(rate="fast").cache_key("你好 世界", "zh-CN") != key
+        command = LocalTTSProvider(command="espeak-ng -v zh+f3")
+        assert command.cache_key("你好 世界", "zh-CN") != key
@@ -0,0 +1,167 @@
+"""响度归一化、重采样和音频统计文件的单元测试"""
+
+import io
+import json
+import wave
+
+import numpy as np
+import pytest
+
+from src.media.audio_info import (
+    audio_duration,
+    read_sidecar,
+    sidecar_path,
+    write_sidecar,
+)
+from src.media.loudness import (
+    audio_stats,
+    integrated_loudness,
+    normalize_wav,
+    resample,
+)
+
+RATE = 48000
+
+
+def sine(seconds, amplitude_db, freq=997, rate=RATE):
+    """指定峰值电平（dBFS）的正弦波，形状为 (帧数, 1)"""
+    t = np.arange(int(rate * seconds)) / rate
+    return (10 ** (amplitude_db / 20) * np.sin(2 * np.pi * freq * t))[:, None]
+
+
+def make_wav(samples, rate=RATE):
+    """由浮点采样生成 16 位 WAV 内容"""
+    pcm = np.clip(np.round(samples * 32768), -32768, 32767).astype("<i2")
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as writer:
+        writer.setnchannels(samples.shape[1])
+        writer.setsampwidth(2)
+        writer.setframerate(rate)
+        writer.writeframes(pcm.tobytes())
+    return buffer.getvalue()
+
+
+def read_params(data):
+    with wave.open(io.BytesIO(data), "rb") as reader:
+        return reader.getparams()
+
+
+class TestIntegratedLoudness:
+    """积分响度测量的测试"""
+
+    def test_reference_sine(self):
+        """测试 -20 dBFS 的 997 Hz 正弦波约为 -23 LUFS（EBU Tech 3341）"""
+        assert integrated_loudness(sine(5, -20), RATE) == pytest.approx(-23, abs=0.1)
+
+    def test_stereo_adds_channels(self):
+        """测试相同内容的立体声比单声道高约 3 LU"""
+        mono = sine(3, -20)
+        stereo = np.hstack([mono, mono])
+        difference = integrated_loudness(stereo, RATE) - integrated_loudness(
+            mono, RATE
+        )
+        assert difference == pytest.approx(3.01, abs=0.05)
+
+    def test_silence_is_gated(self):
+        """测试静音低于绝对门限，长静音不会拉低有声部分的响度"""
+        assert integrated_loudness(np.zeros((RATE, 1)), RATE) == float("-inf")
+        speech = sine(2, -20)
+        short = np.vstack([np.zeros((RATE, 1)), speech, np.zeros((RATE, 1))])
+        long = np.vstack([np.zeros((RATE * 10, 1)), speech, np.zeros((RATE * 10, 1))])
+        assert integrated_loudness(long, RATE) == pytest.approx(
+            integrated_loudness(short, RATE), abs=0.01
+        )
+
+
+class TestNormalizeWav:
+    """响度归一化和格式转换的测试"""
+
+    def test_reaches_target_loudness(self):
+        """测试不同音量的片段归一化后响度一致"""
+        for level in (-35, -20):
+            data, stats = normalize_wav(make_wav(sine(2, level)), target_lufs=-16.0)
+            assert stats["loudness"] == pytest.approx(-16.0, abs=0.2)
+            assert audio_stats(data)["loudness"] == pytest.approx(-16.0, abs=0.2)
+            assert stats["bytes"] == len(data)
+
+    def test_peak_limit(self):
+        """测试增益受峰值上限约束，不会削波"""
+        # 方波峰值高但响度低，达到目标响度需要超过峰值上限
+        square = np.sign(sine(2, 0)) * 0.5
+        square[::40] = 1.0
+        _, stats = normalize_wav(make_wav(square), target_lufs=0.0, peak_limit=-1.0)
+        assert stats["peak_dbfs"] <= -0.99
+        assert stats["loudness"] < 0.0
+
+    def test_disabled_keeps_level(self):
+        """测试目标响度为 None 时不调整增益"""
+        data = make_wav(sine(1, -20))
+        _, stats = normalize_wav(data, target_lufs=None)
+        assert stats["gain_db"] == 0.0
+        assert stats["loudness"] == pytest.approx(stats["source_loudness"], abs=0.05)
+
+    def test_resample_and_convert(self):
+        """测试重采样到目标采样率并统一转换为 16 位 PCM"""
+        samples = sine(1.5, -20, freq=440, rate=24000)
+        pcm = np.round(samples * 2**31).astype("<i4")
+        buffer = io.BytesIO()
+        with wave.open(buffer, "wb") as writer:
+            writer.setnchannels(1)
+            writer.setsampwidth(4)
+            writer.setframerate(24000)
+            writer.writeframes(pcm.tobytes())
+
+        data, stats = normalize_wav(buffer.getvalue(), sample_rate=48000)
+
+        params = read_params(data)
+        assert (params.framerate, params.sampwidth) == (48000, 2)
+        assert params.nframes == 72000
+        assert stats["source_sample_rate"] == 24000
+        assert stats["duration"] == pytest.approx(1.5)
+
+    def test_resample_preserves_tone(self):
+        """测试重采样不改变音高和响度"""
+        source = sine(1, -20, freq=440, rate=22050)
+        result = resample(source, 22050, 48000)
+        spectrum = np.abs(np.fft.rfft(result[:, 0]))
+        peak = np.fft.rfftfreq(len(result), 1 / 48000)[spectrum.argmax()]
+        assert peak == pytest.approx(440, abs=1)
+        assert integrated_loudness(result, 48000) == pytest.approx(
+            integrated_loudness(source, 22050), abs=0.1
+        )
+
+
+class TestSidecar:
+    """音频附属统计文件的测试"""
+
+    def test_round_trip(self, temp_dir):
+        """测试统计文件写入后可直接读取时长"""
+        audio_path = temp_dir / "output_1.wav"
+        data, stats = normalize_wav(make_wav(sine(1.25, -20)))
+        audio_path.write_bytes(data)
+        write_sidecar(audio_path, dict(stats, duration=9.0))
+
+        assert sidecar_path(audio_path) == temp_dir / "output_1.json"
+        assert read_sidecar(audio_path)["sample_rate"] == RATE
+        # 时长取自统计文件，不再解析音频
+        assert audio_duration(audio_path) == 9.0
+
+    def test_stale_sidecar_ignored(self, temp_dir):
+        """测试音频被替换后，大小不一致的统计文件被忽略"""
+        audio_path = temp_dir / "output_1.wav"
+        data, stats = normalize_wav(make_wav(sine(1, -20)))
+        audio_path.write_bytes(data)
+        write_sidecar(audio_path, stats)
+        audio_path.write_bytes(make_wav(sine(2, -20)))
+
+        assert read_sidecar(audio_path) is None
+        assert audio_duration(audio_path) == pytest.approx(2.0)
+
+    def test_invalid_sidecar_ignored(self, temp_dir):
+        """测试损坏的统计文件被忽略"""
+        audio_path = temp_dir / "output_1.wav"
+        audio_path.write_bytes(make_wav(sine(1, -20)))
+        sidecar_path(audio_path).write_text("{", encoding="utf-8")
+        assert read_sidecar(audio_path) is None
+        sidecar_path(audio_path).write_text(json.dumps([1]), encoding="utf-8")
+        assert read_sidecar(audio_path) is None
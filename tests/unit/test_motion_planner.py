@@ -0,0 +1,72 @@
+"""Ken Burns 运动规划的单元测试"""
+
+import numpy as np
+from PIL import Image
+
+from src.media.ken_burns import KenBurnsRenderer
+from src.media.motion_planner import MotionPlan, plan_motion, saliency_offset
+
+
+def _subject_image(x, y, size=(160, 90)):
+    """生成在 (x, y) 处有高对比度主体的图片"""
+    array = np.full((size[1], size[0], 3), 120, dtype=np.uint8)
+    array[y - 6 : y + 6, x - 6 : x + 6] = 255
+    array[y - 3 : y + 3, x - 3 : x + 3] = 0
+    return Image.fromarray(array)
+
+
+class TestMotionPlanner:
+    """运动规划的测试"""
+
+    def test_plan_is_deterministic(self):
+        """测试相同种子和序号得到相同规划，且与调用顺序无关"""
+        plans = [plan_motion(None, i, seed="story", use_saliency=False) for i in range(20)]
+        again = [
+            plan_motion(None, i, seed="story", use_saliency=False)
+            for i in reversed(range(20))
+        ]
+
+        assert plans == list(reversed(again))
+        # 不同片段的方向应当有变化
+        assert len({(p.move_on_x, p.move_positive) for p in plans}) > 1
+
+    def test_seed_changes_plan(self):
+        """测试种子参与规划"""
+        first = [plan_motion(None, i, seed="a", use_saliency=False) for i in range(20)]
+        second = [plan_motion(None, i, seed="b", use_saliency=False) for i in range(20)]
+
+        assert first != second
+
+    def test_saliency_pans_toward_subject(self):
+        """测试主体偏右时向右平移，偏上时向上平移"""
+        right = plan_motion(_subject_image(140, 45), 0)
+        top = plan_motion(_subject_image(80, 10), 0)
+
+        assert right.source == "saliency"
+        assert right.move_on_x and right.move_positive
+        assert top.source == "saliency"
+        assert not top.move_on_x and not top.move_positive
+
+    def test_flat_image_uses_seed(self):
+        """测试无明显主体时回退到种子方向"""
+        flat = Image.new("RGB", (160, 90), (50, 50, 50))
+
+        assert saliency_offset(flat) == (0.0, 0.0)
+        assert plan_motion(flat, 3, seed="s") == plan_motion(
+            None, 3, seed="s", use_saliency=False
+        )
+
+    def test_plan_round_trips_through_json(self):
+        """测试规划可以序列化并还原"""
+        plan = MotionPlan(move_on_x=False, move_positive=True, crop_ratio=0.85)
+
+        assert MotionPlan.from_json(plan.to_json()) == plan
+
+    def test_renderer_follows_plan(self):
+        """测试渲染器按规划设置方向和裁剪比例"""
+        plan = MotionPlan(move_on_x=False, move_positive=True, crop_ratio=0.8)
+        renderer = KenBurnsRenderer.from_plan(_subject_image(80, 45), 1.0, 10, plan)
+
+        assert not renderer.move_on_x
+        assert renderer.move_positive
+        assert renderer.crop_ratio == 0.8
@@ -0,0 +1,220 @@
+"""流水线性能剖析的单元测试"""
+
+import asyncio
+import csv
+import json
+import os
+import sys
+import threading
+from pathlib import Path
+
+import pytest
+
+from src import profiler
+
+
+@pytest.fixture
+def session(temp_dir, monkeypatch):
+    """开启一次剖析会话，测试结束后恢复环境变量"""
+    monkeypatch.delenv(profiler.EVENTS_ENV, raising=False)
+    monkeypatch.delenv(profiler.STAGE_ENV, raising=False)
+    current = profiler.ProfileSession(temp_dir, run_id="test")
+    current.start()
+    yield current
+    if not current.finished:
+        current.finish()
+
+
+class TestDisabled:
+    """未开启剖析时的测试"""
+
+    def test_noop_without_session(self, monkeypatch):
+        """测试未开启剖析时不写入任何记录，span 仍可正常使用"""
+        monkeypatch.delenv(profiler.EVENTS_ENV, raising=False)
+
+        assert not profiler.enabled()
+        profiler.count(profiler.NETWORK_CALLS)
+        with profiler.span("scene", "scene_1") as scene:
+            scene["status"] = "ok"
+
+    def test_run_stage_passthrough(self, monkeypatch):
+        """测试未开启剖析时 run_stage 等同于 subprocess.run"""
+        monkeypatch.delenv(profiler.EVENTS_ENV, raising=False)
+
+        result = profiler.run_stage(
+            "echo",
+            [sys.executable, "-c", "print('hi')"],
+            capture_output=True,
+            text=True,
+        )
+
+        assert result.returncode == 0
+        assert result.stdout.strip() == "hi"
+
+
+class TestSpans:
+    """span 和计数器的测试"""
+
+    def test_span_records_usage_and_counters(self, session):
+        """测试 span 记录耗时、资源用量、计数器和附加字段"""
+        with profiler.span("scene", "scene_1", scene=1) as scene:
+            profiler.count(profiler.NETWORK_CALLS, 2)
+            profiler.count(profiler.RETRIES)
+            scene["status"] = "ok"
+
+        events = profiler.load_events(session.events_path)
+        assert len(events) == 1
+        event = events[0]
+        assert event["kind"] == "scene"
+        assert event["scene"] == 1
+        assert event["status"] == "ok"
+        assert event["counters"] == {"network_calls": 2, "retries": 1}
+        assert event["wall_time"] >= 0
+        assert event["pid"] == os.getpid()
+        if profiler.resource is not None:
+            assert event["peak_rss_mb"] > 0
+
+    def test_counts_go_to_innermost_span(self, session):
+        """测试计数只计入最内层 span，span 外的计数单独记录"""
+        profiler.count(profiler.RETRIES)
+        with profiler.span("step", "outer"):
+            with profiler.span("scene", "inner"):
+                profiler.count(profiler.NETWORK_CALLS)
+
+        events = profiler.load_events(session.events_path)
+        by_name = {event["name"]: event for event in events}
+        assert by_name["retries"]["type"] == "count"
+        assert by_name["inner"]["counters"] == {"network_calls": 1}
+        assert by_name["outer"]["counters"] == {}
+
+    def test_span_marks_error(self, session):
+        """测试代码块抛出异常时记录为 error"""
+        with pytest.raises(ValueError):
+            with profiler.span("scene", "scene_1"):
+                raise ValueError("boom")
+
+        events = profiler.load_events(session.events_path)
+        assert events[0]["status"] == "error"
+
+    def test_concurrent_tasks_keep_separate_counters(self, session):
+        """测试同一线程中并发的 asyncio 任务各自计数"""
+
+        async def scene(index, calls):
+            with profiler.span("scene", f"scene_{index}"):
+                for _ in range(calls):
+                    profiler.count(profiler.NETWORK_CALLS)
+                    await asyncio.sleep(0)
+
+        async def run():
+            await asyncio.gather(scene(1, 1), scene(2, 3))
+
+        asyncio.run(run())
+
+        events = profiler.load_events(session.events_path)
+        counts = {event["name"]: event["counters"]["network_calls"] for event in events}
+        assert counts == {"scene_1": 1, "scene_2": 3}
+
+    def test_threads_write_complete_lines(self, session):
+        """测试多线程并发写入时每条记录完整"""
+
+        def worker(n):
+            for i in range(20):
+                with profiler.span("scene", f"scene_{n}_{i}"):
+                    profiler.count(profiler.NETWORK_CALLS)
+
+        threads = [threading.Thread(target=worker, args=(n,)) for n in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        lines = session.events_path.read_text(encoding="utf-8").splitlines()
+        assert len(lines) == 80
+        assert all(json.loads(line)["counters"] for line in lines)
+
+
+class TestStages:
+    """阶段记录和报告的测试"""
+
+    def test_run_stage_records_child_usage(self, session):
+        """测试子进程阶段记录资源用量，子进程内的计数归属该阶段"""
+        code = (
+            "from src import profiler\n"
+            "with profiler.span('scene', 'scene_1', scene=1):\n"
+            "    profiler.count(profiler.NETWORK_CALLS)\n"
+            "profiler.count(profiler.RETRIES, 2)\n"
+            "print('done')\n"
+        )
+        result = profiler.run_stage(
+            "demo",
+            [sys.executable, "-c", code],
+            cwd=Path(profiler.__file__).parent.parent,
+            capture_output=True,
+            text=True,
+        )
+
+        assert result.returncode == 0
+        assert result.stdout.strip() == "done"
+
+        summary = profiler.summarize(profiler.load_events(session.events_path))
+        stage = summary["stages"][0]
+        assert stage["name"] == "demo"
+        assert stage["status"] == "ok"
+        assert stage["scenes"] == 1
+        assert stage["counters"] == {"network_calls": 1, "retries": 2}
+        if hasattr(os, "wait4"):
+            assert stage["cpu_time"] > 0
+            assert stage["peak_rss_mb"] > 0
+
+    def test_run_stage_failure(self, session):
+        """测试子进程失败时返回退出码并记录为 failed"""
+        result = profiler.run_stage("fail", [sys.executable, "-c", "raise SystemExit(3)"])
+
+        assert result.returncode == 3
+        events = profiler.load_events(session.events_path)
+        if hasattr(os, "wait4"):
+            assert events[0]["status"] == "failed"
+
+    def test_in_process_stage_collects_counters(self, session):
+        """测试进程内阶段汇总期间所有计数（包括其他线程中 span 外的计数）"""
+        with profiler.span("stage", "images", per_thread=False):
+            thread = threading.Thread(
+                target=profiler.count, args=(profiler.NETWORK_CALLS, 5)
+            )
+            thread.start()
+            thread.join()
+
+        assert profiler.current_stage() is None
+        stage = profiler.summarize(profiler.load_events(session.events_path))[
+            "stages"
+        ][0]
+        assert stage["name"] == "images"
+        assert stage["counters"] == {"network_calls": 5}
+
+    def test_finish_writes_reports(self, session):
+        """测试结束会话时生成 JSON 和 CSV 报告并关闭剖析"""
+        with profiler.span("stage", "video", per_thread=False):
+            with profiler.span("scene", "scene_1", scene=1, status="ok"):
+                profiler.count("cache_hits")
+
+        json_path, csv_path = session.finish()
+
+        assert not profiler.enabled()
+        report = json.loads(json_path.read_text(encoding="utf-8"))
+        assert report["run_id"] == "test"
+        assert [stage["name"] for stage in report["stages"]] == ["video"]
+        assert report["stages"][0]["counters"] == {"cache_hits": 1}
+
+        with open(csv_path, encoding="utf-8") as f:
+            rows = list(csv.DictReader(f))
+        assert [row["kind"] for row in rows] == ["stage", "scene"]
+        assert rows[0]["cache_hits"] == "1"
+        assert rows[1]["status"] == "ok"
+        assert rows[1]["network_calls"] == "0"
+
+    def test_load_events_skips_partial_lines(self, temp_dir):
+        """测试读取事件时跳过不完整的行"""
+        path = temp_dir / "events.jsonl"
+        path.write_text('{"type": "count", "name": "x"}\n{"type": "sp', encoding="utf-8")
+
+        assert profiler.load_events(path) == [{"type": "count", "name": "x"}]
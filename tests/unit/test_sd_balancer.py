@@ -0,0 +1,261 @@
+"""SD WebUI 负载均衡的单元测试（使用本地桩 HTTP 服务）"""
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+from src.pipeline.image_generator import generate_images
+from src.services.image.balancer import (
+    NoHealthyEndpointError,
+    SDLoadBalancer,
+    queue_depth,
+)
+
+# conftest 默认替换了 requests.post，访问桩服务需要真实的请求函数
+REQUESTS_POST = requests.post
+
+PNG_B64 = "iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAADUlEQVR42mP8/5+hHgAHggJ/PchI7wAAAABJRU5ErkJggg=="
+
+
+class StubWebUI:
+    """模拟 SD WebUI 的 progress 和 txt2img 接口"""
+
+    def __init__(self):
+        self.progress = {"progress": 0, "state": {"job": "", "job_count": 0}}
+        self.progress_status = 200
+        self.txt2img_status = 200
+        self.txt2img_failures = 0  # 前几次 txt2img 请求返回 500
+        self.txt2img_calls = 0
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def reply(self, status, payload):
+                body = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                if self.path.startswith("/sdapi/v1/progress"):
+                    self.reply(stub.progress_status, stub.progress)
+                else:
+                    self.reply(404, {})
+
+            def do_POST(self):
+                self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                stub.txt2img_calls += 1
+                if stub.txt2img_calls <= stub.txt2img_failures:
+                    self.reply(500, {"error": "OutOfMemoryError"})
+                else:
+                    self.reply(stub.txt2img_status, {"images": [PNG_B64]})
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        threading.Thread(
+            target=self.server.serve_forever, args=(0.05,), daemon=True
+        ).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def stubs(monkeypatch):
+    monkeypatch.setattr(requests, "post", REQUESTS_POST)
+    servers = []
+
+    def create(count):
+        servers.extend(StubWebUI() for _ in range(count))
+        return servers
+
+    yield create
+    for server in servers:
+        server.close()
+
+
+def closed_url():
+    """已关闭端口的地址（连接被拒绝）"""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), BaseHTTPRequestHandler)
+    url = f"http://127.0.0.1:{server.server_address[1]}"
+    server.server_close()
+    return url
+
+
+class TestQueueDepth:
+    """progress 响应解析的测试"""
+
+    def test_idle_and_busy(self):
+        """测试空闲为 0，忙碌时为剩余任务数且至少为 1"""
+        assert queue_depth({"progress": 0, "state": {"job": ""}}) == 0
+        state = {"job": "Batch 1", "job_count": 4, "job_no": 1}
+        assert queue_depth({"progress": 0.4, "state": state}) == 3
+        assert queue_depth({"progress": 0.9, "state": {"job_count": 0}}) == 1
+
+
+class TestSDLoadBalancer:
+    """端点分配、剔除和恢复的测试"""
+
+    def test_routes_to_least_loaded(self, stubs):
+        """测试请求分配给队列最短的端点"""
+        busy, idle = stubs(2)
+        busy.progress = {"progress": 0.5, "state": {"job": "x", "job_count": 3}}
+        balancer = SDLoadBalancer([busy.url, idle.url], concurrency=2, poll_interval=0)
+
+        balancer.poll()
+
+        assert balancer.acquire() == idle.url + "/"
+        # 本进程的在途请求也计入负载
+        assert balancer.acquire() == idle.url + "/"
+        # 空闲端点占满后才分配给忙碌的端点
+        assert balancer.acquire() == busy.url + "/"
+
+    def test_eject_and_readmit(self, stubs):
+        """测试状态检查失败的端点被剔除，冷却期后探测成功重新加入"""
+        flaky, stable = stubs(2)
+        flaky.progress_status = 500
+        balancer = SDLoadBalancer(
+            [flaky.url, stable.url],
+            poll_interval=0,
+            failure_threshold=1,
+            eject_seconds=0.1,
+        )
+
+        balancer.poll()
+        assert balancer.healthy_count() == 1
+        url = balancer.acquire()
+        assert url == stable.url + "/"
+        balancer.release(url)
+
+        flaky.progress_status = 200
+        balancer.poll()  # 冷却期内不探测
+        assert balancer.healthy_count() == 1
+        time.sleep(0.15)
+        balancer.poll()
+        assert balancer.healthy_count() == 2
+
+    def test_request_failures_eject(self, stubs):
+        """测试连续请求失败达到阈值后剔除，但最后一个健康端点不剔除"""
+        first, second = closed_url(), closed_url()
+        balancer = SDLoadBalancer(
+            [first, second], poll_interval=0, failure_threshold=2, eject_seconds=60
+        )
+        balancer.release(balancer.acquire(exclude=[second + "/"]), failed=True)
+        assert balancer.healthy_count() == 2
+        balancer.release(balancer.acquire(exclude=[second + "/"]), failed=True)
+        assert balancer.healthy_count() == 1
+
+        for _ in range(3):
+            balancer.release(balancer.acquire(), failed=True)
+        assert balancer.healthy_count() == 1
+        assert balancer.acquire() == second + "/"
+
+        with pytest.raises(NoHealthyEndpointError):
+            balancer.acquire(exclude=[second + "/"])
+
+    def test_confirm_failure_probes_endpoint(self, stubs):
+        """测试 5xx 只在状态检查也失败时计为端点故障，4xx 不计"""
+        (stub,) = stubs(1)
+        balancer = SDLoadBalancer([stub.url], poll_interval=0)
+        url = stub.url + "/"
+
+        def http_error(status):
+            response = requests.Response()
+            response.status_code = status
+            return requests.exceptions.HTTPError(response=response)
+
+        assert not balancer.confirm_failure(url, http_error(500))
+        assert not balancer.confirm_failure(url, http_error(404))
+        assert not balancer.confirm_failure(url, requests.exceptions.Timeout())
+        stub.progress_status = 500
+        assert not balancer.confirm_failure(url, http_error(404))
+        assert balancer.confirm_failure(url, http_error(500))
+
+    def test_single_endpoint_survives_failed_requests(self, stubs, temp_dir):
+        """测试单端点上个别请求返回 5xx 时端点不被剔除，其余图片照常生成"""
+        (stub,) = stubs(1)
+        stub.txt2img_failures = 2
+        balancer = SDLoadBalancer(
+            [stub.url], concurrency=1, poll_interval=0, eject_seconds=60
+        )
+        tasks = [
+            (i, {"prompt": f"p{i}"}, temp_dir / f"output_{i}.png")
+            for i in range(1, 11)
+        ]
+
+        assert generate_images(tasks, balancer, 1) == 8
+        assert stub.txt2img_calls == 10
+        assert balancer.healthy_count() == 1
+
+    def test_single_endpoint_not_ejected_when_down(self, stubs, temp_dir):
+        """测试唯一的端点确实故障时也不剔除，每张图片各自请求"""
+        (stub,) = stubs(1)
+        stub.txt2img_failures = 2
+        stub.progress_status = 500
+        balancer = SDLoadBalancer(
+            [stub.url], poll_interval=0, failure_threshold=1, eject_seconds=60
+        )
+        tasks = [
+            (i, {"prompt": f"p{i}"}, temp_dir / f"output_{i}.png") for i in range(1, 5)
+        ]
+
+        assert generate_images(tasks, balancer, 1) == 2
+        assert stub.txt2img_calls == 4
+        assert balancer.healthy_count() == 1
+
+    def test_background_polling(self, stubs):
+        """测试后台线程定期更新队列深度"""
+        (stub,) = stubs(1)
+        stub.progress = {"progress": 0.5, "state": {"job": "x", "job_count": 2}}
+        with SDLoadBalancer([stub.url], poll_interval=0.02) as balancer:
+            deadline = time.monotonic() + 2
+            while balancer.endpoints[0].queue_depth == 0:
+                assert time.monotonic() < deadline
+                time.sleep(0.01)
+        assert balancer.endpoints[0].queue_depth == 2
+        assert balancer.endpoints[0].latency > 0
+
+    def test_generate_around_failing_endpoint(self, stubs, temp_dir):
+        """测试返回 5xx 且状态检查失败的端点被剔除，图片改由其他端点生成"""
+        broken, healthy = stubs(2)
+        broken.txt2img_status = 500
+        broken.progress_status = 500
+        balancer = SDLoadBalancer(
+            [broken.url, healthy.url],
+            concurrency=1,
+            poll_interval=0,
+            failure_threshold=1,
+        )
+        tasks = [
+            (i, {"prompt": f"p{i}"}, temp_dir / f"output_{i}.png") for i in range(1, 5)
+        ]
+
+        assert generate_images(tasks, balancer, 2) == 4
+        assert all(path.exists() for _, _, path in tasks)
+        assert healthy.txt2img_calls == 4
+        assert broken.txt2img_calls == 1
+        assert balancer.healthy_count() == 1
+
+    def test_prompt_specific_error_not_retried(self, stubs, temp_dir):
+        """测试状态检查正常的端点返回 5xx 时不剔除，也不换端点重试"""
+        first, second = stubs(2)
+        first.txt2img_status = 500
+        second.progress = {"progress": 0.5, "state": {"job": "x", "job_count": 9}}
+        balancer = SDLoadBalancer(
+            [first.url, second.url], poll_interval=0, failure_threshold=1
+        )
+        balancer.poll()
+        tasks = [(1, {"prompt": "p"}, temp_dir / "output_1.png")]
+
+        assert generate_images(tasks, balancer, 1) == 0
+        assert (first.txt2img_calls, second.txt2img_calls) == (1, 0)
+        assert balancer.healthy_count() == 2
@@ -0,0 +1,120 @@
+"""静音裁剪的单元测试"""
+
+import io
+import wave
+
+import numpy as np
+import pytest
+
+from src.media.silence import trim_silence, trim_silence_timed
+
+RATE = 24000
+
+
+def make_wav(samples, channels=1, sampwidth=2):
+    """由采样数组生成 WAV 内容"""
+    dtype = {2: "<i2", 4: "<i4"}[sampwidth]
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as writer:
+        writer.setnchannels(channels)
+        writer.setsampwidth(sampwidth)
+        writer.setframerate(RATE)
+        writer.writeframes(np.asarray(samples, dtype=dtype).tobytes())
+    return buffer.getvalue()
+
+
+def tone(ms, amplitude=8000):
+    t = np.arange(RATE * ms // 1000) / RATE
+    return (np.sin(2 * np.pi * 220 * t) * amplitude).astype("<i2")
+
+
+def silence(ms):
+    return np.zeros(RATE * ms // 1000, dtype="<i2")
+
+
+def frame_count(data):
+    with wave.open(io.BytesIO(data), "rb") as reader:
+        return reader.getnframes()
+
+
+class TestTrimSilence:
+    """静音裁剪的测试"""
+
+    def test_matches_pydub_split_on_silence(self):
+        """测试与 pydub 的 split_on_silence 拼接结果一致"""
+        pydub = pytest.importorskip("pydub")
+        from pydub.silence import split_on_silence
+
+        samples = np.concatenate(
+            [
+                silence(300),
+                tone(200),
+                silence(50),
+                tone(120),
+                silence(600),
+                tone(80),
+                silence(150),
+            ]
+        )
+        data = make_wav(samples)
+
+        expected = sum(
+            split_on_silence(
+                pydub.AudioSegment.from_wav(io.BytesIO(data)),
+                min_silence_len=10,
+                silence_thresh=-50,
+            )
+        )
+        trimmed = trim_silence(data, min_silence_len=10, silence_thresh=-50)
+
+        with wave.open(io.BytesIO(trimmed), "rb") as reader:
+            frames = reader.readframes(reader.getnframes())
+        assert frames == expected.raw_data
+
+    def test_long_gaps_are_shortened(self):
+        """测试首尾和长间隔的静音缩短为保留时长，短间隔保持不变"""
+        samples = np.concatenate(
+            [silence(500), tone(200), silence(50), tone(200), silence(1000), tone(200)]
+        )
+
+        trimmed = trim_silence(make_wav(samples))
+
+        # 首部保留 100ms，长间隔保留 200ms，短间隔完整保留，尾部无静音
+        expected_ms = 100 + 200 + 50 + 200 + 200 + 200
+        assert frame_count(trimmed) == pytest.approx(
+            expected_ms * RATE / 1000, abs=RATE // 100
+        )
+
+    def test_stereo_and_32_bit(self):
+        """测试多声道和 32 位采样"""
+        mono = np.concatenate([silence(500), tone(200)]).astype("<i4") << 16
+        stereo = np.repeat(mono, 2)
+
+        trimmed = trim_silence(make_wav(stereo, channels=2, sampwidth=4))
+
+        with wave.open(io.BytesIO(trimmed), "rb") as reader:
+            assert reader.getnchannels() == 2
+            assert reader.getsampwidth() == 4
+            assert reader.getnframes() == (100 + 200) * RATE // 1000
+
+    def test_without_silence_returns_original(self):
+        """测试没有可裁剪的静音时返回原始内容"""
+        data = make_wav(tone(300))
+
+        assert trim_silence(data) is data
+
+    def test_all_silent_returns_none(self):
+        """测试整段静音时返回 None"""
+        assert trim_silence(make_wav(silence(300))) is None
+
+    def test_times_follow_trimmed_audio(self):
+        """测试时间点随裁剪换算，与裁剪后的音频对齐"""
+        samples = np.concatenate([silence(500), tone(200), silence(800), tone(300)])
+        data = make_wav(samples)
+
+        trimmed, times = trim_silence_timed(data, [0.5, 0.7, 1.5, 1.8])
+
+        assert trimmed == trim_silence(data)
+        # 开头 500ms 静音保留 100ms，中间 800ms 静音两侧各保留 100ms
+        assert times == pytest.approx([0.1, 0.3, 0.5, 0.8], abs=1e-3)
+        assert frame_count(trimmed) / RATE == pytest.approx(0.8, abs=1e-3)
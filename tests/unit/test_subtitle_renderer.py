@@ -0,0 +1,72 @@
+"""字幕位图渲染的单元测试"""
+
+from src.media.subtitle_renderer import (
+    SubtitleStyle,
+    dynamic_font_size,
+    load_font,
+    render_subtitle,
+    wrap_text,
+)
+
+
+class TestSubtitleRenderer:
+    """字幕渲染的测试"""
+
+    def test_render_returns_read_only_bitmap(self):
+        """测试渲染结果为只读的 RGB 和 alpha"""
+        bitmap = render_subtitle("Hello 世界", SubtitleStyle(font=None, font_size=24))
+
+        width, height = bitmap.size
+        assert bitmap.rgb.shape == (height, width, 3)
+        assert bitmap.alpha.shape == (height, width)
+        assert bitmap.alpha.max() == 255
+        assert not bitmap.rgb.flags.writeable
+        assert not bitmap.alpha.flags.writeable
+
+    def test_bitmap_cached_by_text_and_style(self):
+        """测试相同文本和样式只渲染一次"""
+        style = SubtitleStyle(font=None, font_size=20, color="#FFFF00")
+
+        first = render_subtitle("缓存测试", style)
+        second = render_subtitle(
+            "缓存测试", SubtitleStyle(font=None, font_size=20, color="#FFFF00")
+        )
+        other = render_subtitle(
+            "缓存测试", SubtitleStyle(font=None, font_size=22, color="#FFFF00")
+        )
+
+        assert first is second
+        assert other is not first
+
+    def test_font_loaded_once(self):
+        """测试字体按名称和字号缓存，找不到时使用默认字体"""
+        first = load_font("missing-font.ttf", 18)
+
+        assert load_font("missing-font.ttf", 18) is first
+
+    def test_wrap_to_max_width(self):
+        """测试按宽度换行，中文逐字断行，英文按单词断行"""
+        font = load_font(None, 20)
+        text = "这是一段需要自动换行的很长的中文字幕 and some English words"
+        max_width = int(font.getlength("这是一段需要自动"))
+
+        lines = wrap_text(text, font, max_width)
+
+        assert len(lines) > 1
+        assert "".join(lines).replace(" ", "") == text.replace(" ", "")
+        assert all(font.getlength(line) <= max_width for line in lines)
+        assert not any(line.endswith("Engl") for line in lines)
+
+    def test_canvas_width_matches_max_width(self):
+        """测试画布宽度与换行宽度一致，便于居中定位"""
+        style = SubtitleStyle(font=None, font_size=20, max_width=300)
+
+        bitmap = render_subtitle("短字幕", style)
+
+        assert bitmap.size[0] == 300
+
+    def test_dynamic_font_size(self):
+        """测试长字幕缩小字号"""
+        assert dynamic_font_size("短", 60) == 60
+        assert dynamic_font_size("字" * 45, 60) == 52
+        assert dynamic_font_size("字" * 100, 30) == 24
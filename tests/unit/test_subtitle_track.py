@@ -0,0 +1,145 @@
+"""字幕轨道输出的单元测试"""
+
+import subprocess
+import wave
+
+import numpy as np
+import pytest
+from moviepy.config import FFMPEG_BINARY
+
+from src.media.audio_info import audio_duration
+from src.media.ffmpeg_encoder import encode_clip
+from src.media.subtitle_track import (
+    AssStyle,
+    build_cues,
+    format_ass,
+    format_srt,
+    mux_soft_subtitles,
+    split_timed_subtitle,
+    write_srt,
+)
+
+
+class TestSubtitleCues:
+    """字幕时间轴和格式的测试"""
+
+    def test_cues_follow_scene_durations(self):
+        """测试按片段时长累加，空字幕不输出但占用时间"""
+        cues = build_cues(["第一段", "", " 第三段 "], [1.5, 2.0, 0.75])
+
+        assert [(c.start, c.end, c.text) for c in cues] == [
+            (0.0, 1.5, "第一段"),
+            (3.5, 4.25, "第三段"),
+        ]
+
+    def test_timed_chunks(self):
+        """测试按字词时间切分为短句，优先在标点处切分"""
+        text = "夜色渐深，小镇的灯火一盏盏熄灭。老李还在等。"
+        words = [{"text": ch, "start": i * 0.2} for i, ch in enumerate(text)]
+
+        cues = split_timed_subtitle(text, words, 5.0, 12)
+
+        assert [(c.start, c.end, c.text) for c in cues] == [
+            (0.0, 1.0, "夜色渐深，"),
+            (1.0, pytest.approx(3.2), "小镇的灯火一盏盏熄灭。"),
+            (pytest.approx(3.2), 5.0, "老李还在等。"),
+        ]
+
+    def test_timed_chunks_fallback(self):
+        """测试短字幕或字词无法对齐时整段为一条"""
+        words = [{"text": "别的", "start": 0.1}, {"text": "内容", "start": 0.5}]
+        text = "这是一段较长的字幕，但是字词时间与文本不一致"
+
+        assert [c.text for c in split_timed_subtitle(text, words, 2.0, 8)] == [text]
+        assert len(split_timed_subtitle("短字幕", words, 2.0, 8)) == 1
+
+    def test_build_cues_with_timings(self):
+        """测试有字词时间的片段切分后按片段起点偏移"""
+        words = [{"text": "Hello", "start": 0.0}, {"text": "world", "start": 0.4}]
+
+        cues = build_cues(["开场", "Hello. world"], [1.0, 2.0], [None, words], 8)
+
+        assert [(c.start, c.end, c.text) for c in cues] == [
+            (0.0, 1.0, "开场"),
+            (1.0, 1.4, "Hello."),
+            (1.4, 3.0, "world"),
+        ]
+
+    def test_format_srt(self):
+        """测试 SRT 时间格式"""
+        cues = build_cues(["甲", "乙"], [61.5, 3600.0])
+
+        srt = format_srt(cues)
+
+        assert "1\n00:00:00,000 --> 00:01:01,500\n甲\n" in srt
+        assert "2\n00:01:01,500 --> 01:01:01,500\n乙\n" in srt
+
+    def test_format_ass_style(self):
+        """测试 ASS 样式：颜色为 BGR、顶部定位与烧录字幕一致"""
+        cues = build_cues(["字幕\n第二行"], [2.345])
+        style = AssStyle(
+            font_name="Test Sans",
+            font_size=40,
+            color="#FF8000",
+            stroke_color="black",
+            pixel_from_bottom=100,
+        )
+
+        ass = format_ass(cues, style, (1280, 720))
+
+        assert "PlayResX: 1280" in ass
+        assert "Style: Default,Test Sans,40,&H000080FF," in ass
+        # 顶部居中对齐，顶部距画面顶端 720 - 100 像素
+        assert ",2,0,8,128,128,620,1" in ass
+        assert "Dialogue: 0,0:00:00.00,0:00:02.35,Default,,0,0,0,,字幕\\N第二行" in ass
+
+
+class TestSubtitleOutput:
+    """字幕封装的测试"""
+
+    def test_mux_soft_subtitles(self, temp_dir):
+        """测试以 mov_text 软字幕轨道封装，且不重新编码视频"""
+        video = temp_dir / "video.mp4"
+        encode_clip(
+            _StubClip((64, 48), 20),
+            video,
+            10,
+            preset="ultrafast",
+            ffmpeg_params=["-pix_fmt", "yuv420p"],
+        )
+        srt = write_srt(build_cues(["字幕"], [2.0]), temp_dir / "video.srt")
+        output = temp_dir / "subtitled.mp4"
+
+        mux_soft_subtitles(video, srt, output)
+
+        info = subprocess.run(
+            [FFMPEG_BINARY, "-hide_banner", "-i", str(output)],
+            capture_output=True,
+            text=True,
+        ).stderr
+        assert "Subtitle: mov_text" in info
+        assert "Video: h264" in info
+
+    def test_wav_duration_from_header(self, temp_dir):
+        """测试 WAV 时长从文件头读取"""
+        path = temp_dir / "voice.wav"
+        with wave.open(str(path), "wb") as f:
+            f.setnchannels(1)
+            f.setsampwidth(2)
+            f.setframerate(16000)
+            f.writeframes(np.zeros(24000, dtype=np.int16).tobytes())
+
+        assert audio_duration(path) == pytest.approx(1.5)
+
+
+class _StubClip:
+    """最小化的片段对象，只提供编码所需的接口"""
+
+    def __init__(self, size, n_frames):
+        self.size = size
+        self.n_frames = n_frames
+
+    def iter_frames(self, fps, dtype):
+        width, height = self.size
+        for i in range(self.n_frames):
+            yield np.full((height, width, 3), i * 10 % 255, dtype=dtype)
@@ -0,0 +1,104 @@
+"""语音合成器池的单元测试"""
+
+import threading
+import time
+from unittest.mock import Mock
+
+import pytest
+
+from src.services.tts.pool import SynthesizerPool
+
+
+class TestSynthesizerPool:
+    """合成器池的测试"""
+
+    def test_reuses_synthesizer(self):
+        """测试归还的合成器被后续请求复用"""
+        factory = Mock(side_effect=lambda: object())
+        pool = SynthesizerPool(factory, size=2)
+
+        with pool.borrow() as first:
+            pass
+        with pool.borrow() as second:
+            pass
+
+        assert first is second
+        assert factory.call_count == 1
+        assert pool.borrowed == 2
+
+    def test_size_bounds_concurrent_borrowers(self):
+        """测试同时借出的合成器数量不超过池大小"""
+        pool = SynthesizerPool(object, size=3)
+        active = 0
+        peak = 0
+        lock = threading.Lock()
+
+        def worker():
+            nonlocal active, peak
+            with pool.borrow():
+                with lock:
+                    active += 1
+                    peak = max(peak, active)
+                time.sleep(0.01)
+                with lock:
+                    active -= 1
+
+        threads = [threading.Thread(target=worker) for _ in range(10)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert peak == 3
+        assert pool.created == 3
+        assert pool.borrowed == 10
+
+    def test_failed_synthesizer_is_discarded(self):
+        """测试请求异常时丢弃合成器并关闭连接，之后重新创建"""
+        connection = Mock()
+        pool = SynthesizerPool(object, size=1, connect=lambda s: connection)
+
+        with pytest.raises(RuntimeError):
+            with pool.borrow() as broken:
+                raise RuntimeError("connection reset")
+        with pool.borrow() as replacement:
+            pass
+
+        assert replacement is not broken
+        assert pool.created == 2
+        connection.close.assert_called_once()
+
+    def test_connect_failure_is_tolerated(self):
+        """测试预连接失败时合成器仍可使用"""
+
+        def connect(synthesizer):
+            raise OSError("handshake failed")
+
+        pool = SynthesizerPool(object, size=1, connect=connect)
+
+        with pool.borrow() as synthesizer:
+            assert synthesizer is not None
+
+    def test_warm_up_fills_pool(self):
+        """测试预热创建并连接所有合成器，之后借用无需再创建"""
+        connect = Mock()
+        factory = Mock(side_effect=lambda: object())
+        pool = SynthesizerPool(factory, size=4, connect=connect)
+
+        assert pool.warm_up() == 4
+        assert pool.warm_up() == 0
+        with pool.borrow():
+            pass
+
+        assert factory.call_count == 4
+        assert connect.call_count == 4
+
+    def test_factory_failure_frees_slot(self):
+        """测试创建失败不占用池容量"""
+        factory = Mock(side_effect=[RuntimeError("sdk error"), "synthesizer"])
+        pool = SynthesizerPool(factory, size=1)
+
+        with pytest.raises(RuntimeError):
+            pool.acquire()
+
+        assert pool.acquire() == "synthesizer"
@@ -0,0 +1,128 @@
+"""批量合成分组与切分的单元测试"""
+
+import io
+import wave
+
+import pytest
+
+from src.services.tts.batching import TICKS_PER_SECOND, plan_batches, split_wav
+from src.services.tts.timing import boundary_record, split_boundaries
+
+
+def make_wav(samples, framerate=24000):
+    """由 16 位单声道采样值生成 WAV 内容"""
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as writer:
+        writer.setnchannels(1)
+        writer.setsampwidth(2)
+        writer.setframerate(framerate)
+        writer.writeframes(
+            b"".join(v.to_bytes(2, "little", signed=True) for v in samples)
+        )
+    return buffer.getvalue()
+
+
+def read_samples(data):
+    """读取 WAV 的采样值和采样率"""
+    with wave.open(io.BytesIO(data), "rb") as reader:
+        frames = reader.readframes(reader.getnframes())
+        framerate = reader.getframerate()
+    samples = [
+        int.from_bytes(frames[i : i + 2], "little", signed=True)
+        for i in range(0, len(frames), 2)
+    ]
+    return samples, framerate
+
+
+class TestPlanBatches:
+    """分组的测试"""
+
+    def test_groups_consecutive_lines(self):
+        """测试按顺序分组，最后一批可以不满"""
+        texts = [(i, f"文本{i}") for i in range(1, 8)]
+
+        batches = plan_batches(texts, 3)
+
+        assert [[index for index, _ in batch] for batch in batches] == [
+            [1, 2, 3],
+            [4, 5, 6],
+            [7],
+        ]
+
+    def test_batch_size_one(self):
+        """测试批大小不大于1时每行单独一批"""
+        texts = [(1, "a"), (2, "b")]
+
+        assert plan_batches(texts, 1) == [[(1, "a")], [(2, "b")]]
+        assert plan_batches(texts, 0) == [[(1, "a")], [(2, "b")]]
+
+
+class TestSplitWav:
+    """按书签偏移切分音频的测试"""
+
+    def test_splits_at_offsets(self):
+        """测试按偏移切分，每段保持采样格式，首个书签之前的音频并入第一段"""
+        framerate = 1000
+        samples = [1] * 10 + [2] * 200 + [3] * 300 + [4] * 100
+        tick = TICKS_PER_SECOND // framerate
+        offsets = [10 * tick, 210 * tick, 510 * tick]
+
+        segments = split_wav(make_wav(samples, framerate), offsets)
+
+        decoded = [read_samples(segment) for segment in segments]
+        assert [rate for _, rate in decoded] == [framerate] * 3
+        assert decoded[0][0] == [1] * 10 + [2] * 200
+        assert decoded[1][0] == [3] * 300
+        assert decoded[2][0] == [4] * 100
+
+    def test_rejects_invalid_offsets(self):
+        """测试偏移非升序或超出音频长度时报错"""
+        data = make_wav([0] * 100, framerate=1000)
+        tick = TICKS_PER_SECOND // 1000
+
+        with pytest.raises(ValueError):
+            split_wav(data, [0, 50 * tick, 20 * tick])
+        with pytest.raises(ValueError):
+            split_wav(data, [0, 200 * tick])
+
+
+class TestWordTiming:
+    """字词时间记录与切分的测试"""
+
+    def test_boundary_record(self):
+        """测试将 SDK 事件转换为以秒为单位的记录"""
+        from datetime import timedelta
+        from unittest.mock import Mock
+
+        evt = Mock(
+            text="你好",
+            audio_offset=TICKS_PER_SECOND // 2,
+            duration=timedelta(milliseconds=250),
+            boundary_type="SpeechSynthesisBoundaryType.Punctuation",
+        )
+
+        assert boundary_record(evt) == {
+            "text": "你好",
+            "start": 0.5,
+            "end": 0.75,
+            "type": "punctuation",
+        }
+
+    def test_split_follows_split_wav(self):
+        """测试字词按切分点分配到各段，时间相对段起点"""
+        words = [
+            {"text": text, "start": start, "end": start + 0.1}
+            for text, start in (("甲", 0.05), ("乙", 1.2), ("丙", 1.6), ("丁", 2.5))
+        ]
+        # 第一段从音频起点开始（书签之前的音频并入第一段）
+        offsets = [TICKS_PER_SECOND // 10, TICKS_PER_SECOND, 2 * TICKS_PER_SECOND]
+
+        segments = split_boundaries(words, offsets)
+
+        assert [[w["text"] for w in segment] for segment in segments] == [
+            ["甲"],
+            ["乙", "丙"],
+            ["丁"],
+        ]
+        assert segments[1][0]["start"] == pytest.approx(0.2)
+        assert segments[2][0]["end"] == pytest.approx(0.6)
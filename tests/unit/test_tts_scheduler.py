@@ -0,0 +1,225 @@
+"""TTS 请求调度器的单元测试"""
+
+import asyncio
+import random
+
+import pytest
+
+from src.services.tts import scheduler as scheduler_module
+from src.services.tts.scheduler import (
+    NonRetryableError,
+    RetryableError,
+    ThrottledError,
+    TokenBucket,
+    TTSScheduler,
+)
+
+
+class FakeClock:
+    """可控时钟：asyncio.sleep 只推进时间，不真正等待"""
+
+    def __init__(self):
+        self.now = 0.0
+        self._sleep = asyncio.sleep
+
+    def __call__(self):
+        return self.now
+
+    async def sleep(self, seconds):
+        self.now += seconds
+        await self._sleep(0)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(scheduler_module.asyncio, "sleep", fake.sleep)
+    return fake
+
+
+class TestTokenBucket:
+    """令牌桶的测试"""
+
+    def test_rate_is_enforced(self, clock):
+        """测试突发后按速率发放令牌"""
+
+        async def run():
+            bucket = TokenBucket(rate=2.0, burst=2, clock=clock)
+            times = []
+            for _ in range(6):
+                await bucket.acquire()
+                times.append(clock.now)
+            return times
+
+        times = asyncio.run(run())
+
+        assert times[:2] == [0.0, 0.0]
+        assert times[-1] == pytest.approx(2.0)
+
+    def test_unlimited_rate(self, clock):
+        """测试速率为0时不等待"""
+
+        async def run():
+            bucket = TokenBucket(rate=0, clock=clock)
+            for _ in range(100):
+                await bucket.acquire()
+
+        asyncio.run(run())
+        assert clock.now == 0.0
+
+    def test_block_for_delays_all_requests(self, clock):
+        """测试服务端要求等待时暂停发放令牌"""
+
+        async def run():
+            bucket = TokenBucket(rate=0, clock=clock)
+            bucket.block_for(5)
+            await bucket.acquire()
+
+        asyncio.run(run())
+        assert clock.now == pytest.approx(5.0)
+
+
+class TestTTSScheduler:
+    """调度器的测试"""
+
+    def test_concurrency_is_bounded(self):
+        """测试同时进行的请求数不超过上限"""
+        active = 0
+        peak = 0
+
+        async def request():
+            nonlocal active, peak
+            active += 1
+            peak = max(peak, active)
+            await asyncio.sleep(0.001)
+            active -= 1
+            return True
+
+        async def run():
+            scheduler = TTSScheduler(max_concurrency=3)
+            return await asyncio.gather(*(scheduler.submit(request) for _ in range(12)))
+
+        assert all(asyncio.run(run()))
+        assert peak == 3
+
+    def test_retries_until_success(self, clock):
+        """测试可重试错误按退避重试直到成功"""
+        calls = []
+
+        async def request():
+            calls.append(clock.now)
+            if len(calls) < 3:
+                raise RuntimeError("temporary")
+            return "ok"
+
+        async def run():
+            scheduler = TTSScheduler(max_attempts=3, rng=random.Random(0), clock=clock)
+            return await scheduler.submit(request)
+
+        assert asyncio.run(run()) == "ok"
+        assert len(calls) == 3
+        assert calls[2] > calls[0]
+
+    def test_gives_up_after_max_attempts(self, clock):
+        """测试达到最大尝试次数后抛出最后一次的异常"""
+        calls = 0
+
+        async def request():
+            nonlocal calls
+            calls += 1
+            raise RetryableError(f"failure {calls}")
+
+        async def run():
+            return await TTSScheduler(max_attempts=4, clock=clock).submit(request)
+
+        with pytest.raises(RetryableError, match="failure 4"):
+            asyncio.run(run())
+        assert calls == 4
+
+    def test_non_retryable_error_is_not_retried(self, clock):
+        """测试不可重试错误立即抛出"""
+        calls = 0
+
+        async def request():
+            nonlocal calls
+            calls += 1
+            raise NonRetryableError("bad request")
+
+        async def run():
+            return await TTSScheduler(max_attempts=5, clock=clock).submit(request)
+
+        with pytest.raises(NonRetryableError):
+            asyncio.run(run())
+        assert calls == 1
+
+    def test_backoff_is_bounded_and_honors_retry_after(self):
+        """测试退避时间在指数上限内，且不短于服务端建议的等待时间"""
+        scheduler = TTSScheduler(backoff_base=1.0, backoff_max=8.0, rng=random.Random(1))
+
+        for attempt in range(10):
+            assert 0 <= scheduler.backoff_delay(attempt) <= min(8.0, 2**attempt)
+        assert scheduler.backoff_delay(0, retry_after=5.0) >= 5.0
+
+    def test_throttling_halves_concurrency_then_recovers(self, clock):
+        """测试限流时并发上限减半，连续成功后逐步恢复"""
+        throttle = {"remaining": 1}
+
+        async def request():
+            if throttle["remaining"]:
+                throttle["remaining"] -= 1
+                raise ThrottledError("429", retry_after=2.0)
+            return True
+
+        async def run():
+            scheduler = TTSScheduler(max_concurrency=8, backoff_base=0, clock=clock)
+            await scheduler.submit(request)
+            after_throttle = scheduler.limit
+            for _ in range(40):
+                await scheduler.submit(request)
+            return scheduler, after_throttle
+
+        scheduler, after_throttle = asyncio.run(run())
+
+        assert after_throttle == 4
+        assert scheduler.throttled == 1
+        assert scheduler.limit == 8
+        # 服务端建议的等待时间对所有请求生效
+        assert clock.now >= 2.0
+
+    def test_concurrent_throttles_decrease_once(self, clock):
+        """测试同一批并发请求同时被限流时只减半一次"""
+
+        async def request():
+            await asyncio.sleep(0)
+            raise ThrottledError("429")
+
+        async def run():
+            scheduler = TTSScheduler(max_concurrency=8, max_attempts=1, clock=clock)
+            await asyncio.gather(
+                *(scheduler.submit(request) for _ in range(8)), return_exceptions=True
+            )
+            return scheduler
+
+        scheduler = asyncio.run(run())
+        assert scheduler.throttled == 8
+        assert scheduler.limit == 4
+
+    def test_failure_does_not_cancel_other_requests(self):
+        """测试单个请求失败不影响其他请求"""
+
+        async def request(i):
+            await asyncio.sleep(0.001)
+            if i == 0:
+                raise NonRetryableError("boom")
+            return i
+
+        async def run():
+            scheduler = TTSScheduler(max_concurrency=2)
+            return await asyncio.gather(
+                *(scheduler.submit(lambda i=i: request(i)) for i in range(5)),
+                return_exceptions=True,
+            )
+
+        results = asyncio.run(run())
+        assert isinstance(results[0], NonRetryableError)
+        assert results[1:] == [1, 2, 3, 4]
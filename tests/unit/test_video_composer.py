@@ -260,4 +260,203 @@ class TestVideoComposer:
         
         # main函数没有异常处理，所以会抛出异常
         with pytest.raises(Exception, match="Test error"):
-            main()
\ No newline at end of file
+            main()
+
+class TestSceneRendering:
+    """片段并发渲染与重试的测试"""
+
+    @patch('src.pipeline.video_composer.render_mode', 'thread')
+    @patch('src.pipeline.video_composer.get_total_files', return_value=2)
+    @patch('src.pipeline.video_composer.load_subtitle_data', return_value=['', ''])
+    @patch('src.pipeline.video_composer.can_stream_copy', return_value=False)
+    @patch('src.pipeline.video_composer.concat_with_reencode', return_value=True)
+    @patch('src.pipeline.video_composer.create_clip')
+    @patch('os.path.exists', return_value=True)
+    @patch('os.path.getsize', return_value=1000)
+    @patch('os.remove')
+    @patch('time.sleep')
+    def test_main_retries_failed_scene(self, mock_sleep, mock_remove, mock_getsize, mock_exists,
+                                       mock_create_clip, mock_concat, mock_can_copy,
+                                       mock_load_subtitle, mock_get_total):
+        """测试失败的片段在片段级别重试，成功的片段不重复渲染"""
+        attempts = {}
+
+        def fake_create_clip(i, subtitles):
+            attempts[i] = attempts.get(i, 0) + 1
+            if i == 1 and attempts[i] == 1:
+                return None
+            return f'/test/temp/output_{i+1}.mp4'
+
+        mock_create_clip.side_effect = fake_create_clip
+
+        result = main()
+
+        assert result is True
+        assert attempts == {0: 1, 1: 2}
+        filenames = mock_concat.call_args[0][0]
+        assert filenames == ['/test/temp/output_1.mp4', '/test/temp/output_2.mp4']
+
+    @patch('src.pipeline.video_composer.render_mode', 'thread')
+    @patch('src.pipeline.video_composer.scene_retries', 2)
+    @patch('src.pipeline.video_composer.get_total_files', return_value=1)
+    @patch('src.pipeline.video_composer.load_subtitle_data', return_value=[''])
+    @patch('src.pipeline.video_composer.create_clip', return_value=None)
+    @patch('time.sleep')
+    def test_main_gives_up_after_retries(self, mock_sleep, mock_create_clip,
+                                         mock_load_subtitle, mock_get_total):
+        """测试超过重试次数后放弃"""
+        assert main() is False
+        assert mock_create_clip.call_count == 3
+
+    def test_process_pool_renders_scenes(self, temp_dir):
+        """测试进程池渲染：工作进程使用父进程下发的目录配置写入各自的临时文件"""
+        import wave
+
+        import numpy as np
+        from PIL import Image
+
+        from src.pipeline import video_composer
+
+        for i in range(1, 3):
+            Image.fromarray(np.full((36, 64, 3), i * 60, dtype=np.uint8)).save(
+                temp_dir / f'output_{i}.png'
+            )
+            with wave.open(str(temp_dir / f'output_{i}.wav'), 'wb') as f:
+                f.setnchannels(1)
+                f.setsampwidth(2)
+                f.setframerate(16000)
+                f.writeframes(np.zeros(8000, dtype=np.int16).tobytes())
+
+        with patch.multiple(
+            video_composer,
+            image_dir=temp_dir,
+            voice_dir=temp_dir,
+            temp_dir=temp_dir / 'clips',
+            fps=10,
+            load_subtitles=False,
+            enable_effect=False,
+            encoder_backend='ffmpeg',
+            encoder_preset='ultrafast',
+            clip_cache=None,
+        ):
+            (temp_dir / 'clips').mkdir()
+            results = video_composer.render_scenes([0, 1], ['', ''], 2, True)
+
+        assert results == {
+            0: str(temp_dir / 'clips' / 'output_1.mp4'),
+            1: str(temp_dir / 'clips' / 'output_2.mp4'),
+        }
+        for path in results.values():
+            assert Path(path).stat().st_size > 0
+
+
+class TestClipCache:
+    """片段缓存的测试"""
+
+    def _write_scene(self, directory, value=80):
+        """写入一个片段所需的图片和音频"""
+        import wave
+
+        import numpy as np
+        from PIL import Image
+
+        Image.fromarray(np.full((36, 64, 3), value, dtype=np.uint8)).save(
+            directory / 'output_1.png'
+        )
+        with wave.open(str(directory / 'output_1.wav'), 'wb') as f:
+            f.setnchannels(1)
+            f.setsampwidth(2)
+            f.setframerate(16000)
+            f.writeframes(np.zeros(8000, dtype=np.int16).tobytes())
+
+    def test_unchanged_scene_reused(self, temp_dir):
+        """测试输入未变化时复用缓存，不再重新编码"""
+        from src.content_cache import ContentCache
+        from src.pipeline import video_composer
+
+        self._write_scene(temp_dir)
+        (temp_dir / 'clips').mkdir()
+        with patch.multiple(
+            video_composer,
+            image_dir=temp_dir,
+            voice_dir=temp_dir,
+            temp_dir=temp_dir / 'clips',
+            fps=10,
+            load_subtitles=False,
+            enable_effect=False,
+            encoder_backend='ffmpeg',
+            encoder_preset='ultrafast',
+            clip_cache=ContentCache(temp_dir / 'cache', suffix='.mp4'),
+        ):
+            first = create_clip(0, [''])
+            first_bytes = Path(first).read_bytes()
+            os.remove(first)
+
+            with patch('src.pipeline.video_composer.encode_clip') as mock_encode:
+                second = create_clip(0, [''])
+                mock_encode.assert_not_called()
+
+        assert second == first
+        assert Path(second).read_bytes() == first_bytes
+
+    def test_render_is_reproducible(self, temp_dir):
+        """测试不使用缓存时重复渲染得到逐字节相同的片段"""
+        from src.pipeline import video_composer
+
+        self._write_scene(temp_dir)
+        (temp_dir / 'clips').mkdir()
+        outputs = []
+        with patch.multiple(
+            video_composer,
+            image_dir=temp_dir,
+            voice_dir=temp_dir,
+            temp_dir=temp_dir / 'clips',
+            fps=10,
+            load_subtitles=False,
+            enable_effect=False,
+            encoder_backend='ffmpeg',
+            encoder_preset='ultrafast',
+            clip_cache=None,
+        ):
+            for _ in range(2):
+                outputs.append(Path(create_clip(0, [''])).read_bytes())
+
+        assert outputs[0] == outputs[1]
+
+    def test_cache_key_tracks_inputs(self, temp_dir):
+        """测试图片内容、字幕和渲染参数变化都会改变缓存键"""
+        from src.pipeline import video_composer
+        from src.pipeline.video_composer import clip_cache_key
+
+        self._write_scene(temp_dir)
+        image = temp_dir / 'output_1.png'
+        audio = temp_dir / 'output_1.wav'
+
+        with patch.object(video_composer, 'load_subtitles', True):
+            base = clip_cache_key(0, image, audio, '字幕')
+            assert clip_cache_key(0, image, audio, '字幕') == base
+            assert clip_cache_key(0, image, audio, '新字幕') != base
+            assert clip_cache_key(0, image, None, '字幕') != base
+            assert clip_cache_key(1, image, audio, '字幕') != base
+            with patch.object(video_composer, 'motion_seed', 'other'):
+                assert clip_cache_key(0, image, audio, '字幕') != base
+            with patch.object(video_composer, 'encoder_preset', 'veryslow'):
+                assert clip_cache_key(0, image, audio, '字幕') != base
+
+        self._write_scene(temp_dir, value=81)
+        with patch.object(video_composer, 'load_subtitles', True):
+            assert clip_cache_key(0, image, audio, '字幕') != base
+
+    def test_subtitle_track_mode_keeps_clips_unchanged(self, temp_dir):
+        """测试字幕轨道模式下字幕不进入片段，修改字幕无需重新渲染"""
+        from src.pipeline import video_composer
+        from src.pipeline.video_composer import clip_cache_key
+
+        self._write_scene(temp_dir)
+        image = temp_dir / 'output_1.png'
+        audio = temp_dir / 'output_1.wav'
+
+        with patch.multiple(video_composer, load_subtitles=True, subtitle_mode='soft'):
+            assert clip_cache_key(0, image, audio, '旧字幕') == clip_cache_key(
+                0, image, audio, '新字幕'
+            )
@@ -329,4 +329,452 @@ class TestVoiceSynthesizer:
                     for i, result in enumerate(results):
                         assert result['index'] == i
                         assert result['error'] is None
-                        assert result['audio_data'] is not None
\ No newline at end of file
+                        assert result['audio_data'] is not None
+
+
+class TestSchedulerIntegration:
+    """语音合成与请求调度器配合的测试"""
+
+    @staticmethod
+    def _canceled(error_code):
+        result = Mock()
+        result.reason = speechsdk.ResultReason.Canceled
+        details = Mock()
+        details.reason = speechsdk.CancellationReason.Error
+        details.error_code = error_code
+        details.error_details = str(error_code)
+        return result, details
+
+    @pytest.mark.asyncio
+    async def test_throttled_request_is_retried(self, mock_config):
+        """测试被限流的请求降低并发后重试成功"""
+        from src.services.tts.scheduler import TTSScheduler
+
+        throttled, details = self._canceled(speechsdk.CancellationErrorCode.TooManyRequests)
+        completed = Mock()
+        completed.reason = speechsdk.ResultReason.SynthesizingAudioCompleted
+        completed.audio_data = b"audio"
+
+        with patch('src.pipeline.voice_synthesizer.config', mock_config), \
+                patch('src.pipeline.voice_synthesizer.SpeechConfig'), \
+                patch('src.pipeline.voice_synthesizer.SpeechSynthesizer') as mock_synthesizer_class, \
+                patch('src.pipeline.voice_synthesizer.speechsdk.SpeechSynthesisCancellationDetails',
+                      return_value=details):
+            mock_synthesizer_class.return_value.speak_ssml_async.return_value.get.side_effect = [
+                throttled, completed
+            ]
+            scheduler = TTSScheduler(max_concurrency=4, backoff_base=0)
+            provider = SpeechProvider(scheduler)
+
+            result = await provider.get_tts_audio("测试文本", "zh-CN", 1)
+
+        assert result['error'] is None
+        assert result['audio_data'].getvalue() == b"audio"
+        assert scheduler.throttled == 1
+        assert scheduler.limit == 2
+
+    @pytest.mark.asyncio
+    async def test_authentication_failure_is_not_retried(self, mock_config):
+        """测试认证失败不重试，直接返回错误"""
+        from src.services.tts.scheduler import TTSScheduler
+
+        canceled, details = self._canceled(speechsdk.CancellationErrorCode.AuthenticationFailure)
+
+        with patch('src.pipeline.voice_synthesizer.config', mock_config), \
+                patch('src.pipeline.voice_synthesizer.SpeechConfig'), \
+                patch('src.pipeline.voice_synthesizer.SpeechSynthesizer') as mock_synthesizer_class, \
+                patch('src.pipeline.voice_synthesizer.speechsdk.SpeechSynthesisCancellationDetails',
+                      return_value=details):
+            speak = mock_synthesizer_class.return_value.speak_ssml_async
+            speak.return_value.get.return_value = canceled
+            provider = SpeechProvider(TTSScheduler(max_attempts=5, backoff_base=0))
+
+            result = await provider.get_tts_audio("测试文本", "zh-CN", 1)
+
+        assert result['audio_data'] is None
+        assert "AuthenticationFailure" in result['error']
+        assert speak.call_count == 1
+
+    @pytest.mark.asyncio
+    async def test_synthesizer_is_reused_across_requests(self, mock_config):
+        """测试多个请求复用同一个合成器，不重复初始化 SDK"""
+        completed = Mock()
+        completed.reason = speechsdk.ResultReason.SynthesizingAudioCompleted
+        completed.audio_data = b"audio"
+
+        with patch('src.pipeline.voice_synthesizer.config', mock_config), \
+                patch('src.pipeline.voice_synthesizer.SpeechConfig') as mock_speech_config, \
+                patch('src.pipeline.voice_synthesizer.SpeechSynthesizer') as mock_synthesizer_class:
+            mock_synthesizer_class.return_value.speak_ssml_async.return_value.get.return_value = (
+                completed
+            )
+            provider = SpeechProvider()
+
+            for index in range(5):
+                result = await provider.get_tts_audio(f"文本{index}", "zh-CN", index)
+                assert result['error'] is None
+
+        assert mock_speech_config.call_count == 1
+        assert mock_synthesizer_class.call_count == 1
+
+
+class FakeBookmarkSynthesizer:
+    """按 SSML 中的书签依次合成：每行一段固定长度的音频，到达书签时回调偏移"""
+
+    FRAMERATE = 1000
+    LINE_FRAMES = 50
+
+    def __init__(self, drop_bookmarks=False):
+        self.drop_bookmarks = drop_bookmarks
+        self.handlers = []
+        self.word_handlers = []
+        self.requests = []
+        self.bookmark_reached = Mock()
+        self.bookmark_reached.connect.side_effect = self.handlers.append
+        self.bookmark_reached.disconnect_all.side_effect = self.handlers.clear
+        self.synthesis_word_boundary = Mock()
+        self.synthesis_word_boundary.connect.side_effect = self.word_handlers.append
+        self.synthesis_word_boundary.disconnect_all.side_effect = (
+            self.word_handlers.clear
+        )
+
+    def speak_ssml_async(self, ssml):
+        import io
+        import re
+        import wave
+        from datetime import timedelta
+
+        self.requests.append(ssml)
+        marks = re.findall(r"<bookmark mark='([^']+)'/>", ssml) or [None]
+        frames = b""
+        for line, mark in enumerate(marks):
+            offset = len(frames) // 2 * 10_000_000 // self.FRAMERATE
+            if mark and not self.drop_bookmarks:
+                for handler in self.handlers:
+                    handler(Mock(text=mark, audio_offset=offset))
+            # 每行一个词，从行首开始，持续 0.02 秒
+            for handler in self.word_handlers:
+                handler(
+                    Mock(
+                        text=f"词{line + 1}",
+                        audio_offset=offset,
+                        duration=timedelta(seconds=0.02),
+                        boundary_type="SpeechSynthesisBoundaryType.Word",
+                    )
+                )
+            frames += (line + 1).to_bytes(2, "little") * self.LINE_FRAMES
+
+        buffer = io.BytesIO()
+        with wave.open(buffer, "wb") as writer:
+            writer.setnchannels(1)
+            writer.setsampwidth(2)
+            writer.setframerate(self.FRAMERATE)
+            writer.writeframes(frames)
+        result = Mock()
+        result.reason = speechsdk.ResultReason.SynthesizingAudioCompleted
+        result.audio_data = buffer.getvalue()
+        return Mock(get=Mock(return_value=result))
+
+
+class TestBatchSynthesis:
+    """批量合成（书签切分）的测试"""
+
+    @pytest.mark.asyncio
+    async def test_batch_is_split_per_line(self, mock_config):
+        """测试多行合并为一个请求，按书签切回每行的音频"""
+        import io
+        import wave
+
+        from src.pipeline.voice_synthesizer import synthesize_batch
+
+        synthesizer = FakeBookmarkSynthesizer()
+        with patch('src.pipeline.voice_synthesizer.config', mock_config), \
+                patch('src.pipeline.voice_synthesizer.SpeechConfig'), \
+                patch('src.pipeline.voice_synthesizer.SpeechSynthesizer',
+                      return_value=synthesizer):
+            provider = SpeechProvider()
+            lines = [(3, "第一行"), (4, "第二行 & <三>"), (6, "第三行")]
+
+            results = await synthesize_batch(provider, lines, "zh-CN")
+
+        assert len(synthesizer.requests) == 1
+        assert "第二行 &amp; &lt;三&gt;" in synthesizer.requests[0]
+        assert "xml:lang='zh-CN'" in synthesizer.requests[0]
+        assert [r['index'] for r in results] == [3, 4, 6]
+        for line, result in enumerate(results, 1):
+            assert result['error'] is None
+            with wave.open(io.BytesIO(result['audio_data'].getvalue()), "rb") as reader:
+                frames = reader.readframes(reader.getnframes())
+            assert frames == line.to_bytes(2, "little") * synthesizer.LINE_FRAMES
+            # 字词时间换算为相对本行音频起点的时间
+            [word] = result['words']
+            assert (word['text'], word['type']) == (f"词{line}", "word")
+            assert (word['start'], word['end']) == pytest.approx((0.0, 0.02))
+        # 回调不会留在复用的合成器上
+        assert synthesizer.handlers == []
+        assert synthesizer.word_handlers == []
+
+    @pytest.mark.asyncio
+    async def test_failed_batch_falls_back_to_lines(self, mock_config):
+        """测试缺少书签时批次失败，逐行重新合成"""
+        from src.pipeline.voice_synthesizer import synthesize_batch
+        from src.services.tts.scheduler import TTSScheduler
+
+        synthesizer = FakeBookmarkSynthesizer(drop_bookmarks=True)
+        with patch('src.pipeline.voice_synthesizer.config', mock_config), \
+                patch('src.pipeline.voice_synthesizer.SpeechConfig'), \
+                patch('src.pipeline.voice_synthesizer.SpeechSynthesizer',
+                      return_value=synthesizer):
+            provider = SpeechProvider(TTSScheduler(max_attempts=1))
+
+            results = await synthesize_batch(provider, [(1, "甲"), (2, "乙")], "zh-CN")
+
+        assert [r['index'] for r in results] == [1, 2]
+        assert all(r['error'] is None for r in results)
+        # 一次批量请求 + 两次逐行请求
+        assert len(synthesizer.requests) == 3
+        assert "<bookmark" not in synthesizer.requests[1]
+
+
+class TestTTSCache:
+    """语音缓存的测试"""
+
+    @staticmethod
+    def _configure(mock_config, temp_dir):
+        mock_config.tts_provider = "azure"
+        mock_config.tts_max_concurrency = 2
+        mock_config.tts_rate_limit = 0
+        mock_config.tts_max_attempts = 1
+        mock_config.tts_backoff_base = 0
+        mock_config.tts_backoff_max = 0
+        mock_config.tts_preconnect = False
+        mock_config.tts_batch_size = 1
+        mock_config.tts_postprocess_workers = 2
+        mock_config.tts_loudness_normalize = True
+        mock_config.tts_target_loudness = -16.0
+        mock_config.tts_peak_limit = -1.0
+        mock_config.tts_sample_rate = 0
+        mock_config.tts_audio_format = "wav"
+        mock_config.tts_audio_bitrate = "64k"
+        mock_config.tts_cache = True
+        mock_config.tts_cache_dir = temp_dir / "cache"
+        mock_config.tts_cache_max_mb = 0
+
+    def test_cache_key_follows_voice_settings(self, mock_config):
+        """测试缓存键随文本和语音设置变化"""
+        with patch('src.pipeline.voice_synthesizer.config', mock_config):
+            provider = SpeechProvider()
+            key = provider.cache_key("文本", "zh-CN")
+
+            assert provider.cache_key("文本", "zh-CN") == key
+            assert provider.cache_key("文本。", "zh-CN") != key
+            provider.prosody_rate = "fast"
+            assert provider.cache_key("文本", "zh-CN") != key
+
+    @pytest.mark.asyncio
+    async def test_rerun_only_synthesizes_changed_lines(self, mock_config, temp_dir):
+        """测试重新运行时只合成修改过的文本，其余从缓存取出"""
+        import json
+
+        from src.pipeline.voice_synthesizer import process_text_files
+
+        self._configure(mock_config, temp_dir)
+        input_file = temp_dir / "chapters.json"
+        output_dir = temp_dir / "audio"
+
+        async def run(narrations):
+            input_file.write_text(
+                json.dumps({"storyboards": [{"narration": n} for n in narrations]}),
+                encoding="utf-8",
+            )
+            synthesizer = FakeBookmarkSynthesizer()
+            with patch('src.pipeline.voice_synthesizer.config', mock_config), \
+                    patch('src.pipeline.voice_synthesizer.SpeechConfig'), \
+                    patch('src.pipeline.voice_synthesizer.SpeechSynthesizer',
+                          return_value=synthesizer):
+                results = await process_text_files(input_file, output_dir, "zh-CN")
+            return results, synthesizer
+
+        first, synthesizer = await run(["甲", "乙", "丙"])
+        assert len(first) == 3
+        assert len(synthesizer.requests) == 3
+
+        second, synthesizer = await run(["甲", "乙（修改）", "丙"])
+        assert len(second) == 3
+        assert len(synthesizer.requests) == 1
+        assert "乙（修改）" in synthesizer.requests[0]
+        assert sorted(p.name for p in output_dir.iterdir()) == [
+            "output_1.json",
+            "output_1.wav",
+            "output_2.json",
+            "output_2.wav",
+            "output_3.json",
+            "output_3.wav",
+        ]
+        # 缓存命中的片段沿用统计文件，时长无需解码音频即可读取
+        from src.media.audio_info import audio_duration, read_sidecar
+
+        second.sort(key=lambda r: r["index"])
+        assert [r.get("cached", False) for r in second] == [True, False, True]
+        for index in (1, 2, 3):
+            audio_path = output_dir / f"output_{index}.wav"
+            stats = read_sidecar(audio_path)
+            assert stats["sample_rate"] == FakeBookmarkSynthesizer.FRAMERATE
+            assert audio_duration(audio_path) == pytest.approx(stats["duration"])
+            assert [word["text"] for word in stats["words"]] == ["词1"]
+
+        # 输出目录被清理后，字词时间随统计文件从缓存中恢复
+        for path in output_dir.iterdir():
+            path.unlink()
+        third, synthesizer = await run(["甲", "乙（修改）", "丙"])
+        assert synthesizer.requests == []
+        assert all(r["stats"]["words"] for r in third)
+        assert read_sidecar(output_dir / "output_2.wav")["words"][0]["text"] == "词1"
+
+
+    @pytest.mark.asyncio
+    async def test_compressed_format(self, mock_config, temp_dir):
+        """测试压缩格式输出：统计文件记录时长，切换格式后删除旧格式的文件"""
+        import json
+
+        from src.media.audio_info import audio_duration, find_audio
+        from src.pipeline.voice_synthesizer import process_text_files
+
+        self._configure(mock_config, temp_dir)
+        mock_config.tts_sample_rate = 48000
+        input_file = temp_dir / "chapters.json"
+        output_dir = temp_dir / "audio"
+        input_file.write_text(
+            json.dumps({"storyboards": [{"narration": "甲"}, {"narration": "乙"}]}),
+            encoding="utf-8",
+        )
+
+        async def run(audio_format):
+            mock_config.tts_audio_format = audio_format
+            with patch('src.pipeline.voice_synthesizer.config', mock_config), \
+                    patch('src.pipeline.voice_synthesizer.SpeechConfig'), \
+                    patch('src.pipeline.voice_synthesizer.SpeechSynthesizer',
+                          return_value=FakeBookmarkSynthesizer()):
+                return await process_text_files(input_file, output_dir, "zh-CN")
+
+        await run("wav")
+        wav_size = (output_dir / "output_1.wav").stat().st_size
+        results = await run("opus")
+
+        assert all(r["error"] is None for r in results)
+        assert sorted(p.name for p in output_dir.iterdir()) == [
+            "output_1.json",
+            "output_1.opus",
+            "output_2.json",
+            "output_2.opus",
+        ]
+        audio_path = find_audio(output_dir, "output_1")
+        assert audio_path.stat().st_size < wav_size
+        fake = FakeBookmarkSynthesizer
+        assert audio_duration(audio_path) == pytest.approx(
+            fake.LINE_FRAMES / fake.FRAMERATE
+        )
+
+
+class TestTTSPipeline:
+    """合成、后处理和写文件流水线的测试"""
+
+    class FakeProvider:
+        """每次合成耗时固定，序号为 2 的片段合成失败"""
+
+        def __init__(self, latency):
+            from src.services.tts.scheduler import TTSScheduler
+
+            self.latency = latency
+            self.scheduler = TTSScheduler(max_concurrency=1)
+
+        async def get_tts_audio(self, message, language, index):
+            from io import BytesIO
+
+            await asyncio.sleep(self.latency)
+            if index == 2:
+                return {"index": index, "audio_data": None, "error": "合成失败"}
+            audio_data = BytesIO(message.encode())
+            return {"index": index, "audio_data": audio_data, "error": None}
+
+    @pytest.mark.asyncio
+    async def test_stages_overlap(self, temp_dir):
+        """测试后处理与合成并行，总耗时接近最慢的阶段而不是各阶段之和"""
+        import time
+
+        from src.pipeline.voice_synthesizer import run_tts_pipeline
+
+        def slow_prepare(audio_path, audio_data, **settings):
+            time.sleep(0.05)
+            return audio_data.upper(), {"bytes": len(audio_data)}
+
+        ready = []
+        batches = [[(i, f"line{i}")] for i in range(1, 9)]
+        start = time.perf_counter()
+        with patch('src.pipeline.voice_synthesizer.prepare_audio', slow_prepare):
+            results = await run_tts_pipeline(
+                self.FakeProvider(latency=0.05),
+                batches,
+                "zh-CN",
+                temp_dir,
+                post_workers=1,
+                on_ready=lambda index, path: ready.append((index, path.read_bytes())),
+            )
+        elapsed = time.perf_counter() - start
+
+        # 串行执行需要约 0.8 秒（合成和后处理各 8 × 0.05 秒）
+        assert elapsed < 0.7
+        assert sorted(r['index'] for r in results) == list(range(1, 9))
+        assert [r['index'] for r in results if r['error']] == [2]
+        expected = [(i, f"LINE{i}".encode()) for i in range(1, 9) if i != 2]
+        assert sorted(ready) == expected
+        assert not (temp_dir / "output_2.wav").exists()
+        assert all("audio_data" not in r for r in results)
+        assert (temp_dir / "output_1.json").exists()
+
+
+class TestCreateProvider:
+    """按配置选择语音合成服务的测试"""
+
+    def test_local_provider(self, mock_config):
+        """测试选择本地引擎时不需要 Azure 密钥，沿用韵律设置"""
+        from src.pipeline.voice_synthesizer import create_provider
+        from src.services.tts import LocalTTSProvider
+
+        mock_config.tts_provider = "local"
+        mock_config.tts_local_engine = "espeak"
+        mock_config.tts_local_voice = ""
+        mock_config.tts_local_command = ""
+        mock_config.azure_speech_key = ""
+        mock_config.azure_voice_rate = "+10%"
+        mock_config.azure_voice_pitch = "+0Hz"
+        mock_config.azure_voice_volume = "+30%"
+
+        with patch('src.pipeline.voice_synthesizer.config', mock_config):
+            provider = create_provider(None)
+
+        assert isinstance(provider, LocalTTSProvider)
+        assert provider.engine == "espeak"
+        assert provider.prosody_rate == "+10%"
+        assert not provider.supports_batching
+
+    def test_azure_requires_key(self, mock_config):
+        """测试选择 Azure 但缺少密钥时报错"""
+        from src.pipeline.voice_synthesizer import create_provider
+
+        mock_config.tts_provider = "azure"
+        mock_config.azure_speech_key = ""
+
+        with patch('src.pipeline.voice_synthesizer.config', mock_config):
+            with pytest.raises(ValueError, match="AZURE_SPEECH_KEY"):
+                create_provider(None)
+
+    def test_unknown_provider(self, mock_config):
+        """测试不支持的语音合成服务"""
+        from src.pipeline.voice_synthesizer import create_provider
+
+        mock_config.tts_provider = "other"
+
+        with patch('src.pipeline.voice_synthesizer.config', mock_config):
+            with pytest.raises(ValueError, match="other"):
+                create_provider(None)